@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+"""
+Measure the startup cost of dispatching each croud command.
+
+Every command path of the command tree is dispatched in a fresh interpreter,
+once with lazily imported command modules (the way ``croud`` runs) and once
+with all command modules imported upfront (the way ``croud`` used to run).
+Only the time spent importing ``croud`` and resolving the command is taken
+into account, the interpreter startup itself is excluded.
+
+Usage::
+
+    python benchmarks/startup.py [--repeat N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+CHILD = """
+import sys
+import time
+
+start = time.perf_counter()
+from croud.__main__ import command_tree
+from croud.cmd import import_call
+
+if {eager!r}:
+    for ref in {all_calls!r}:
+        import_call(ref)
+import_call({call!r})
+print(time.perf_counter() - start)
+"""
+
+
+def command_paths(tree: Dict, prefix: Tuple[str, ...] = ()) -> Iterator:
+    for name, command in tree.items():
+        path = prefix + (name,)
+        if "sub_commands" in command:
+            yield from command_paths(command["sub_commands"], path)
+        else:
+            yield " ".join(path), command["calls"]
+
+
+def measure(call: str, all_calls: List[str], eager: bool, repeat: int) -> float:
+    code = CHILD.format(call=call, all_calls=all_calls, eager=eager)
+    timings = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True
+        ).stdout
+        timings.append(float(out))
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    options = parser.parse_args()
+
+    from croud.__main__ import command_tree
+
+    paths = list(command_paths(command_tree))
+    all_calls = [call for _, call in paths]
+
+    print(f"{'command':<30} {'eager ms':>10} {'lazy ms':>10} {'speedup':>8}")
+    for path, call in paths:
+        eager = measure(call, all_calls, True, options.repeat)
+        lazy = measure(call, all_calls, False, options.repeat)
+        print(f"{path:<30} {eager:>10.1f} {lazy:>10.1f} {eager / lazy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+#
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+"""
+Measure the performance of resolving commands, reading the configuration,
+running queries and rendering their results.
+
+The query and rendering benchmarks run with results of different sizes. The
+queries are sent to a local ``FakeCrateDBCloud`` server, so the network
+latency of CrateDB Cloud is not included.
+
+The results are written as JSON with ``--output`` and can be compared with
+the results of an earlier run with ``--compare``, e.g. to compare a branch
+with ``master``::
+
+    python benchmarks/suite.py --output baseline.json
+    git checkout my-branch
+    python benchmarks/suite.py --compare baseline.json
+
+With ``--compare``, the exit status is 1 if any benchmark is slower than
+the baseline by more than ``--threshold``.
+
+Usage::
+
+    python benchmarks/suite.py [--repeat N] [--sizes 10,1000,100000]
+                               [--filter TEXT] [--output FILE]
+                               [--compare FILE] [--threshold RATIO]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from argparse import Namespace
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+import aiohttp
+from tabulate import tabulate
+
+from croud import __version__
+from croud.__main__ import command_tree
+from croud.cmd import CMD
+from croud.config import Configuration, load_config, write_config
+from croud.gql import Query
+from croud.printer import FormatPrinter
+from croud.session import HttpSession, SessionPool
+from croud.table import psql_table
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# the fake server is part of the test utilities
+sys.path.insert(0, os.path.join(HERE, os.pardir, "tests", "unit_tests"))
+
+from util.fake_server import FakeCrateDBCloud, FakeResolver  # noqa: E402 isort:skip
+
+QUERY = """
+query allClusters {
+  allClusters {
+    data {
+      id
+      name
+      numNodes
+      crateVersion
+      projectId
+      username
+      fqdn
+      health {
+        status
+      }
+    }
+  }
+}
+"""
+
+# the minimum duration of a single sample, fast benchmarks are run several
+# times per sample
+MIN_SAMPLE_TIME = 0.1
+# benchmarks stop taking samples after this many seconds
+MAX_TIME = 10.0
+
+
+def rows(size: int) -> List[Dict]:
+    return [
+        {
+            "id": f"{i:08x}-0000-4000-8000-000000000000",
+            "name": f"cluster-{i}",
+            "numNodes": 3,
+            "crateVersion": "4.0.2",
+            "projectId": "3f6d4a5e-0000-4000-8000-000000000000",
+            "username": "admin",
+            "fqdn": f"cluster-{i}.bregenz.a1.cratedb.net.",
+            "health": {"status": "GREEN", "lastSeen": None},
+        }
+        for i in range(size)
+    ]
+
+
+class RowsCloud(FakeCrateDBCloud):
+    """
+    Answers every query with the same, serialized list of clusters.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int) -> None:
+        super().__init__(loop)
+        self.body = json.dumps({"data": {"allClusters": {"data": rows(size)}}})
+
+    async def on_graphql(self, request: aiohttp.web.Request) -> aiohttp.web.Response:
+        self.requests += 1
+        await request.read()
+        return aiohttp.web.Response(text=self.body, content_type="application/json")
+
+
+class FakePool(SessionPool):
+    """
+    Connects all sessions to the fake server instead of CrateDB Cloud.
+    """
+
+    def __init__(self, resolver: FakeResolver) -> None:
+        super().__init__()
+        self._resolver = resolver
+
+    async def get(self, env: str, token: str, region: str) -> HttpSession:
+        session = self._sessions.get((env, region))
+        if session is None:
+            connector = aiohttp.TCPConnector(resolver=self._resolver, ssl=False)
+            session = HttpSession(
+                env, token, region, url="https://cratedb.local", conn=connector
+            )
+            self._sessions[(env, region)] = session
+        return session
+
+
+def command_argv(tree: Dict, prefix: Tuple[str, ...] = ()) -> Iterator:
+    """
+    Yield the name and the arguments of every command of ``tree``, with a
+    value for each required argument.
+    """
+    for name, command in tree.items():
+        path = prefix + (name,)
+        if "sub_commands" in command:
+            yield from command_argv(command["sub_commands"], path)
+        elif "noop_arg" in command:
+            yield " ".join(path), ["croud", *path, command["noop_arg"]["choices"][0]]
+        else:
+            yield " ".join(path), ["croud", *path, *required_args(command)]
+
+
+def required_args(command: Dict) -> List[str]:
+    parser = argparse.ArgumentParser(add_help=False)
+    req_args = parser.add_argument_group()
+    opt_args = parser.add_argument_group()
+    for arg_def in command.get("extra_args", []):
+        arg_def(req_args, opt_args)
+
+    # only one argument of a required, mutually exclusive group is given
+    exclusive = {
+        action
+        for group in parser._mutually_exclusive_groups
+        for action in group._group_actions[1:]
+        if group.required
+    }
+    argv: List[str] = []
+    for action in parser._actions:
+        required = action.required or any(
+            group.required and group._group_actions[0] is action
+            for group in parser._mutually_exclusive_groups
+        )
+        if not required or action in exclusive:
+            continue
+        value = str(list(action.choices)[0]) if action.choices else "1"
+        if action.option_strings:
+            argv.append(action.option_strings[0])
+        argv.append(value)
+    return argv
+
+
+@contextlib.contextmanager
+def temporary_config() -> Iterator[None]:
+    with tempfile.TemporaryDirectory() as directory:
+        with mock.patch.object(
+            Configuration, "USER_CONFIG_DIR", directory
+        ), mock.patch.object(
+            Configuration, "FILEPATH", os.path.join(directory, Configuration.FILENAME)
+        ):
+            Configuration.create()
+            yield
+
+
+def measure(func: Callable[[], object], repeat: int) -> List[float]:
+    """
+    Return the duration of a single call of ``func`` for each sample.
+    """
+    # the first call warms up caches, so it is repeated to calibrate the
+    # number of calls per sample, unless it is slow anyway
+    duration = 0.0
+    for _ in range(2):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        if duration >= MIN_SAMPLE_TIME:
+            break
+    number = max(1, int(MIN_SAMPLE_TIME / (duration or 1e-9)))
+
+    samples: List[float] = []
+    deadline = time.perf_counter() + MAX_TIME
+    while len(samples) < repeat and (not samples or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def resolve_benchmarks() -> Iterator[Tuple[str, Callable]]:
+    for path, argv in command_argv(command_tree):
+        yield f"resolve {path}", lambda argv=argv: CMD(command_tree).resolve(argv)
+
+
+def config_benchmarks() -> Iterator[Tuple[str, Callable]]:
+    import croud.config
+
+    config = load_config()
+
+    def parse():
+        # the configuration of the process is discarded, so that the file is
+        # parsed again
+        croud.config._snapshot = None
+        load_config()
+
+    yield "config load", load_config
+    yield "config parse", parse
+    yield "config write", lambda: write_config(config)
+
+
+def query_benchmarks(sizes: List[int]) -> Iterator[Tuple[str, Callable]]:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    args = Namespace(env="dev", region="bregenz.a1", output_fmt="json")
+    for size in sizes:
+        cloud = RowsCloud(loop, size)
+        info = loop.run_until_complete(cloud.start())
+        pool = FakePool(FakeResolver(info, loop=loop))
+
+        def execute(pool=pool):
+            query = Query(QUERY, args, token="benchmark", pool=pool)
+            query.execute()
+            assert query._response, query._error
+
+        try:
+            yield f"query {size} rows", execute
+        finally:
+            loop.run_until_complete(pool.close())
+            loop.run_until_complete(cloud.stop())
+    loop.close()
+
+
+def render_benchmarks(sizes: List[int]) -> Iterator[Tuple[str, Callable]]:
+    printer = FormatPrinter()
+    for size in sizes:
+        data = rows(size)
+        headers = list(data[0])
+        values = [[printer._transform_field(row[h]) for h in headers] for row in data]
+        pages = [data[i : i + 100] for i in range(0, size, 100)]
+        yield f"render table {size} rows", lambda data=data: printer._tabular(data)
+        yield f"render table pages {size} rows", lambda pages=pages: (
+            printer.print_pages(iter(pages), "table")
+        )
+        yield f"render psql {size} rows", lambda h=headers, v=values: psql_table(h, v)
+        yield f"render tabulate {size} rows", lambda h=headers, v=values: tabulate(
+            v, headers=h, tablefmt="psql", missingval="NULL"
+        )
+        yield f"render json {size} rows", lambda data=data: printer._json(data)
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> bool:
+    """
+    Print the change of each benchmark against the baseline and return
+    whether any of them got slower by more than ``threshold``.
+    """
+    regressed = False
+    print()
+    print(f"{'benchmark':<45} {'baseline ms':>12} {'ms':>10} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median_ms"]
+        after = result["median_ms"]
+        ratio = after / before if before else 1.0
+        flag = ""
+        if ratio > threshold:
+            flag = "  slower"
+            regressed = True
+        print(f"{name:<45} {before:>12.3f} {after:>10.3f} {ratio:>7.2f}x{flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[10, 1000, 100000],
+        help="The number of rows of the query and rendering benchmarks.",
+    )
+    parser.add_argument(
+        "--filter", default="", help="Only run benchmarks whose name contains TEXT."
+    )
+    parser.add_argument("--output", help="Write the results to a JSON file.")
+    parser.add_argument("--compare", help="Compare with the results of a JSON file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="The ratio to the baseline above which a benchmark fails.",
+    )
+    options = parser.parse_args()
+
+    results: Dict[str, Dict] = {}
+    print(f"{'benchmark':<45} {'median ms':>12} {'min ms':>10} {'runs':>5}")
+    with temporary_config(), open(os.devnull, "w") as devnull:
+        groups = [
+            resolve_benchmarks(),
+            config_benchmarks(),
+            query_benchmarks(options.sizes),
+            render_benchmarks(options.sizes),
+        ]
+        for benchmarks in groups:
+            for name, func in benchmarks:
+                if options.filter not in name:
+                    continue
+                with contextlib.redirect_stdout(devnull):
+                    samples = measure(func, options.repeat)
+                result = {
+                    "median_ms": statistics.median(samples) * 1000,
+                    "min_ms": min(samples) * 1000,
+                    "runs": len(samples),
+                }
+                results[name] = result
+                print(
+                    f"{name:<45} {result['median_ms']:>12.3f} "
+                    f"{result['min_ms']:>10.3f} {result['runs']:>5}",
+                    flush=True,
+                )
+
+    if options.output:
+        meta: Dict[str, Optional[str]] = {
+            "croud": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        with open(options.output, "w") as f:
+            json.dump({"meta": meta, "benchmarks": results}, f, indent=2)
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)["benchmarks"]
+        if compare(results, baseline, options.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
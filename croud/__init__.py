@@ -17,6 +17,10 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
-import pkg_resources
-
-__version__ = pkg_resources.require("croud")[0].version
+try:
+    from croud._version import version as __version__
+except ImportError:  # pragma: no cover
+    # ``croud/_version.py`` is written by setuptools_scm when the package is
+    # built or installed, it is only missing in a source tree that has never
+    # been installed.
+    __version__ = "unknown"
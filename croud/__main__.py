@@ -21,14 +21,19 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
+import os
 import sys
+import time
+from argparse import Namespace
+from typing import Callable
 
 import colorama
 
-from croud.clusters.commands import clusters_list
 from croud.cmd import (
     CMD,
-    cluster_id_arg,
+    bulk_args,
+    cache_args,
+    cluster_id_or_name_arg,
     consumer_eventhub_connection_string_arg,
     consumer_eventhub_consumer_group_arg,
     consumer_eventhub_lease_storage_connection_string_arg,
@@ -39,57 +44,77 @@ from croud.cmd import (
     crate_password_arg,
     crate_username_arg,
     crate_version_arg,
+    from_file_arg,
     org_id_arg,
     org_id_no_org_arg_mutual_exclusive,
+    org_id_or_name_arg,
     org_name_arg,
     org_plan_type_arg,
     output_fmt_arg,
+    pagination_args,
+    persisted_queries_arg,
     product_id_arg,
     product_name_arg,
     product_tier_arg,
     product_unit_arg,
     project_id_arg,
+    project_id_or_name_arg,
     project_name_arg,
     region_arg,
+    regions_arg,
+    report_arg,
     resource_id_arg,
+    resource_kind_arg,
     role_fqn_arg,
+    search_term_arg,
+    socket_path_arg,
     user_id_arg,
     user_id_or_email_arg,
+    user_id_or_email_or_file_arg,
 )
-from croud.config import Configuration, config_get, config_set
-from croud.consumersets.commands import consumer_sets_edit, consumer_sets_list
-from croud.login import login
-from croud.logout import logout
-from croud.me import me
-from croud.organizations.commands import organizations_create, organizations_list
-from croud.organizations.users.commands import org_users_add, org_users_remove
-from croud.products.deploy import product_deploy
-from croud.projects.commands import project_create, projects_list
-from croud.projects.users.commands import project_user_add, project_user_remove
-from croud.users.commands import users_list
-from croud.users.roles.commands import roles_add, roles_list, roles_remove
+from croud.config import Configuration
+from croud.daemon.client import SOCKET_ENV, forward
+from croud.profiling import profile
+from croud.timings import print_timings, start_timings, stop_timings, timings_format
 
 # fmt: off
 command_tree = {
     "me": {
         "help": "Prints information about the current logged in user.",
-        "extra_args": [output_fmt_arg],
-        "calls": me,
+        "extra_args": [output_fmt_arg, cache_args],
+        "calls": "croud.me:me",
+    },
+    "login": {
+        "help": "Log in to CrateDB Cloud.",
+        "calls": "croud.login:login",
+    },
+    "logout": {
+        "help": "Log out from CrateDB Cloud.",
+        "calls": "croud.logout:logout",
     },
-    "login": {"help": "Log in to CrateDB Cloud.", "calls": login},
-    "logout": {"help": "Log out from CrateDB Cloud.", "calls": logout},
     "config": {
         "help": "Manage croud default configuration values.",
         "sub_commands": {
             "get": {
                 "help": "Get default configuration values.",
-                "calls": config_get,
-                "noop_arg": {"choices": ["env", "region", "output-fmt"]},
+                "calls": "croud.config:config_get",
+                "noop_arg": {
+                    "choices": [
+                        "env",
+                        "region",
+                        "output-fmt",
+                        "timeout",
+                        "connect-timeout",
+                        "read-timeout",
+                        "retries",
+                        "persisted-queries",
+                    ]
+                },
             },
             "set": {
                 "help": "Set default configuration values.",
-                "extra_args": [output_fmt_arg, region_arg],
-                "calls": config_set,
+                "extra_args": [output_fmt_arg, region_arg, persisted_queries_arg],
+                "calls": "croud.config:config_set",
             },
         },
     },
@@ -116,7 +141,7 @@ command_tree = {
                     consumer_schema_arg,
                     consumer_table_arg,
                 ],
-                "calls": product_deploy,
+                "calls": "croud.products.deploy:product_deploy",
             },
         },
     },
@@ -127,17 +152,17 @@ command_tree = {
                 "help": "Lists all consumer sets for the current user",
                 "extra_args": [
                     output_fmt_arg,
-                    lambda req_opt_group, opt_opt_group: project_id_arg(
+                    lambda req_opt_group, opt_opt_group: project_id_or_name_arg(
                         req_opt_group, opt_opt_group, False
                     ),
-                    lambda req_opt_group, opt_opt_group: cluster_id_arg(
+                    lambda req_opt_group, opt_opt_group: cluster_id_or_name_arg(
                         req_opt_group, opt_opt_group, False
                     ),
                     lambda req_opt_group, opt_opt_group: product_id_arg(
                         req_opt_group, opt_opt_group, False
                     )
                 ],
-                "calls": consumer_sets_list,
+                "calls": "croud.consumersets.commands:consumer_sets_list",
             },
             "edit": {
                 "help": "Edit the specified consumer set "
@@ -169,7 +194,7 @@ command_tree = {
                         req_opt_group, opt_opt_group, False
                     ),
                 ],
-                "calls": consumer_sets_edit,
+                "calls": "croud.consumersets.commands:consumer_sets_edit",
             },
         },
     },
@@ -186,13 +211,18 @@ command_tree = {
                     ),
                     region_arg,
                 ],
-                "calls": project_create,
+                "calls": "croud.projects.commands:project_create",
             },
             "list": {
                 "help": "Lists all projects for the current "
                 "user in the specified region.",
-                "extra_args": [output_fmt_arg, region_arg],
-                "calls": projects_list,
+                "extra_args": [
+                    output_fmt_arg,
+                    regions_arg,
+                    pagination_args,
+                    cache_args,
+                ],
+                "calls": "croud.projects.commands:projects_list",
             },
             "users": {
                 "help": "Manage users in projects.",
@@ -200,22 +230,26 @@ command_tree = {
                     "add": {
                         "help": "Add users to projects.",
                         "extra_args": [
-                            lambda req_opt_group, opt_opt_group: project_id_arg(
-                                req_opt_group, opt_opt_group, True
+                            lambda req_opt_group, opt_opt_group: (
+                                project_id_or_name_arg(
+                                    req_opt_group, opt_opt_group, True
+                                )
                             ),
                             user_id_or_email_arg,
                         ],
-                        "calls": project_user_add,
+                        "calls": "croud.projects.users.commands:project_user_add",
                     },
                     "remove": {
                         "help": "Remove users from projects.",
                         "extra_args": [
-                            lambda req_opt_group, opt_opt_group: project_id_arg(
-                                req_opt_group, opt_opt_group, True
+                            lambda req_opt_group, opt_opt_group: (
+                                project_id_or_name_arg(
+                                    req_opt_group, opt_opt_group, True
+                                )
                             ),
                             user_id_or_email_arg,
                         ],
-                        "calls": project_user_remove,
+                        "calls": "croud.projects.users.commands:project_user_remove",
                     },
                 },
             },
@@ -227,11 +261,14 @@ command_tree = {
             "list": {
                 "help": "List all clusters for the current user.",
                 "extra_args": [output_fmt_arg,
-                               lambda req_opt_group, opt_opt_group: project_id_arg(
-                                   req_opt_group, opt_opt_group, False
+                               lambda req_opt_group, opt_opt_group: (
+                                   project_id_or_name_arg(
+                                       req_opt_group, opt_opt_group, False
+                                   )
                                ),
-                               region_arg],
-                "calls": clusters_list,
+                               regions_arg,
+                               pagination_args],
+                "calls": "croud.clusters.commands:clusters_list",
             }
         },
     },
@@ -241,12 +278,12 @@ command_tree = {
             "create": {
                 "help": "Creates an organization.",
                 "extra_args": [output_fmt_arg, org_name_arg, org_plan_type_arg],
-                "calls": organizations_create,
+                "calls": "croud.organizations.commands:organizations_create",
             },
             "list": {
                 "help": "List all organizations for the logged in user.",
-                "extra_args": [output_fmt_arg],
-                "calls": organizations_list,
+                "extra_args": [output_fmt_arg, pagination_args, cache_args],
+                "calls": "croud.organizations.commands:organizations_list",
             },
             "users": {
                 "help": "Add/remove users to/from organizations.",
@@ -254,30 +291,68 @@ command_tree = {
                     "add": {
                         "help": "Add user to organization",
                         "extra_args": [
-                            user_id_or_email_arg,
+                            user_id_or_email_or_file_arg,
                             lambda req_opt_group, opt_opt_group: role_fqn_arg(
                                 req_opt_group, opt_opt_group, False
                             ),
-                            lambda req_opt_group, opt_opt_group: org_id_arg(
+                            lambda req_opt_group, opt_opt_group: org_id_or_name_arg(
                                 req_opt_group, opt_opt_group, False
                             ),
+                            output_fmt_arg,
+                            bulk_args,
+                            report_arg,
                         ],
-                        "calls": org_users_add,
+                        "calls": "croud.organizations.users.commands:org_users_add",
                     },
                     "remove": {
                         "help": "Remove user from organization",
                         "extra_args": [
-                            user_id_or_email_arg,
-                            lambda req_opt_group, opt_opt_group: org_id_arg(
+                            user_id_or_email_or_file_arg,
+                            lambda req_opt_group, opt_opt_group: org_id_or_name_arg(
                                 req_opt_group, opt_opt_group, False
                             ),
+                            output_fmt_arg,
+                            bulk_args,
+                            report_arg,
                         ],
-                        "calls": org_users_remove,
+                        "calls": "croud.organizations.users.commands:org_users_remove",
                     },
                 },
             },
         },
     },
+    "index": {
+        "help": "Manage the local index of CrateDB Cloud resources.",
+        "sub_commands": {
+            "sync": {
+                "help": "Fetch all organizations, projects, clusters, users "
+                "and consumer sets into the local index.",
+                "extra_args": [output_fmt_arg, regions_arg],
+                "calls": "croud.index.commands:index_sync",
+            },
+        },
+    },
+    "search": {
+        "help": "Search the local index for resources by ID, name or email.",
+        "extra_args": [search_term_arg, resource_kind_arg, output_fmt_arg],
+        "calls": "croud.index.commands:search",
+    },
+    "daemon": {
+        "help": "Run croud in the background to speed up subsequent commands.",
+        "sub_commands": {
+            "start": {
+                "help": "Start a daemon that executes the commands forwarded "
+                f"by croud if the {SOCKET_ENV} environment variable is set.",
+                "extra_args": [socket_path_arg],
+                "calls": "croud.daemon.commands:daemon_start",
+            },
+            "stop": {
+                "help": "Stop a running daemon.",
+                "extra_args": [socket_path_arg],
+                "calls": "croud.daemon.commands:daemon_stop",
+            },
+        },
+    },
     "users": {
         "help": "Manage CrateDB Cloud users.",
         "sub_commands": {
@@ -287,8 +362,9 @@ command_tree = {
                 "extra_args": [
                     output_fmt_arg,
                     org_id_no_org_arg_mutual_exclusive,
+                    pagination_args,
                 ],
-                "calls": users_list,
+                "calls": "croud.users.commands:users_list",
             },
             "roles": {
                 "help": "Manage CrateDB Cloud user roles.",
@@ -297,38 +373,44 @@ command_tree = {
                         "help": "Adds a role to a user.",
                         "extra_args": [
                             lambda req_opt_group, opt_opt_group: resource_id_arg(
-                                req_opt_group, opt_opt_group, True
+                                req_opt_group, opt_opt_group, False
                             ),
                             lambda req_opt_group, opt_opt_group: user_id_arg(
-                                req_opt_group, opt_opt_group, True
+                                req_opt_group, opt_opt_group, False
                             ),
                             output_fmt_arg,
                             lambda req_opt_group, opt_opt_group: role_fqn_arg(
-                                req_opt_group, opt_opt_group, True
+                                req_opt_group, opt_opt_group, False
                             ),
+                            from_file_arg,
+                            bulk_args,
+                            report_arg,
                         ],
-                        "calls": roles_add,
+                        "calls": "croud.users.roles.commands:roles_add",
                     },
                     "remove": {
                         "help": "Removes a role from a user.",
                         "extra_args": [
                             lambda req_opt_group, opt_opt_group: resource_id_arg(
-                                req_opt_group, opt_opt_group, True
+                                req_opt_group, opt_opt_group, False
                             ),
                             lambda req_opt_group, opt_opt_group: user_id_arg(
-                                req_opt_group, opt_opt_group, True
+                                req_opt_group, opt_opt_group, False
                             ),
                             output_fmt_arg,
                             lambda req_opt_group, opt_opt_group: role_fqn_arg(
-                                req_opt_group, opt_opt_group, True
+                                req_opt_group, opt_opt_group, False
                             ),
+                            from_file_arg,
+                            bulk_args,
+                            report_arg,
                         ],
-                        "calls": roles_remove,
+                        "calls": "croud.users.roles.commands:roles_remove",
                     },
                     "list": {
                         "help": "Lists all available roles.",
-                        "extra_args": [output_fmt_arg],
-                        "calls": roles_list,
+                        "extra_args": [output_fmt_arg, cache_args],
+                        "calls": "croud.users.roles.commands:roles_list",
                     },
                 },
             },
@@ -339,13 +421,66 @@ command_tree = {
 
 
 def main():
+    socket_path = os.environ.get(SOCKET_ENV)
+    if socket_path:
+        status = forward(socket_path, sys.argv)
+        if status is not None:
+            sys.exit(status)
+
+    start = time.perf_counter()
     Configuration.create()
     colorama.init()
+    config_end = time.perf_counter()
 
     croud = CMD(command_tree)
     resolver, arguments = croud.resolve(sys.argv)
-    if resolver:
+    if not resolver:
+        return
+
+    run(resolver, arguments, start, config_end)
+
+
+def run(
+    resolver: Callable[[Namespace], None],
+    arguments: Namespace,
+    start: float,
+    config_end: float,
+) -> None:
+    """
+    Run a resolved command with the profiler and the timings that its
+    arguments ask for. The daemon runs forwarded commands through this as
+    well.
+    """
+    mode = getattr(arguments, "profile", None)
+    if mode:
+        profile(
+            mode,
+            resolver.__name__,
+            lambda: _run_timed(resolver, arguments, start, config_end),
+        )
+    else:
+        _run_timed(resolver, arguments, start, config_end)
+
+
+def _run_timed(
+    resolver: Callable[[Namespace], None],
+    arguments: Namespace,
+    start: float,
+    config_end: float,
+) -> None:
+    format = timings_format(getattr(arguments, "timings", None))
+    if not format:
+        resolver(arguments)
+        return
+
+    timings = start_timings(resolver.__name__, start)
+    timings.add("config", config_end - start)
+    timings.add("resolve", time.perf_counter() - config_end)
+    try:
         resolver(arguments)
+    finally:
+        print_timings(timings, format)
+        stop_timings()
 
 
 if __name__ == "__main__":
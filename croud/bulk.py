@@ -0,0 +1,150 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+import csv
+import io
+import json
+import sys
+from argparse import Namespace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from croud.gql import DEFAULT_BATCH_SIZE, Query
+from croud.printer import print_error, print_format, print_info, print_success
+from croud.typing import JsonDict
+
+DEFAULT_CONCURRENCY = 10
+
+
+def read_rows(path: str, columns: Sequence[str]) -> List[Dict[str, str]]:
+    """
+    Read the rows of a CSV file whose first line names its columns, or of a
+    file with one JSON object per line. ``-`` reads the rows from stdin.
+
+    All of the given ``columns`` need to be present, empty values are read as
+    ``""``.
+    """
+    if path == "-":
+        name, text = "stdin", sys.stdin.read()
+    else:
+        with open(path, newline="", encoding="utf8") as f:
+            name, text = path, f.read()
+
+    if text.lstrip().startswith("{"):
+        rows = _ndjson_rows(name, text)
+        fieldnames = {column for row in rows for column in row}
+    else:
+        reader = csv.DictReader(io.StringIO(text, newline=""))
+        rows = list(reader)
+        fieldnames = set(reader.fieldnames or [])
+
+    missing = [column for column in columns if column not in fieldnames]
+    if missing:
+        raise ValueError(f"Missing column(s) in {name}: {', '.join(missing)}")
+    return [
+        {column: _value(value) for column, value in row.items() if column}
+        for row in rows
+    ]
+
+
+def _ndjson_rows(name: str, text: str) -> List[Dict]:
+    rows = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {number} of {name} is not a JSON object.")
+        rows.append(row)
+    return rows
+
+
+def _value(value) -> str:
+    if value is None:
+        return ""
+    return value.strip() if isinstance(value, str) else str(value)
+
+
+def execute_from_file(
+    query: Query,
+    key: str,
+    args: Namespace,
+    columns: Sequence[str],
+    variables: Callable[[Dict[str, str]], Dict],
+) -> None:
+    """
+    Execute ``query`` once for each row of the ``--from-file`` file, with the
+    variables that ``variables`` returns for a row, and print the result of
+    every row.
+
+    The rows are executed concurrently over one session, with at most
+    ``--concurrency`` requests at a time of up to ``--batch-size`` rows each.
+    Failed requests are retried like those of any other query. The result of
+    every row is also written to the ``--report`` file, if any.
+    """
+    try:
+        rows = read_rows(args.from_file, columns)
+    except (OSError, ValueError) as e:
+        print_error(str(e))
+        return
+
+    if not rows:
+        print_info(f"{args.from_file} does not contain any rows.")
+        return
+
+    concurrency = getattr(args, "concurrency", None) or DEFAULT_CONCURRENCY
+    batch_size = getattr(args, "batch_size", None) or DEFAULT_BATCH_SIZE
+    results = query.execute_many(
+        [variables(row) for row in rows], concurrency, batch_size
+    )
+    print_results(rows, results, key, query._output_fmt, getattr(args, "report", None))
+
+
+def print_results(
+    rows: List[Dict[str, str]],
+    results: List[Tuple[Optional[JsonDict], Optional[str]]],
+    key: str,
+    format: str,
+    report_path: Optional[str] = None,
+) -> None:
+    report = []
+    for row, (data, error) in zip(rows, results):
+        if error is None and ((data or {}).get(key) or {}).get("success") is False:
+            # Edge case that might occur during network partitions/timeouts etc.
+            error = "Command not successful, however no server-side errors occurred."
+        report.append(
+            {**row, "status": "failed" if error else "success", "error": error or ""}
+        )
+    print_format(report, format)
+
+    if report_path:
+        try:
+            with open(report_path, "w", encoding="utf8") as f:
+                for row in report:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print_error(f"Could not write the report: {e!s}")
+
+    failed = sum(1 for row in report if row["status"] == "failed")
+    if failed:
+        print_error(f"{failed} of {len(report)} rows failed.")
+    else:
+        print_success(f"All {len(report)} rows succeeded.")
@@ -0,0 +1,168 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional
+
+from appdirs import user_cache_dir
+
+from croud.typing import JsonDict
+
+CACHE_DIR: str = os.path.join(user_cache_dir("Crate"), "croud", "responses")
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024
+
+
+class CachePolicy(NamedTuple):
+    # seconds the response of a query is cached, None for mutations
+    ttl: Optional[float]
+    # types of resources the operation reads or, for a mutation, modifies
+    resources: FrozenSet[str]
+
+
+class ResponseCache:
+    """
+    Stores the responses of read-only queries on disk, each for the time to
+    live of its query.
+
+    An entry is a JSON file whose name starts with the resource types the
+    query reads, so that the entries that a mutation invalidates are found
+    without reading them. The modification time of an entry is its last use:
+    once the entries take up more than ``max_size`` bytes, the least recently
+    used ones are evicted. Failing to read or write the cache is never an
+    error, the query is then simply sent to CrateDB Cloud.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def get(self, key: str, resources: Iterable[str]) -> Optional[JsonDict]:
+        path = self._path(key, resources)
+        try:
+            with open(path, "r", encoding="utf8") as f:
+                entry = json.load(f)
+            if entry["expires"] > time.time():
+                os.utime(path)
+                return entry["response"]
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError):
+            self._remove(path)
+        return None
+
+    def put(
+        self, key: str, resources: Iterable[str], response: JsonDict, ttl: float
+    ) -> None:
+        entry = {"expires": time.time() + ttl, "response": response}
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            # entries are replaced atomically, since several croud processes
+            # may use the cache at the same time
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._path(key, resources))
+        except (OSError, TypeError, ValueError):
+            self._remove(tmp)
+            return
+        self._evict()
+
+    def invalidate(self, resources: Iterable[str]) -> None:
+        """
+        Remove the entries of all queries that read any of the ``resources``.
+        """
+        resources = set(resources)
+        for name in self._entries():
+            if resources.intersection(name.split(".", 1)[0].split("+")):
+                self._remove(os.path.join(self.directory, name))
+
+    def clear(self) -> None:
+        for name in self._entries():
+            self._remove(os.path.join(self.directory, name))
+
+    def _evict(self) -> None:
+        entries = []
+        for name in self._entries():
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            self._remove(path)
+            size -= entry_size
+
+    def _entries(self) -> Iterable[str]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [name for name in names if name.endswith(".json")]
+
+    def _path(self, key: str, resources: Iterable[str]) -> str:
+        return os.path.join(self.directory, f"{'+'.join(sorted(resources))}.{key}.json")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cache_key(
+    env: str, region: str, query: str, variables: Optional[Dict], token: str
+) -> str:
+    """
+    Return the key of the response to ``query`` with ``variables``. Responses
+    are only shared by requests to the same environment and region, on behalf
+    of the same user. The token itself is not part of the key, only its hash.
+    """
+    parts = [env, region, _hash(query), variables or {}, _hash(token)]
+    return _hash(json.dumps(parts, sort_keys=True))
+
+
+@functools.lru_cache(maxsize=None)
+def _hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def response_cache() -> ResponseCache:
+    global _response_cache
+
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,359 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+"""
+An asynchronous Python API for CrateDB Cloud.
+
+The commands of croud print their results. The :class:`CloudClient` runs the
+same GraphQL documents, but returns the results so that croud can be used
+from Python without running the command line interface::
+
+    async with CloudClient() as client:
+        projects, clusters = await asyncio.gather(
+            client.projects(), client.clusters(project_id=project_id)
+        )
+
+All requests of a client share its connections, so that any number of them
+can run concurrently.
+"""
+
+from argparse import Namespace
+from types import TracebackType
+from typing import Any, Dict, List, NamedTuple, Optional, Type
+
+from croud.clusters.commands import ALL_CLUSTERS
+from croud.config import Configuration
+from croud.consumersets.commands import ALL_CONSUMER_SETS
+from croud.gql import Query
+from croud.me import ME
+from croud.organizations.commands import ALL_ORGANIZATIONS, CREATE_ORGANIZATION
+from croud.organizations.users.commands import (
+    ADD_USER_TO_ORGANIZATION,
+    REMOVE_USER_FROM_ORGANIZATION,
+)
+from croud.projects.commands import ALL_PROJECTS, CREATE_PROJECT
+from croud.projects.users.commands import ADD_USER_TO_PROJECT, REMOVE_USER_FROM_PROJECT
+from croud.session import SessionPool
+from croud.typing import JsonDict
+from croud.users.commands import ALL_USERS
+from croud.users.roles.commands import (
+    ADD_ROLE_TO_USER,
+    ALL_ROLES,
+    REMOVE_ROLE_FROM_USER,
+)
+from croud.util import clean_dict
+
+
+class CloudError(Exception):
+    """
+    Raised if CrateDB Cloud cannot be reached or returns an error.
+    """
+
+
+class User(NamedTuple):
+    uid: Optional[str]
+    email: Optional[str]
+    username: Optional[str]
+
+
+class Organization(NamedTuple):
+    id: str
+    name: str
+    plan_type: Optional[int]
+
+
+class Project(NamedTuple):
+    id: str
+    name: str
+    region: Optional[str]
+    organization_id: Optional[str]
+
+
+class Cluster(NamedTuple):
+    id: str
+    name: str
+    num_nodes: Optional[int]
+    crate_version: Optional[str]
+    project_id: Optional[str]
+    username: Optional[str]
+    fqdn: Optional[str]
+
+
+class Role(NamedTuple):
+    fqn: str
+    friendly_name: Optional[str]
+
+
+class ConsumerSet(NamedTuple):
+    id: str
+    name: str
+    project_id: Optional[str]
+    instances: Optional[int]
+    config: Optional[JsonDict]
+
+
+def _user(row: JsonDict) -> User:
+    return User(row.get("uid"), row.get("email"), row.get("username"))
+
+
+def _organization(row: JsonDict) -> Organization:
+    return Organization(row["id"], row["name"], row.get("planType"))
+
+
+def _project(row: JsonDict) -> Project:
+    return Project(row["id"], row["name"], row.get("region"), row.get("organizationId"))
+
+
+def _cluster(row: JsonDict) -> Cluster:
+    return Cluster(
+        row["id"],
+        row["name"],
+        row.get("numNodes"),
+        row.get("crateVersion"),
+        row.get("projectId"),
+        row.get("username"),
+        row.get("fqdn"),
+    )
+
+
+def _role(row: JsonDict) -> Role:
+    return Role(row["fqn"], row.get("friendlyName"))
+
+
+def _consumer_set(row: JsonDict) -> ConsumerSet:
+    return ConsumerSet(
+        row["id"],
+        row["name"],
+        row.get("projectId"),
+        row.get("instances"),
+        row.get("config"),
+    )
+
+
+class CloudClient:
+    """
+    A client of CrateDB Cloud.
+
+    Settings that are not given are taken from the croud configuration, like
+    the token of ``croud login`` for the environment. ``cache`` enables the
+    response cache of croud for the queries that use it.
+    """
+
+    def __init__(
+        self,
+        env: Optional[str] = None,
+        token: Optional[str] = None,
+        region: Optional[str] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        persisted_queries: Optional[bool] = None,
+        cache: bool = True,
+    ) -> None:
+        self.env = env or Configuration.get_env()
+        self.token = Configuration.get_token(self.env) if token is None else token
+        self._args = Namespace(
+            env=self.env,
+            region=region,
+            output_fmt="json",
+            timeout=timeout,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries=retries,
+            persisted_queries=persisted_queries,
+            no_cache=not cache,
+        )
+        self._pool = SessionPool()
+
+    async def me(self) -> User:
+        data = await self._execute(ME, "me")
+        return _user(data)
+
+    async def organizations(self, limit: Optional[int] = None) -> List[Organization]:
+        rows = await self._rows(ALL_ORGANIZATIONS, "allOrganizations", limit=limit)
+        return [_organization(row) for row in rows]
+
+    async def projects(
+        self, region: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[Project]:
+        rows = await self._rows(ALL_PROJECTS, "allProjects", region=region, limit=limit)
+        return [_project(row) for row in rows]
+
+    async def clusters(
+        self,
+        project_id: Optional[str] = None,
+        region: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Cluster]:
+        project_filter = (
+            {"by": "PROJECT_ID", "op": "EQ", "value": project_id}
+            if project_id
+            else None
+        )
+        variables = clean_dict({"filter": [project_filter] if project_filter else None})
+        rows = await self._rows(
+            ALL_CLUSTERS, "allClusters", variables, region=region, limit=limit
+        )
+        return [_cluster(row) for row in rows]
+
+    async def users(
+        self,
+        org_id: Optional[str] = None,
+        no_org: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[User]:
+        variables = clean_dict(
+            {"queryArgs": {"noOrg": no_org, "organizationId": org_id}}
+        )
+        rows = await self._rows(ALL_USERS, "allUsers", variables, limit=limit)
+        return [_user(row) for row in rows]
+
+    async def roles(self) -> List[Role]:
+        data = await self._execute(ALL_ROLES, "allRoles")
+        return [_role(row) for row in data.get("data") or []]
+
+    async def consumer_sets(
+        self,
+        project_id: Optional[str] = None,
+        product_id: Optional[str] = None,
+        cluster_id: Optional[str] = None,
+        region: Optional[str] = None,
+    ) -> List[ConsumerSet]:
+        variables = clean_dict(
+            {"projectId": project_id, "productId": product_id, "clusterId": cluster_id}
+        )
+        rows = await self._execute(
+            ALL_CONSUMER_SETS,
+            "allConsumerSets",
+            variables,
+            region=region,
+            endpoint="/product/graphql",
+        )
+        return [_consumer_set(row) for row in rows or []]
+
+    async def create_organization(self, name: str, plan_type: int) -> Organization:
+        variables = {"input": {"name": name, "planType": plan_type}}
+        data = await self._execute(CREATE_ORGANIZATION, "createOrganization", variables)
+        return _organization(data)
+
+    async def create_project(self, name: str, org_id: str) -> Project:
+        variables = {"input": {"name": name, "organizationId": org_id}}
+        data = await self._execute(CREATE_PROJECT, "createProject", variables)
+        # the mutation only returns the ID of the new project
+        return _project(dict(variables["input"], **data))
+
+    async def add_user_to_project(self, project_id: str, user: str) -> None:
+        variables = {"input": {"projectId": project_id, "user": user}}
+        await self._mutate(ADD_USER_TO_PROJECT, "addUserToProject", variables)
+
+    async def remove_user_from_project(self, project_id: str, user: str) -> None:
+        variables = {"input": {"projectId": project_id, "user": user}}
+        await self._mutate(REMOVE_USER_FROM_PROJECT, "removeUserFromProject", variables)
+
+    async def add_user_to_organization(
+        self, user: str, org_id: Optional[str] = None, role: Optional[str] = None
+    ) -> None:
+        variables = {
+            "input": clean_dict(
+                {"user": user, "organizationId": org_id, "roleFqn": role}
+            )
+        }
+        # the mutation returns the added user instead of a success flag
+        await self._execute(
+            ADD_USER_TO_ORGANIZATION, "addUserToOrganization", variables
+        )
+
+    async def remove_user_from_organization(
+        self, user: str, org_id: Optional[str] = None
+    ) -> None:
+        variables = {"input": clean_dict({"user": user, "organizationId": org_id})}
+        await self._mutate(
+            REMOVE_USER_FROM_ORGANIZATION, "removeUserFromOrganization", variables
+        )
+
+    async def add_role_to_user(self, user_id: str, role: str, resource_id: str) -> None:
+        variables = _role_input(user_id, role, resource_id)
+        await self._mutate(ADD_ROLE_TO_USER, "addRoleToUser", variables)
+
+    async def remove_role_from_user(
+        self, user_id: str, role: str, resource_id: str
+    ) -> None:
+        variables = _role_input(user_id, role, resource_id)
+        await self._mutate(REMOVE_ROLE_FROM_USER, "removeRoleFromUser", variables)
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+    async def __aenter__(self) -> "CloudClient":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    def _query(self, document: str, endpoint: str = "/graphql") -> Query:
+        return Query(
+            document, self._args, endpoint=endpoint, token=self.token, pool=self._pool
+        )
+
+    async def _execute(
+        self,
+        document: str,
+        key: str,
+        variables: Optional[Dict] = None,
+        region: Optional[str] = None,
+        endpoint: str = "/graphql",
+    ) -> Any:
+        data, error = await self._query(document, endpoint).fetch(variables, region)
+        if error:
+            raise CloudError(error)
+        if not isinstance(data, dict):
+            raise CloudError("Result has no proper format.")
+        return data.get(key)
+
+    async def _mutate(self, document: str, key: str, variables: Dict) -> None:
+        data = await self._execute(document, key, variables)
+        if not (data or {}).get("success"):
+            raise CloudError(
+                "Command not successful, however no server-side errors occurred."
+            )
+
+    async def _rows(
+        self,
+        document: str,
+        key: str,
+        variables: Optional[Dict] = None,
+        region: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[JsonDict]:
+        rows, error = await self._query(document).fetch_rows(
+            key, variables, limit=limit, region=region
+        )
+        if error:
+            raise CloudError(error)
+        return rows
+
+
+def _role_input(user_id: str, role: str, resource_id: str) -> Dict:
+    return {"input": {"userId": user_id, "roleFqn": role, "resourceId": resource_id}}
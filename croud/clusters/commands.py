@@ -17,36 +17,46 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
-import textwrap
 from argparse import Namespace
 
-from croud.gql import Query, print_query
+from croud.gql import Query, document, print_paginated
+from croud.index.resolve import resolve_names
 from croud.util import clean_dict
 
+ALL_CLUSTERS = document(
+    """
+    query allClusters($filter: [ClusterFilter], $first: Int, $after: String) {
+        allClusters(
+            sort: [CRATE_VERSION_DESC]
+            filter: $filter
+            first: $first
+            after: $after
+        ) {
+            data {
+                id
+                name
+                numNodes
+                crateVersion
+                projectId
+                username
+                fqdn
+            }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
+        }
+    }
+"""
+)
+
 
 def clusters_list(args: Namespace) -> None:
     """
     Lists all projects for the current user in the specified region
     """
 
-    body = textwrap.dedent(
-        """
-        query allClusters($filter: [ClusterFilter]) {
-            allClusters(sort: [CRATE_VERSION_DESC], filter: $filter) {
-                data {
-                    id
-                    name
-                    numNodes
-                    crateVersion
-                    projectId
-                    username
-                    fqdn
-                }
-            }
-        }
-    """
-    ).strip()
-
+    resolve_names(args)
     project_filter = (
         {"by": "PROJECT_ID", "op": "EQ", "value": args.project_id}
         if args.project_id
@@ -54,6 +64,5 @@ def clusters_list(args: Namespace) -> None:
     )
     vars = clean_dict({"filter": [project_filter] if project_filter else None})
 
-    query = Query(body, args)
-    query.execute(vars)
-    print_query(query, "allClusters")
+    query = Query(ALL_CLUSTERS, args)
+    print_paginated(query, "allClusters", vars, args)
@@ -20,17 +20,23 @@
 # software solely pursuant to the terms of the relevant commercial agreement.
 
 import argparse
+import importlib
 import sys
 from argparse import ArgumentParser, Namespace, _ArgumentGroup, _SubParsersAction
 from os.path import basename
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 from croud import __version__
+from croud.profiling import PROFILE_MODES
+from croud.timings import TIMINGS_ENV, TIMINGS_FORMATS
 
 POSITIONALS_TITLE = "Available Commands"
 REQUIRED_TITLE = "Required Arguments"
 OPTIONALS_TITLE = "Optional Arguments"
 
+REGIONS = ["westeurope.azure", "eastus.azure", "eastus2.azure", "bregenz.a1"]
+RESOURCE_KINDS = ["organization", "project", "cluster", "user", "consumer-set"]
+
 
 class CroudCliArgumentParser(argparse.ArgumentParser):
     def error(self, message):
@@ -145,7 +151,7 @@ class CMD:
                 if "noop_arg" in command:
                     cmd = command["noop_arg"]
                     context.add_argument(key, choices=cmd["choices"])
-                    resolver = command["calls"]
+                    resolver = import_call(command["calls"])
                     break
 
                 if "extra_args" in command:
@@ -158,7 +164,7 @@ class CMD:
                     )
                 else:
                     add_default_args(opt_args)
-                    resolver = command["calls"]
+                    resolver = import_call(command["calls"])
                 break
 
         cmd_args = argv[depth : depth + 1]
@@ -188,8 +194,25 @@ class CMD:
         return self._create_parent_cmd(1, argv, self.cmd_tree)
 
 
+def import_call(call: Union[str, Callable]) -> Callable:
+    """
+    Resolve the ``calls`` entry of a command.
+
+    Commands reference their implementation as ``"module.path:attribute"`` so
+    that only the module of the command that is actually invoked is imported.
+    Callables are returned unchanged.
+    """
+    if callable(call):
+        return call
+    module_name, _, attribute = call.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
 def add_default_args(opt_args: _ArgumentGroup) -> None:
     env_arg(opt_args)
+    request_args(opt_args)
+    timings_arg(opt_args)
+    profile_arg(opt_args)
 
 
 def env_arg(opt_args: _ArgumentGroup) -> None:
@@ -202,17 +225,127 @@ def env_arg(opt_args: _ArgumentGroup) -> None:
     )
 
 
+def request_args(opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Maximum duration of a request to CrateDB Cloud.",
+    )
+    opt_args.add_argument(
+        "--connect-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Maximum duration to establish a connection to CrateDB Cloud.",
+    )
+    opt_args.add_argument(
+        "--read-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Maximum duration to wait for data from CrateDB Cloud.",
+    )
+    opt_args.add_argument(
+        "--retries",
+        type=int,
+        metavar="N",
+        help="Number of times a failed request is retried.",
+    )
+
+
+def timings_arg(opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--timings",
+        nargs="?",
+        const="text",
+        choices=TIMINGS_FORMATS,
+        help="Print how long each phase of the command took to stderr, as a "
+        f"table or as a JSON line. Can also be enabled with {TIMINGS_ENV}.",
+    )
+
+
+def profile_arg(opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--profile",
+        nargs="?",
+        const="cpu",
+        choices=PROFILE_MODES,
+        help="Profile the CPU time (default) or the memory allocations of the "
+        "command. The profile is written to a file in the current directory "
+        "and summarized on stderr.",
+    )
+
+
+def boolean(value: str) -> bool:
+    if value.lower() in ("true", "yes", "on", "1"):
+        return True
+    if value.lower() in ("false", "no", "off", "0"):
+        return False
+    raise argparse.ArgumentTypeError(f"invalid boolean value: {value!r}")
+
+
+def positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid positive integer: {value!r}")
+    return number
+
+
+def persisted_queries_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--persisted-queries",
+        type=boolean,
+        metavar="{true,false}",
+        help="Send only the hashes of queries that CrateDB Cloud already knows.",
+    )
+
+
 def region_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
     opt_args.add_argument(
         "-r",
         "--region",
-        choices=["westeurope.azure", "eastus.azure", "eastus2.azure", "bregenz.a1"],
+        choices=REGIONS,
         type=str,
         help="Switch region that command will be run on.",
         required=False,
     )
 
 
+def region_list(value: str) -> List[str]:
+    regions = [region.strip() for region in value.split(",") if region.strip()]
+    if not regions:
+        raise argparse.ArgumentTypeError("expected at least one region")
+    for region in regions:
+        if region not in REGIONS:
+            choices = ", ".join(map(repr, REGIONS))
+            raise argparse.ArgumentTypeError(
+                f"invalid choice: {region!r} (choose from {choices})"
+            )
+    return list(dict.fromkeys(regions))
+
+
+def regions_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    exclusive = opt_args.add_mutually_exclusive_group()
+    exclusive.add_argument(
+        "-r",
+        "--region",
+        type=region_list,
+        metavar="REGION[,REGION...]",
+        help="Switch region(s) that command will be run on. "
+        f"Comma-separated list of: {', '.join(REGIONS)}.",
+        required=False,
+    )
+    exclusive.add_argument(
+        "--all-regions",
+        dest="region",
+        action="store_const",
+        const=REGIONS,
+        help="Run command on all regions.",
+    )
+
+
 def project_id_arg(
     req_args: _ArgumentGroup, opt_args: _ArgumentGroup, required: bool
 ) -> None:
@@ -222,6 +355,17 @@ def project_id_arg(
     )
 
 
+def project_id_or_name_arg(
+    req_args: _ArgumentGroup, opt_args: _ArgumentGroup, required: bool
+) -> None:
+    group = req_args if required else opt_args
+    exclusive = group.add_mutually_exclusive_group(required=required)
+    exclusive.add_argument("-p", "--project-id", type=str, help="Project ID.")
+    exclusive.add_argument(
+        "--project-name", type=str, help="Project name, instead of the ID."
+    )
+
+
 def project_name_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
     req_args.add_argument("--name", type=str, help="Project Name.", required=True)
 
@@ -230,12 +374,41 @@ def output_fmt_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
     opt_args.add_argument(
         "-o",
         "--output-fmt",
-        choices=["table", "json"],
+        choices=["table", "json", "ndjson", "csv", "tsv"],
         type=str,
         help="Switches output format.",
     )
 
 
+def pagination_args(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--page-size",
+        type=positive_int,
+        metavar="N",
+        help="Number of rows fetched per request.",
+    )
+    opt_args.add_argument(
+        "--limit",
+        type=positive_int,
+        metavar="N",
+        help="Maximum number of rows to fetch.",
+    )
+
+
+def cache_args(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    exclusive = opt_args.add_mutually_exclusive_group()
+    exclusive.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither use nor store cached responses.",
+    )
+    exclusive.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached responses and cache the new ones.",
+    )
+
+
 def org_id_arg(
     req_args: _ArgumentGroup, opt_args: _ArgumentGroup, required: bool
 ) -> None:
@@ -243,6 +416,17 @@ def org_id_arg(
     group.add_argument("--org-id", type=str, help="Organization ID.", required=required)
 
 
+def org_id_or_name_arg(
+    req_args: _ArgumentGroup, opt_args: _ArgumentGroup, required: bool
+) -> None:
+    group = req_args if required else opt_args
+    exclusive = group.add_mutually_exclusive_group(required=required)
+    exclusive.add_argument("--org-id", type=str, help="Organization ID.")
+    exclusive.add_argument(
+        "--org-name", type=str, help="Organization name, instead of the ID."
+    )
+
+
 def no_org_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
     opt_args.add_argument(
         "--no-org",
@@ -308,6 +492,54 @@ def user_id_or_email_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) ->
     )
 
 
+def user_id_or_email_or_file_arg(
+    req_args: _ArgumentGroup, opt_args: _ArgumentGroup
+) -> None:
+    exclusive = req_args.add_mutually_exclusive_group(required=True)
+    exclusive.add_argument("--user", type=str, help="User email address or ID")
+    exclusive.add_argument(
+        "--from-file",
+        type=str,
+        metavar="PATH",
+        help="CSV or JSON lines file with one row per user, or - for stdin, "
+        "instead of a single user.",
+    )
+
+
+def from_file_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--from-file",
+        type=str,
+        metavar="PATH",
+        help="CSV or JSON lines file with one row per execution, or - for stdin. "
+        "Options that are given apply to all rows.",
+    )
+
+
+def report_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--report",
+        type=str,
+        metavar="PATH",
+        help="Write the result of each row of --from-file as JSON lines to PATH.",
+    )
+
+
+def bulk_args(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--concurrency",
+        type=positive_int,
+        metavar="N",
+        help="Maximum number of concurrent requests for the rows of --from-file.",
+    )
+    opt_args.add_argument(
+        "--batch-size",
+        type=positive_int,
+        metavar="N",
+        help="Maximum number of rows of --from-file that are sent in one request.",
+    )
+
+
 def cluster_id_arg(
     req_args: _ArgumentGroup, opt_args: _ArgumentGroup, required: bool
 ) -> None:
@@ -317,6 +549,17 @@ def cluster_id_arg(
     )
 
 
+def cluster_id_or_name_arg(
+    req_args: _ArgumentGroup, opt_args: _ArgumentGroup, required: bool
+) -> None:
+    group = req_args if required else opt_args
+    exclusive = group.add_mutually_exclusive_group(required=required)
+    exclusive.add_argument("--cluster-id", type=str, help="CrateDB cluster ID")
+    exclusive.add_argument(
+        "--cluster-name", type=str, help="CrateDB cluster name, instead of the ID."
+    )
+
+
 def product_id_arg(
     req_args: _ArgumentGroup, opt_args: _ArgumentGroup, required: bool
 ) -> None:
@@ -435,6 +678,29 @@ def consumer_table_arg(
     )
 
 
+def socket_path_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--socket",
+        type=str,
+        help="Path of the Unix domain socket the daemon listens on.",
+    )
+
+
+def search_term_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    req_args.add_argument(
+        "term", type=str, help="ID, name or email address to search for."
+    )
+
+
+def resource_kind_arg(req_args: _ArgumentGroup, opt_args: _ArgumentGroup) -> None:
+    opt_args.add_argument(
+        "--kind",
+        choices=RESOURCE_KINDS,
+        action="append",
+        help="Only search resources of this kind. Can be given several times.",
+    )
+
+
 def format_usage(parser: ArgumentParser, depth: int, invalid_args=None) -> None:
     usage = parser.format_usage()
     args = list(filter(lambda arg: arg != "-h" and arg != "--help", sys.argv[:depth]))
@@ -17,12 +17,14 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
+import copy
 import os
 from argparse import Namespace
+from typing import Any, Optional, Tuple
 
 import yaml
 from appdirs import user_config_dir
-from schema import Schema, SchemaError
+from schema import Optional as OptionalKey, Or, Schema, SchemaError
 
 from croud.printer import print_error, print_info
 
@@ -46,11 +48,21 @@ class Configuration:
         },
         "region": "bregenz.a1",
         "output_fmt": "table",
+        "timeout": 300,
+        "connect_timeout": 30,
+        "read_timeout": 120,
+        "retries": 3,
+        "persisted_queries": False,
     }
     CONFIG_NAMES: dict = {
         "env": "Environment",
         "output_fmt": "Output format",
         "region": "Region",
+        "timeout": "Request timeout",
+        "connect_timeout": "Connect timeout",
+        "read_timeout": "Read timeout",
+        "retries": "Number of retries",
+        "persisted_queries": "Persisted queries",
     }
 
     current_context: str = ""
@@ -69,6 +81,13 @@ class Configuration:
                 },
                 "region": str,
                 "output_fmt": str,
+                # settings that have been added later are optional so that
+                # existing configuration files remain valid
+                OptionalKey("timeout"): Or(int, float),
+                OptionalKey("connect_timeout"): Or(int, float),
+                OptionalKey("read_timeout"): Or(int, float),
+                OptionalKey("retries"): int,
+                OptionalKey("persisted_queries"): bool,
             }
         )
         try:
@@ -90,18 +109,18 @@ class Configuration:
             load_config()
 
     @staticmethod
-    def get_setting(setting: str) -> str:
+    def get_setting(setting: str) -> Any:
         setting = setting.replace("-", "_")
         if setting == "env":
             return Configuration.get_env()
-        return load_config()[setting]
+        return load_settings().get(setting, Configuration.DEFAULT_CONFIG[setting])
 
     @staticmethod
     def get_env() -> str:
         if Configuration.current_context:
             return Configuration.current_context
 
-        config = load_config()
+        config = load_settings()
         return config["auth"]["current_context"]
 
     @staticmethod
@@ -116,8 +135,8 @@ class Configuration:
         write_config(config)
 
     @staticmethod
-    def get_token() -> str:
-        return get_auth_context().get("token", "")
+    def get_token(env: Optional[str] = None) -> str:
+        return get_auth_context(env).get("token", "")
 
     @staticmethod
     def set_token(token: str) -> None:
@@ -141,15 +160,53 @@ def create_default_config() -> None:
     os.chmod(Configuration.FILEPATH, 0o600)
 
 
+# The last loaded configuration, together with the path, modification time and
+# size of the file it was loaded from. It is reused as long as the file does
+# not change so that the configuration is only parsed once per process.
+_snapshot: Optional[Tuple[Tuple[str, int, int], dict]] = None
+
+
 def load_config() -> dict:
-    with open(Configuration.FILEPATH, "r") as f:
-        config = yaml.safe_load(f)
+    global _snapshot
+
+    try:
+        stat = os.stat(Configuration.FILEPATH)
+        key: Optional[Tuple[str, int, int]] = (
+            Configuration.FILEPATH,
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+    except OSError:
+        key = None
+
+    if key is None or _snapshot is None or _snapshot[0] != key:
+        with open(Configuration.FILEPATH, "r") as f:
+            config = yaml.safe_load(f)
+
+        try:
+            config = Configuration.validate(config)
+        except IncompatibleConfigException as e:
+            print_error(str(e))
+            exit(1)
 
+        if key is None:
+            return config
+        _snapshot = (key, config)
+
+    # callers are free to modify the returned configuration
+    return copy.deepcopy(_snapshot[1])
+
+
+def load_settings() -> dict:
+    """
+    Return the configuration, or the default configuration if there is no
+    configuration file, e.g. if croud is used from Python and has never been
+    run from the command line.
+    """
     try:
-        return Configuration.validate(config)
-    except IncompatibleConfigException as e:
-        print_error(str(e))
-        exit(1)
+        return load_config()
+    except FileNotFoundError:
+        return copy.deepcopy(Configuration.DEFAULT_CONFIG)
 
 
 def set_property(property: str, value: str):
@@ -159,14 +216,17 @@ def set_property(property: str, value: str):
 
 
 def write_config(config: dict) -> None:
+    global _snapshot
+
+    _snapshot = None
     with open(Configuration.FILEPATH, "w", encoding="utf8") as f:
         yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
 
 
-def get_auth_context() -> dict:
-    config = load_config()
+def get_auth_context(env: Optional[str] = None) -> dict:
+    config = load_settings()
 
-    context = Configuration.current_context
+    context = env or Configuration.current_context
     if not context:
         context = config["auth"]["current_context"]
 
@@ -181,6 +241,11 @@ def config_get(args: Namespace):
     print(Configuration.get_setting(args.get))
 
 
+# default arguments of all commands that apply to the invocation of a command
+# and are not settings
+_INVOCATION_ARGS = ("timings", "profile")
+
+
 def config_set(args: Namespace):
     """
     Sets a default configuration setting
@@ -189,6 +254,8 @@ def config_set(args: Namespace):
     for key in vars(args):
         setting = getattr(args, key)
 
+        if key in _INVOCATION_ARGS:
+            continue
         if setting is not None:
             if key == "env":
                 Configuration.set_context(setting)
@@ -18,15 +18,13 @@
 # software solely pursuant to the terms of the relevant commercial agreement.
 
 from argparse import Namespace
-from textwrap import dedent
 
-from croud.gql import Query, print_query
+from croud.gql import Query, document, print_query
+from croud.index.resolve import resolve_names
 from croud.util import clean_dict
 
-
-def consumer_sets_list(args: Namespace) -> None:
-    body = dedent(
-        """
+ALL_CONSUMER_SETS = document(
+    """
     query allConsumerSets($clusterId: String, $productId: String, $projectId: String) {
         allConsumerSets(clusterId: $clusterId, productId: $productId, projectId: $projectId) {
             id
@@ -44,9 +42,25 @@ def consumer_sets_list(args: Namespace) -> None:
             }
         }
     }
-    """  # noqa
-    ).strip()
+"""  # noqa
+)
+
+EDIT_CONSUMER_SET = document(
+    """
+    mutation editConsumerSet($id: String!, $input: EditConsumerSetInput!) {
+        editConsumerSet(
+            id: $id,
+            input: $input
+        ) {
+            id
+        }
+    }
+"""
+)
 
+
+def consumer_sets_list(args: Namespace) -> None:
+    resolve_names(args)
     vars = clean_dict(
         {
             "projectId": args.project_id,
@@ -55,25 +69,12 @@ def consumer_sets_list(args: Namespace) -> None:
         }
     )
 
-    query = Query(body, args, endpoint="/product/graphql")
+    query = Query(ALL_CONSUMER_SETS, args, endpoint="/product/graphql")
     query.execute(vars)
     print_query(query, "allConsumerSets")
 
 
 def consumer_sets_edit(args: Namespace) -> None:
-    body = dedent(
-        """
-    mutation editConsumerSet($id: String!, $input: EditConsumerSetInput!) {
-        editConsumerSet(
-            id: $id,
-            input: $input
-        ) {
-            id
-        }
-    }
-    """  # noqa
-    ).strip()
-
     vars = clean_dict(
         {
             "id": args.consumer_set_id,
@@ -94,6 +95,6 @@ def consumer_sets_edit(args: Namespace) -> None:
         }
     )
 
-    query = Query(body, args, endpoint="/product/graphql")
+    query = Query(EDIT_CONSUMER_SET, args, endpoint="/product/graphql")
     query.execute(vars)
     print_query(query, "editConsumerSet")
@@ -0,0 +1,102 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+import json
+import os
+import socket
+import sys
+from typing import List, Optional
+
+from croud.typing import JsonDict
+
+# Environment variable that makes ``croud`` forward commands to a daemon
+SOCKET_ENV = "CROUD_DAEMON_SOCKET"
+# The environment variables of the client that apply to a forwarded command
+ENV_PREFIX = "CROUD_"
+
+# Commands that cannot be executed by the daemon and always run locally
+LOCAL_COMMANDS = ("daemon", "login")
+# Arguments that read from stdin if their value is ``-``
+STDIN_ARGS = ("--from-file",)
+
+
+def send(path: str, message: JsonDict) -> JsonDict:
+    """Send a single message to the daemon and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def forward(path: str, argv: List[str]) -> Optional[int]:
+    """
+    Run the command given by ``argv`` in the daemon listening on ``path``, in
+    the current working directory and with the ``CROUD_*`` environment
+    variables of this process.
+
+    The output of the command is written as the daemon sends it. Returns the
+    exit status of the command, or ``None`` if the command has to be run
+    locally because it is not supported by the daemon, it reads from stdin or
+    the daemon is not running.
+    """
+    if len(argv) > 1 and argv[1] in LOCAL_COMMANDS or _reads_stdin(argv):
+        return None
+
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": {
+            name: value
+            for name, value in os.environ.items()
+            if name.startswith(ENV_PREFIX)
+        },
+    }
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+
+    with sock, sock.makefile("rb") as f:
+        try:
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            # the output of the command, until the message with its exit status
+            for line in f:
+                message = json.loads(line)
+                for name, stream in (("stdout", sys.stdout), ("stderr", sys.stderr)):
+                    if message.get(name):
+                        stream.write(message[name])
+                        stream.flush()
+                if "status" in message:
+                    return message["status"]
+        except OSError:
+            pass
+    print("The croud daemon closed the connection.", file=sys.stderr)
+    return 1
+
+
+def _reads_stdin(argv: List[str]) -> bool:
+    # the stdin of the daemon is not the one of the client
+    for arg, value in zip(argv, argv[1:] + [""]):
+        name, equals, inline = arg.partition("=")
+        if name in STDIN_ARGS and (inline if equals else value) == "-":
+            return True
+    return False
@@ -0,0 +1,91 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+import os
+import socket
+from argparse import Namespace
+from typing import Dict, Iterator
+
+from croud.cmd import CMD, import_call
+from croud.config import Configuration
+from croud.daemon.client import SOCKET_ENV, send
+from croud.daemon.server import DaemonServer
+from croud.printer import print_error, print_info
+
+
+def daemon_start(args: Namespace) -> None:
+    """
+    Starts a daemon that executes the commands forwarded by croud
+    """
+
+    path = args.socket or default_socket_path()
+    if os.path.exists(path):
+        if _is_listening(path):
+            print_error(f"A croud daemon is already listening on {path}.")
+            exit(1)
+        # left behind by a daemon that did not shut down gracefully
+        os.remove(path)
+
+    from croud.__main__ import command_tree
+
+    # Import all commands upfront so that no command pays for it when run
+    for call in _calls(command_tree):
+        import_call(call)
+
+    server = DaemonServer(path, CMD(command_tree))
+    print_info(f"Listening on {path}. Run `export {SOCKET_ENV}={path}` to use it.")
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+def daemon_stop(args: Namespace) -> None:
+    """
+    Stops a running daemon
+    """
+
+    path = args.socket or default_socket_path()
+    try:
+        send(path, {"shutdown": True})
+    except OSError:
+        print_error(f"No croud daemon is listening on {path}.")
+        exit(1)
+    print_info("The croud daemon has been stopped.")
+
+
+def default_socket_path() -> str:
+    return os.path.join(Configuration.USER_CONFIG_DIR, "croud.sock")
+
+
+def _is_listening(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def _calls(tree: Dict) -> Iterator:
+    for command in tree.values():
+        if "sub_commands" in command:
+            yield from _calls(command["sub_commands"])
+        else:
+            yield command["calls"]
@@ -0,0 +1,199 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+import io
+import json
+import os
+import socketserver
+import sys
+import time
+import traceback
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from typing import Callable, Dict, Iterator, List, Optional, cast
+
+from croud.__main__ import run
+from croud.cmd import CMD
+from croud.config import Configuration
+from croud.daemon.client import ENV_PREFIX
+from croud.typing import JsonDict
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server = cast(DaemonServer, self.server)
+        request = json.loads(self.rfile.readline())
+
+        if request.get("shutdown"):
+            server.running = False
+            self.send({"status": 0, "stdout": "", "stderr": ""})
+        else:
+            status = server.execute(
+                request["argv"], self.send, request.get("cwd"), request.get("env")
+            )
+            self.send({"status": status})
+
+    def send(self, message: JsonDict) -> None:
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+
+
+class OutputStream(io.TextIOBase):
+    """
+    Sends what is written to it as messages like ``{"stdout": "..."}``, a
+    line at a time, so that the output of a command reaches the client while
+    the command is running.
+    """
+
+    def __init__(self, name: str, send: Callable[[JsonDict], None]) -> None:
+        self.name = name
+        self._send = send
+        self._buffer = ""
+        self._closed = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        if "\n" in self._buffer:
+            end = self._buffer.rindex("\n") + 1
+            self._flush(self._buffer[:end])
+            self._buffer = self._buffer[end:]
+        return len(text)
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._flush(self._buffer)
+            self._buffer = ""
+
+    def _flush(self, text: str) -> None:
+        if self._closed:
+            return
+        try:
+            self._send({self.name: text})
+        except OSError:
+            # the client went away, the output of the command is discarded
+            self._closed = True
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """
+    Executes commands received over a Unix domain socket within a single,
+    long running process.
+
+    Commands are executed one at a time since their output is captured by
+    redirecting ``sys.stdout`` and ``sys.stderr``, and since they run in the
+    working directory and with the environment of the client.
+    """
+
+    def __init__(self, path: str, croud: CMD) -> None:
+        self.path = path
+        self.croud = croud
+        self.running = False
+        super().__init__(path, DaemonRequestHandler)
+        # The daemon acts with the credentials of the current user
+        os.chmod(path, 0o600)
+
+    def serve(self) -> None:
+        self.running = True
+        try:
+            while self.running:
+                self.handle_request()
+        finally:
+            self.server_close()
+            os.remove(self.path)
+
+    def execute(
+        self,
+        argv: List[str],
+        send: Callable[[JsonDict], None],
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        Execute a command and return its exit status. Its output is passed to
+        ``send`` while it is running.
+        """
+        stdout, stderr = OutputStream("stdout", send), OutputStream("stderr", send)
+        status = 0
+
+        # ``format_usage`` builds the usage message from ``sys.argv``
+        sys_argv = sys.argv
+        sys.argv = argv
+        try:
+            with _working_directory(cwd), _environment(env), redirect_stdout(
+                stdout
+            ), redirect_stderr(stderr):
+                try:
+                    # the configuration has been loaded when the daemon started
+                    start = time.perf_counter()
+                    resolver, arguments = self.croud.resolve(argv)
+                    if resolver:
+                        run(resolver, arguments, start, start)
+                except SystemExit as e:
+                    if isinstance(e.code, int):
+                        status = e.code
+                    elif e.code is not None:
+                        print(e.code, file=sys.stderr)
+                        status = 1
+                except Exception:
+                    traceback.print_exc()
+                    status = 1
+        except OSError as e:
+            # e.g. the working directory of the client does not exist
+            stderr.write(f"{e!s}\n")
+            status = 1
+        finally:
+            sys.argv = sys_argv
+            # Reset the context a command may have switched with ``--env``
+            Configuration.override_context("")
+            stdout.flush()
+            stderr.flush()
+
+        return status
+
+
+@contextmanager
+def _working_directory(path: Optional[str]) -> Iterator[None]:
+    # relative paths of a command are relative to the directory of the client
+    previous = os.getcwd()
+    if path:
+        os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+@contextmanager
+def _environment(env: Optional[Dict[str, str]]) -> Iterator[None]:
+    # the ``CROUD_*`` variables of the client replace the ones of the daemon
+    previous = {
+        name: value for name, value in os.environ.items() if name.startswith(ENV_PREFIX)
+    }
+    if env is not None:
+        for name in previous:
+            del os.environ[name]
+        os.environ.update(env)
+    try:
+        yield
+    finally:
+        if env is not None:
+            for name in env:
+                os.environ.pop(name, None)
+            os.environ.update(previous)
@@ -20,19 +20,88 @@
 # software solely pursuant to the terms of the relevant commercial agreement.
 
 import asyncio
+import functools
+import re
+import textwrap
 from argparse import Namespace
-from typing import Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from aiohttp import ClientError, ClientTimeout  # type: ignore
+
+from croud.cache import CachePolicy, cache_key, response_cache
 from croud.config import Configuration
-from croud.printer import print_error, print_format, print_info, print_success
-from croud.session import DEFAULT_ENDPOINT, HttpSession
+from croud.printer import (
+    print_error,
+    print_format,
+    print_info,
+    print_pages,
+    print_success,
+)
+from croud.session import (
+    DEFAULT_ENDPOINT,
+    SessionPool,
+    http_status,
+    is_mutation,
+    query_hash,
+    session_pool,
+)
 from croud.typing import JsonDict
+from croud.util import clean_dict
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_BATCH_SIZE = 10
+
+# The GraphQL documents of all commands by their operation name. A document is
+# registered when the module of its command is imported, so that it is
+# dedented, validated and hashed only once per process.
+DOCUMENTS: Dict[str, str] = {}
+# How the responses of the documents are cached, by their operation name.
+CACHE_POLICIES: Dict[str, CachePolicy] = {}
+_NOT_CACHED = CachePolicy(None, frozenset())
+
+
+def document(
+    text: str, ttl: Optional[float] = None, resources: Iterable[str] = ()
+) -> str:
+    """
+    Register a GraphQL document and return it dedented.
+
+    The document has to be a single, named query or mutation. All its inputs
+    need to be variables so that the document is the same for every
+    execution.
+
+    The response of a query with a ``ttl`` is cached on disk for ``ttl``
+    seconds. ``resources`` are the types of resources that the query reads,
+    or that the mutation modifies: a mutation invalidates the cached responses
+    of all queries that read any of its resources.
+    """
+    body = textwrap.dedent(text).strip()
+    operation = _OPERATION.match(body)
+    if operation is None or not operation.group(2):
+        raise ValueError("A document needs to be a single, named operation.")
+    name = operation.group(2)
+    if DOCUMENTS.setdefault(name, body) != body:
+        raise ValueError(f"A different document is registered as {name!r}.")
+    # precompute the hash of the document for persisted queries
+    query_hash(body)
+    if resources:
+        CACHE_POLICIES[name] = CachePolicy(ttl, frozenset(resources))
+    return body
 
 
 class Query:
-    def __init__(self, query: str, args: Namespace, endpoint=DEFAULT_ENDPOINT) -> None:
+    def __init__(
+        self,
+        query: str,
+        args: Namespace,
+        endpoint=DEFAULT_ENDPOINT,
+        token: Optional[str] = None,
+        pool: Optional[SessionPool] = None,
+    ) -> None:
         self._query = query
-        self._token = Configuration.get_token()
+        self._token = Configuration.get_token() if token is None else token
+        # the sessions of the process are used, unless a pool is given
+        self._pool = pool
 
         self._env = args.env or Configuration.get_env()
         self._output_fmt = (
@@ -40,36 +109,376 @@ class Query:
             and args.output_fmt
             or Configuration.get_setting("output_fmt")
         )
-        self._region = (
+        region = (
             hasattr(args, "region")  # certain commands do not have region
             and args.region
             or Configuration.get_setting("region")
         )
+        # list commands can be run against several regions at once
+        self._regions: List[str] = region if isinstance(region, list) else [region]
+        self._region = self._regions[0]
         self._endpoint = endpoint
+        self._timeout = ClientTimeout(
+            total=_setting(args, "timeout"),
+            connect=_setting(args, "connect_timeout"),
+            sock_read=_setting(args, "read_timeout"),
+        )
+        self._retries = _setting(args, "retries")
+        self._persisted = _setting(args, "persisted_queries")
+        # --refresh ignores cached responses, --no-cache also does not store
+        # the new ones
+        self._write_cache = not getattr(args, "no_cache", False)
+        self._read_cache = self._write_cache and not getattr(args, "refresh", False)
 
         self._error: Optional[str] = None
         self._response: Optional[JsonDict] = None
 
-    async def _fetch_data(self, body: str, variables: Optional[Dict]) -> JsonDict:
-        async with HttpSession(self._env, self._token, self._region) as session:
-            return await session.fetch(body, variables, endpoint=self._endpoint)
+    async def _fetch_data(
+        self, body: str, variables: Optional[Dict], region: Optional[str] = None
+    ) -> JsonDict:
+        region = region or self._region
+        ttl, resources = CACHE_POLICIES.get(_operation_name(body), _NOT_CACHED)
+        key = None
+        if ttl and self._write_cache:
+            key = cache_key(self._env, region, body, variables, self._token)
+            if self._read_cache:
+                cached = response_cache().get(key, resources)
+                if cached is not None:
+                    return cached
+
+        pool = self._pool or session_pool()
+        session = await pool.get(self._env, self._token, region)
+        response = await session.fetch(
+            body,
+            variables,
+            endpoint=self._endpoint,
+            timeout=self._timeout,
+            retries=self._retries,
+            persisted=self._persisted,
+        )
+
+        if resources and is_mutation(body):
+            # even a failed mutation may have modified some of the resources
+            response_cache().invalidate(resources)
+        elif ttl and key and "data" in response and "errors" not in response:
+            response_cache().put(key, resources, response, ttl)
+        return response
 
     def run(self, body: str, variables: Optional[Dict]) -> JsonDict:
         loop = asyncio.get_event_loop()
         return loop.run_until_complete(self._fetch_data(body, variables))
 
     def execute(self, variables: Dict = None):
-        response = self.run(self._query, variables)
-
-        if "errors" in response:
+        try:
+            response = self.run(self._query, variables)
+        except (asyncio.TimeoutError, ClientError) as e:
             self._response = None
-            self._error = response["errors"][0]["message"]
-        elif "data" in response:
-            self._response = response["data"]
-            self._error = None
-        else:
-            self._response = None
-            self._error = None
+            self._error = _request_error(e)
+            return
+
+        self._response, self._error = _parse_response(response)
+
+    def execute_many(
+        self,
+        variables: List[Dict],
+        concurrency: int,
+        batch_size: int = 1,
+    ) -> List[Tuple[Optional[JsonDict], Optional[str]]]:
+        """
+        Execute the query once for each of the ``variables``, with at most
+        ``concurrency`` requests at a time over the session of the query.
+
+        Up to ``batch_size`` executions are sent as one document, in which
+        each execution is an aliased copy of the query (see
+        :func:`batch_document`). If the server rejects a batch as a whole
+        before executing it, its executions are sent one by one instead. An
+        error of a batch of mutations that may have been executed (i.e. that
+        has data, or that is not the GraphQL result of a successful request),
+        but that does not belong to one of its operations, is the error of
+        all its executions, since they must not be applied twice.
+
+        Failed requests are retried by the session like those of
+        :meth:`execute`, i.e. mutations only if the connection could not be
+        established. Returns the data and the error (if any) of each
+        execution, in the order of the ``variables``.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(body: str, variables: Dict) -> Tuple[Optional[JsonDict], str]:
+            async with semaphore:
+                try:
+                    return await self._fetch_data(body, variables), ""
+                except (asyncio.TimeoutError, ClientError) as e:
+                    return None, _request_error(e)
+
+        async def execute(batch: List[Dict]) -> List:
+            if len(batch) == 1:
+                response, error = await request(self._query, batch[0])
+                if response is None:
+                    return [(None, error)]
+                return [_parse_response(response)]
+
+            body, key = batch_document(self._query, len(batch))
+            response, error = await request(body, batch_variables(batch))
+            if response is None:
+                return [(None, error)] * len(batch)
+
+            results = _split_response(response, key, len(batch))
+            if results is not None:
+                return results
+            if is_mutation(body) and (
+                response.get("data") is not None or http_status(response)
+            ):
+                # the error does not belong to a single operation, but some of
+                # the operations may have been applied already, e.g. before a
+                # gateway timed out
+                return [_parse_response(response)] * len(batch)
+            # the error does not belong to a single operation (e.g. one of the
+            # variables is invalid), so the operations are sent separately to
+            # find out which of them fail
+            single = await asyncio.gather(*(execute([v]) for v in batch))
+            return [result for results in single for result in results]
+
+        batch_size = max(batch_size, 1)
+        batches = [
+            variables[i : i + batch_size] for i in range(0, len(variables), batch_size)
+        ]
+        loop = asyncio.get_event_loop()
+        results = loop.run_until_complete(
+            asyncio.gather(*(execute(batch) for batch in batches))
+        )
+        return [result for batch in results for result in batch]
+
+    async def fetch(
+        self, variables: Optional[Dict] = None, region: Optional[str] = None
+    ) -> Tuple[Optional[JsonDict], Optional[str]]:
+        """
+        Execute the query in ``region`` (by default the region of the query)
+        and return its data and its error, if any.
+
+        Unlike :meth:`execute`, this is a coroutine, so that several queries
+        can be run concurrently, e.g. by the :mod:`croud.client`.
+        """
+        try:
+            response = await self._fetch_data(
+                self._query, variables, region or self._region
+            )
+        except (asyncio.TimeoutError, ClientError) as e:
+            return None, _request_error(e)
+        return _parse_response(response)
+
+    def pages(
+        self,
+        key: str,
+        variables: Optional[Dict] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        limit: Optional[int] = None,
+    ) -> Iterator[List[JsonDict]]:
+        """
+        Fetch the rows of a paginated query page by page.
+
+        The query needs to accept the ``$first`` and ``$after`` variables and
+        return the ``pageInfo`` of the connection next to its ``data``. At
+        most ``limit`` rows are fetched. If a request fails, the iteration
+        stops and the error is available in ``_error``.
+        """
+        cursor = None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            first = page_size if remaining is None else min(page_size, remaining)
+            self.execute(_page_variables(variables, first, cursor))
+            if self._error or not isinstance(self._response, dict):
+                return
+
+            rows, cursor = _page(self._response, key, first)
+            if rows:
+                yield rows
+            if remaining is not None:
+                remaining -= len(rows)
+            if cursor is None:
+                return
+
+    def fetch_regions(
+        self,
+        key: str,
+        variables: Optional[Dict] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, List[JsonDict], Optional[str]]]:
+        """
+        Fetch all rows of a paginated query from each region of the query.
+
+        The regions are queried concurrently, the pages of a single region one
+        after the other. Returns the region, its rows and its error (if any)
+        for each region, in the order of the regions. At most ``limit`` rows
+        are fetched per region.
+        """
+
+        async def fetch(region: str) -> Tuple[str, List[JsonDict], Optional[str]]:
+            rows, error = await self.fetch_rows(
+                key, variables, page_size, limit, region
+            )
+            return region, rows, error
+
+        loop = asyncio.get_event_loop()
+        return loop.run_until_complete(
+            asyncio.gather(*(fetch(region) for region in self._regions))
+        )
+
+    async def fetch_rows(
+        self,
+        key: str,
+        variables: Optional[Dict] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        limit: Optional[int] = None,
+        region: Optional[str] = None,
+    ) -> Tuple[List[JsonDict], Optional[str]]:
+        """
+        Fetch all rows of a paginated query in ``region`` (by default the
+        region of the query), like :meth:`pages` but as a coroutine. Returns
+        the rows and the error, if any. The rows that were fetched before an
+        error are returned as well.
+        """
+        rows: List[JsonDict] = []
+        cursor = None
+        while limit is None or len(rows) < limit:
+            first = page_size if limit is None else min(page_size, limit - len(rows))
+            data, error = await self.fetch(
+                _page_variables(variables, first, cursor), region
+            )
+            if error or not isinstance(data, dict):
+                return rows, error
+
+            page, cursor = _page(data, key, first)
+            rows.extend(page)
+            if cursor is None:
+                break
+        return rows, None
+
+
+_OPERATION = re.compile(
+    r"^\s*(query|mutation)\b\s*(\w*)\s*(?:\((.*?)\))?\s*\{(.*)\}\s*$", re.S
+)
+_FIELD = re.compile(r"\s*(?:(\w+)\s*:\s*)?(\w+)")
+_VARIABLE = re.compile(r"\$(\w+)")
+
+
+@functools.lru_cache(maxsize=None)
+def batch_document(document: str, size: int) -> Tuple[str, str]:
+    """
+    Combine ``size`` copies of a document into one document.
+
+    The document has to consist of a single operation with a single top level
+    field that has a selection set, like all documents of croud. Each copy of
+    the field gets the alias ``op<i>`` and each of its variables the suffix
+    ``_<i>`` (see :func:`batch_variables`). Returns the combined document and
+    the key of the field in the response of the original document.
+    """
+    operation = _OPERATION.match(document)
+    if operation is None:
+        raise ValueError("The document is not a single query or mutation.")
+    kind, name, definitions, body = operation.groups()
+    field = _FIELD.match(body)
+    if field is None or not _is_single_field(body):
+        raise ValueError("Only documents with a single top level field can be batched.")
+    key = field.group(1) or field.group(2)
+    # the field without its alias, e.g. "addRoleToUser(input: $input) {...}"
+    selection = body[field.start(2) :].strip()
+
+    header = f"{kind} {name}".strip()
+    if definitions:
+        copies = [
+            _VARIABLE.sub(rf"$\g<1>_{i}", definitions.strip()) for i in range(size)
+        ]
+        header += f"({', '.join(copies)})"
+    fields = "\n".join(
+        f"  op{i}: " + _VARIABLE.sub(rf"$\g<1>_{i}", selection) for i in range(size)
+    )
+    return f"{header} {{\n{fields}\n}}", key
+
+
+def batch_variables(variables: List[Dict]) -> Dict:
+    """
+    Combine the variables of the executions of a batch, see
+    :func:`batch_document`.
+    """
+    return {
+        f"{name}_{i}": value
+        for i, values in enumerate(variables)
+        for name, value in (values or {}).items()
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _operation_name(document: str) -> str:
+    operation = _OPERATION.match(document)
+    return operation.group(2) if operation else ""
+
+
+def _is_single_field(body: str) -> bool:
+    depth = 0
+    for i, char in enumerate(body):
+        if char in "({":
+            depth += 1
+        elif char in ")}":
+            depth -= 1
+            if depth == 0 and char == "}":
+                return not body[i + 1 :].strip()
+    return False
+
+
+def _split_response(
+    response: JsonDict, key: str, size: int
+) -> Optional[List[Tuple[Optional[JsonDict], Optional[str]]]]:
+    # Split the response of a batch into the results of its operations.
+    # Returns None if an error cannot be attributed to a single operation.
+    aliases = [f"op{i}" for i in range(size)]
+    errors: Dict[str, str] = {}
+    for error in response.get("errors") or []:
+        path = error.get("path") or [None]
+        if path[0] not in aliases:
+            return None
+        errors.setdefault(path[0], error["message"])
+
+    data = response.get("data") or {}
+    return [
+        (None, errors[alias]) if alias in errors else ({key: data.get(alias)}, None)
+        for alias in aliases
+    ]
+
+
+def _request_error(e: Exception) -> str:
+    if isinstance(e, asyncio.TimeoutError):
+        return "The request to CrateDB Cloud timed out."
+    return f"The request to CrateDB Cloud failed: {e!s}"
+
+
+def _parse_response(response: JsonDict) -> Tuple[Optional[JsonDict], Optional[str]]:
+    if "errors" in response:
+        return None, response["errors"][0]["message"]
+    if "data" in response:
+        return response["data"], None
+    return None, None
+
+
+def _page_variables(variables: Optional[Dict], first: int, cursor: Optional[str]):
+    return clean_dict({**(variables or {}), "first": first, "after": cursor})
+
+
+def _page(data: JsonDict, key: str, first: int) -> Tuple[List[JsonDict], Optional[str]]:
+    # returns the rows of the page and the cursor of the next page, if any
+    connection = data.get(key) or {}
+    rows = (connection.get("data") or [])[:first]
+    page_info = connection.get("pageInfo") or {}
+    if not rows or not page_info.get("hasNextPage"):
+        return rows, None
+    return rows, page_info["endCursor"]
+
+
+def _setting(args: Namespace, name: str) -> Any:
+    # certain commands do not have all arguments
+    value = getattr(args, name, None)
+    return Configuration.get_setting(name) if value is None else value
 
 
 def print_query(query: Query, key: str = None, success_message: str = None) -> None:
@@ -114,3 +523,49 @@ def print_query(query: Query, key: str = None, success_message: str = None) -> N
         print_info("Result contained no data to print.")
     else:
         print_format(data, query._output_fmt)
+
+
+def print_paginated(
+    query: Query,
+    key: str,
+    variables: Optional[Dict] = None,
+    args: Optional[Namespace] = None,
+) -> None:
+    """
+    Print the rows of a paginated query while its pages are being fetched.
+    The page size and the maximum number of rows are taken from ``args``.
+    """
+    page_size = getattr(args, "page_size", None) or DEFAULT_PAGE_SIZE
+    limit = getattr(args, "limit", None)
+
+    if len(query._regions) > 1:
+        _print_regions(query, key, variables, page_size, limit)
+        return
+
+    count = print_pages(
+        query.pages(key, variables, page_size, limit), query._output_fmt
+    )
+    if query._error:
+        print_error(query._error)
+    elif count == 0:
+        print_info("Result contained no data to print.")
+
+
+def _print_regions(
+    query: Query,
+    key: str,
+    variables: Optional[Dict],
+    page_size: int,
+    limit: Optional[int],
+) -> None:
+    # rows of all regions are printed together, with their region, and a
+    # failing region is reported without discarding the rows of the others
+    results = query.fetch_regions(key, variables, page_size, limit)
+    pages = [[{**row, "region": region} for row in rows] for region, rows, _ in results]
+    count = print_pages((page for page in pages if page), query._output_fmt)
+
+    errors = [(region, error) for region, _, error in results if error]
+    for region, error in errors:
+        print_error(f"{region}: {error}")
+    if count == 0 and not errors:
+        print_info("Result contained no data to print.")
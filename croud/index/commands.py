@@ -0,0 +1,82 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+from argparse import Namespace
+from typing import Dict, List
+
+from croud.config import Configuration
+from croud.index.sources import SOURCES, fetch_all
+from croud.index.store import Index
+from croud.printer import print_error, print_format, print_info
+
+
+def index_sync(args: Namespace) -> None:
+    """
+    Fetches all resources the user has access to into the local index
+    """
+
+    queries = {kind: source.query(args) for kind, source in SOURCES.items()}
+    resources: Dict[str, List[Dict]] = {kind: [] for kind in SOURCES}
+    synced: Dict[str, List[str]] = {kind: [] for kind in SOURCES}
+    for kind, region, rows, error in fetch_all(queries):
+        if error:
+            print_error(f"Could not fetch the {kind}s of {region}: {error}")
+            continue
+        resources[kind].extend(rows)
+        synced[kind].append(region)
+
+    env = queries["organization"]._env
+    summary = []
+    index = Index()
+    try:
+        for kind, source in SOURCES.items():
+            if not synced[kind]:
+                continue
+            # the resources of regions that were not synced are kept
+            regions = synced[kind] if source.regional else None
+            counts = index.sync(env, kind, resources[kind], regions)
+            summary.append({"kind": kind, **counts})
+    finally:
+        index.close()
+
+    if summary:
+        print_format(summary, queries["organization"]._output_fmt)
+
+
+def search(args: Namespace) -> None:
+    """
+    Searches the local index for resources by ID, name or email address
+    """
+
+    env = args.env or Configuration.get_env()
+    output_fmt = args.output_fmt or Configuration.get_setting("output_fmt")
+
+    index = Index()
+    try:
+        if index.count(env) == 0:
+            print_info("The index is empty. Use `croud index sync` to fill it.")
+            return
+        rows = index.search(env, args.term, args.kind)
+    finally:
+        index.close()
+
+    if rows:
+        print_format(rows, output_fmt)
+    else:
+        print_info("Result contained no data to print.")
@@ -0,0 +1,114 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+import time
+from argparse import Namespace
+from typing import Dict, List, Optional
+
+from croud.gql import Query
+from croud.index.sources import SOURCES, fetch_all
+from croud.index.store import Index
+from croud.printer import print_error
+
+# seconds after which the resources of a kind are fetched again to resolve a
+# name, even if the name is in the index
+NAME_TTL = 300
+
+# the name arguments, with the kind of resource they name and the argument
+# that takes the ID instead
+NAME_ARGS = {
+    "org_name": ("organization", "org_id"),
+    "project_name": ("project", "project_id"),
+    "cluster_name": ("cluster", "cluster_id"),
+}
+
+
+def resolve_names(args: Namespace, exact: bool = False) -> None:
+    """
+    Set the ID argument of each name argument that is given, e.g.
+    ``args.project_id`` for ``--project-name``.
+
+    The IDs are looked up in the local index, among the resources of the
+    regions of the command. The resources of a kind are only fetched into the
+    index if the name is not found or if they have not been synced within
+    :data:`NAME_TTL` seconds. All kinds that need to be fetched are fetched
+    concurrently. Exits if a name does not belong to exactly one resource.
+
+    Names are compared ignoring case if no resource matches exactly, unless
+    ``exact`` is set, which commands that modify a resource should do.
+    """
+    names = {
+        kind: (getattr(args, name_arg), id_arg)
+        for name_arg, (kind, id_arg) in NAME_ARGS.items()
+        if getattr(args, name_arg, None)
+    }
+    if not names:
+        return
+
+    queries = {kind: SOURCES[kind].query(args) for kind in names}
+    index = Index()
+    try:
+        ids = {
+            kind: _lookup(index, kind, name, queries[kind], exact)
+            for kind, (name, _) in names.items()
+        }
+        missing = {kind: queries[kind] for kind, found in ids.items() if not found}
+        if missing:
+            _sync(index, missing)
+            for kind, query in missing.items():
+                ids[kind] = index.lookup(
+                    query._env, kind, names[kind][0], _regions(kind, query), exact
+                )
+    finally:
+        index.close()
+
+    for kind, (name, id_arg) in names.items():
+        if not ids[kind]:
+            print_error(f"There is no {kind} named {name!r}.")
+            exit(1)
+        if len(ids[kind]) > 1:
+            print_error(
+                f"There are several {kind}s named {name!r}, use the ID of one of "
+                f"them instead: {', '.join(ids[kind])}"
+            )
+            exit(1)
+        setattr(args, id_arg, ids[kind][0])
+
+
+def _lookup(index: Index, kind: str, name: str, query: Query, exact: bool) -> List[str]:
+    # a name is only looked up if the index has been synced recently enough
+    regions = _regions(kind, query)
+    synced_at = index.synced_at(query._env, kind, regions)
+    if synced_at is None or synced_at < time.time() - NAME_TTL:
+        return []
+    return index.lookup(query._env, kind, name, regions, exact)
+
+
+def _regions(kind: str, query: Query) -> Optional[List[str]]:
+    source = SOURCES[kind]
+    return source.regions(query) if source.regional else None
+
+
+def _sync(index: Index, queries: Dict[str, Query]) -> None:
+    for kind, region, resources, error in fetch_all(queries):
+        if error:
+            print_error(f"Could not fetch the {kind}s of {region}: {error}")
+            exit(1)
+        regions = [region] if SOURCES[kind].regional else None
+        index.sync(queries[kind]._env, kind, resources, regions)
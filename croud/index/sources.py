@@ -0,0 +1,151 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+import asyncio
+import importlib
+from argparse import Namespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from croud.gql import Query
+from croud.typing import JsonDict
+
+
+class Source:
+    """
+    Where the resources of a kind are fetched from, and how their rows are
+    turned into resources of the index.
+
+    The document is referenced as ``"module.path:ATTRIBUTE"``, like the
+    ``calls`` of the command tree, since the modules of the commands that
+    resolve names import the index themselves.
+    """
+
+    def __init__(
+        self,
+        document: str,
+        key: str,
+        resource: Callable[[JsonDict, str], Dict],
+        regional: bool = True,
+        paginated: bool = True,
+        endpoint: str = "/graphql",
+    ) -> None:
+        self.document = document
+        self.key = key
+        self.resource = resource
+        self.regional = regional
+        self.paginated = paginated
+        self.endpoint = endpoint
+
+    def query(self, args: Namespace) -> Query:
+        # the index must not be synced from cached responses
+        args = Namespace(**{**vars(args), "refresh": True})
+        module_name, _, attribute = self.document.partition(":")
+        document = getattr(importlib.import_module(module_name), attribute)
+        return Query(document, args, endpoint=self.endpoint)
+
+    def regions(self, query: Query) -> List[str]:
+        return query._regions if self.regional else [query._region]
+
+    def resources(self, rows: List[JsonDict], region: str) -> List[Dict]:
+        return [{**self.resource(row, region), "data": row} for row in rows]
+
+    async def fetch(
+        self, query: Query, region: str
+    ) -> Tuple[List[JsonDict], Optional[str]]:
+        if self.paginated:
+            return await query.fetch_rows(self.key, region=region)
+        data, error = await query.fetch(region=region)
+        return (data or {}).get(self.key) or [], error
+
+
+SOURCES = {
+    "organization": Source(
+        "croud.organizations.commands:ALL_ORGANIZATIONS",
+        "allOrganizations",
+        lambda row, region: {"id": row["id"], "name": row["name"]},
+        regional=False,
+    ),
+    "project": Source(
+        "croud.projects.commands:ALL_PROJECTS",
+        "allProjects",
+        lambda row, region: {
+            "id": row["id"],
+            "name": row["name"],
+            "region": row.get("region") or region,
+            "organization_id": row.get("organizationId"),
+        },
+    ),
+    "cluster": Source(
+        "croud.clusters.commands:ALL_CLUSTERS",
+        "allClusters",
+        lambda row, region: {
+            "id": row["id"],
+            "name": row["name"],
+            "region": region,
+            "project_id": row.get("projectId"),
+        },
+    ),
+    "user": Source(
+        "croud.users.commands:ALL_USERS",
+        "allUsers",
+        lambda row, region: {
+            "id": row["uid"],
+            "name": row.get("username"),
+            "email": row.get("email"),
+        },
+        regional=False,
+    ),
+    "consumer-set": Source(
+        "croud.consumersets.commands:ALL_CONSUMER_SETS",
+        "allConsumerSets",
+        lambda row, region: {
+            "id": row["id"],
+            "name": row["name"],
+            "region": region,
+            "project_id": row.get("projectId"),
+        },
+        paginated=False,
+        endpoint="/product/graphql",
+    ),
+}
+
+
+def fetch_all(
+    queries: Dict[str, Query]
+) -> List[Tuple[str, str, List[Dict], Optional[str]]]:
+    """
+    Fetch the resources of several kinds, from all regions of their queries,
+    concurrently. Returns the kind, the region, the resources and the error
+    (if any) of each fetch.
+    """
+    fetches = [
+        (kind, region)
+        for kind, query in queries.items()
+        for region in SOURCES[kind].regions(query)
+    ]
+    loop = asyncio.get_event_loop()
+    results = loop.run_until_complete(
+        asyncio.gather(
+            *(SOURCES[kind].fetch(queries[kind], region) for kind, region in fetches)
+        )
+    )
+    return [
+        (kind, region, SOURCES[kind].resources(rows, region), error)
+        for (kind, region), (rows, error) in zip(fetches, results)
+    ]
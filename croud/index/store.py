@@ -0,0 +1,225 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from appdirs import user_cache_dir
+
+from croud.typing import JsonDict
+
+INDEX_PATH: str = os.path.join(user_cache_dir("Crate"), "croud", "index.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    env TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    email TEXT,
+    region TEXT,
+    organization_id TEXT,
+    project_id TEXT,
+    data TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (env, kind, id)
+);
+CREATE INDEX IF NOT EXISTS resources_id ON resources (env, id);
+CREATE INDEX IF NOT EXISTS resources_name ON resources (env, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS resources_email ON resources (env, email COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS syncs (
+    env TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    region TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (env, kind, region)
+);
+"""
+
+COLUMNS = ["id", "name", "email", "region", "organization_id", "project_id"]
+
+
+class Index:
+    """
+    A local SQLite database of the resources of CrateDB Cloud, so that they
+    can be looked up without a request to CrateDB Cloud.
+
+    Each resource is a row with the columns it can be looked up by and the
+    data it was synced from. The resources of each environment are kept
+    separately.
+    """
+
+    def __init__(self, path: str = INDEX_PATH) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def sync(
+        self,
+        env: str,
+        kind: str,
+        resources: Sequence[Dict],
+        regions: Optional[Iterable[Optional[str]]] = None,
+    ) -> Dict[str, int]:
+        """
+        Replace the resources of a kind by ``resources``, which are dicts with
+        the keys of :data:`COLUMNS` and any further data of the resource. Only
+        rows whose data changed are written.
+
+        If ``regions`` are given, only the resources of these regions are
+        replaced, the ones of other regions are kept. Returns the number of
+        added, updated, removed and unchanged resources.
+        """
+        sql = "SELECT id, data, region FROM resources WHERE env = ? AND kind = ?"
+        existing = {
+            row["id"]: row
+            for row in self.connection.execute(sql, (env, kind))
+            if regions is None or row["region"] in regions
+        }
+
+        now = time.time()
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        changed = []
+        for resource in resources:
+            data = json.dumps(resource, sort_keys=True)
+            row = existing.pop(resource["id"], None)
+            if row is not None and row["data"] == data:
+                counts["unchanged"] += 1
+                continue
+            counts["added" if row is None else "updated"] += 1
+            values = [resource.get(column) for column in COLUMNS]
+            changed.append((env, kind, *values, data, now))
+        counts["removed"] = len(existing)
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?, ?)",
+                [(env, kind, region or "", now) for region in regions or [None]],
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO resources (env, kind, "
+                + ", ".join(COLUMNS)
+                + ", data, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                changed,
+            )
+            self.connection.executemany(
+                "DELETE FROM resources WHERE env = ? AND kind = ? AND id = ?",
+                [(env, kind, id) for id in existing],
+            )
+        return counts
+
+    def search(
+        self, env: str, term: str, kinds: Optional[Sequence[str]] = None
+    ) -> List[JsonDict]:
+        """
+        Return the resources whose ID, name or email contains ``term``
+        (ignoring case), exact matches first.
+        """
+        pattern = "%" + _escape(term) + "%"
+        sql = (
+            "SELECT kind, " + ", ".join(COLUMNS) + " FROM resources"
+            " WHERE env = ?"
+            " AND (id LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\'"
+            " OR email LIKE ? ESCAPE '\\')"
+        )
+        params: List = [env, pattern, pattern, pattern]
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        sql += (
+            " ORDER BY (id = ? OR ifnull(name, '') = ? COLLATE NOCASE"
+            " OR ifnull(email, '') = ? COLLATE NOCASE) DESC, kind, name, id"
+        )
+        params.extend([term, term, term])
+        return [_resource(row) for row in self.connection.execute(sql, params)]
+
+    def lookup(
+        self,
+        env: str,
+        kind: str,
+        name: str,
+        regions: Optional[Iterable[str]] = None,
+        exact: bool = False,
+    ) -> List[str]:
+        """
+        Return the IDs of the resources of a kind with the given name, only of
+        the ``regions`` if they are given. Names are compared ignoring case,
+        unless some resources match exactly or ``exact`` is set.
+        """
+        sql = (
+            "SELECT id, name FROM resources"
+            " WHERE env = ? AND kind = ? AND name = ? COLLATE NOCASE"
+        )
+        params: List = [env, kind, name]
+        if regions is not None:
+            regions = list(regions)
+            sql += f" AND region IN ({', '.join('?' for _ in regions)})"
+            params.extend(regions)
+        rows = self.connection.execute(sql + " ORDER BY id", params).fetchall()
+        matches = [row["id"] for row in rows if row["name"] == name]
+        if matches or exact:
+            return matches
+        return [row["id"] for row in rows]
+
+    def synced_at(
+        self, env: str, kind: str, regions: Optional[Iterable[Optional[str]]] = None
+    ) -> Optional[float]:
+        """
+        Return when the resources of a kind were last synced, or when the
+        least recently synced of the ``regions`` was. Returns None if they
+        have never been synced.
+        """
+        regions = [region or "" for region in regions or [None]]
+        sql = (
+            "SELECT count(*), min(synced_at) FROM syncs WHERE env = ? AND kind = ?"
+            f" AND region IN ({', '.join('?' for _ in regions)})"
+        )
+        count, synced_at = self.connection.execute(
+            sql, (env, kind, *regions)
+        ).fetchone()
+        return synced_at if count == len(set(regions)) else None
+
+    def count(self, env: str) -> int:
+        sql = "SELECT count(*) FROM resources WHERE env = ?"
+        return self.connection.execute(sql, (env,)).fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def _escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _resource(row: sqlite3.Row) -> JsonDict:
+    # the columns as they are named by the API
+    return {
+        "kind": row["kind"],
+        "id": row["id"],
+        "name": row["name"],
+        "email": row["email"],
+        "region": row["region"],
+        "organizationId": row["organization_id"],
+        "projectId": row["project_id"],
+    }
@@ -20,6 +20,7 @@
 import asyncio
 from argparse import Namespace
 
+from croud.cache import response_cache
 from croud.config import Configuration
 from croud.printer import print_info
 from croud.session import HttpSession, cloud_url
@@ -37,6 +38,7 @@ def logout(args: Namespace) -> None:
 
     loop.run_until_complete(make_request(env, token))
     Configuration.set_token("")
+    response_cache().clear()
 
     print_info("You have been logged out.")
 
@@ -19,7 +19,20 @@
 
 from argparse import Namespace
 
-from croud.gql import Query, print_query
+from croud.gql import Query, document, print_query
+
+ME = document(
+    """
+    query me {
+        me {
+            email
+            username
+        }
+    }
+""",
+    ttl=300,
+    resources=["user"],
+)
 
 
 def me(args: Namespace) -> None:
@@ -27,15 +40,6 @@ def me(args: Namespace) -> None:
     Prints the current logged in user
     """
 
-    _query = """
-{
-    me {
-        email
-        username
-    }
-}
-    """
-
-    query = Query(_query, args)
+    query = Query(ME, args)
     query.execute()
     print_query(query, "me")
@@ -19,40 +19,25 @@
 
 from argparse import Namespace
 
-from croud.gql import Query, print_query
+from croud.gql import Query, document, print_paginated, print_query
 
-
-def organizations_create(args: Namespace) -> None:
-    """
-    Creates an organization
+CREATE_ORGANIZATION = document(
     """
-
-    _query = f"""
-    mutation {{
-        createOrganization(input: {{
-            name: "{args.name}",
-            planType: {args.plan_type}
-        }}) {{
+    mutation createOrganization($input: CreateOrganizationInput!) {
+        createOrganization(input: $input) {
             id
             name
             planType
-        }}
-    }}
-    """
-
-    query = Query(_query, args)
-    query.execute()
-    print_query(query, "createOrganization")
-
+        }
+    }
+""",
+    resources=["organization"],
+)
 
-def organizations_list(args: Namespace) -> None:
+ALL_ORGANIZATIONS = document(
     """
-    Lists organizations
-    """
-
-    _query = """
-    {
-        allOrganizations {
+    query allOrganizations($first: Int, $after: String) {
+        allOrganizations(first: $first, after: $after) {
             data {
                 id,
                 name,
@@ -64,10 +49,34 @@ def organizations_list(args: Namespace) -> None:
                     }
                 }
             }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
         }
     }
+""",
+    ttl=60,
+    resources=["organization"],
+)
+
+
+def organizations_create(args: Namespace) -> None:
+    """
+    Creates an organization
+    """
+
+    vars = {"input": {"name": args.name, "planType": args.plan_type}}
+
+    query = Query(CREATE_ORGANIZATION, args)
+    query.execute(vars)
+    print_query(query, "createOrganization")
+
+
+def organizations_list(args: Namespace) -> None:
+    """
+    Lists organizations
     """
 
-    query = Query(_query, args)
-    query.execute()
-    print_query(query, "allOrganizations")
+    query = Query(ALL_ORGANIZATIONS, args)
+    print_paginated(query, "allOrganizations", args=args)
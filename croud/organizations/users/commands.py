@@ -20,49 +20,88 @@
 # software solely pursuant to the terms of the relevant commercial agreement.
 
 
-import textwrap
 from argparse import Namespace
+from typing import Dict, Optional
 
-from croud.gql import Query, print_query
+from croud.bulk import execute_from_file
+from croud.gql import Query, document, print_query
+from croud.index.resolve import resolve_names
 
-
-def org_users_add(args: Namespace):
-    mutation = textwrap.dedent(
-        """
-        mutation addUserToOrganization($input: AddUserToOrganizationInput!) {
-          addUserToOrganization(input: $input) {
-            user {
-              uid
-              email
-              organizationId
-            }
-          }
+ADD_USER_TO_ORGANIZATION = document(
+    """
+    mutation addUserToOrganization($input: AddUserToOrganizationInput!) {
+      addUserToOrganization(input: $input) {
+        user {
+          uid
+          email
+          organizationId
         }
+      }
+    }
+""",
+    resources=["organization", "project"],
+)
+
+REMOVE_USER_FROM_ORGANIZATION = document(
     """
-    ).strip()
+    mutation removeUserFromOrganization($input: RemoveUserFromOrganizationInput!) {
+      removeUserFromOrganization(input: $input) {
+        success
+      }
+    }
+""",
+    resources=["organization", "project"],
+)
 
-    vars = {"input": {"user": args.user, "organizationId": args.org_id}}
-    if args.role is not None:
-        vars["input"]["roleFqn"] = args.role
 
-    query = Query(mutation, args)
+def org_users_add(args: Namespace):
+    resolve_names(args, exact=True)
+    query = Query(ADD_USER_TO_ORGANIZATION, args)
+    if args.from_file:
+        execute_from_file(
+            query,
+            "addUserToOrganization",
+            args,
+            ["user"],
+            lambda row: _add_variables(
+                row["user"],
+                row.get("org_id") or args.org_id,
+                row.get("role") or args.role,
+            ),
+        )
+        return
+
+    vars = _add_variables(args.user, args.org_id, args.role)
     query.execute(vars)
     print_query(query, "addUserToOrganization")
 
 
 def org_users_remove(args: Namespace):
-    mutation = textwrap.dedent(
-        """
-        mutation removeUserFromOrganization($input: RemoveUserFromOrganizationInput!) {
-          removeUserFromOrganization(input: $input) {
-            success
-          }
-        }
-    """
-    ).strip()
-
-    vars = {"input": {"user": args.user, "organizationId": args.org_id}}
+    resolve_names(args, exact=True)
+    query = Query(REMOVE_USER_FROM_ORGANIZATION, args)
+    if args.from_file:
+        execute_from_file(
+            query,
+            "removeUserFromOrganization",
+            args,
+            ["user"],
+            lambda row: _remove_variables(
+                row["user"], row.get("org_id") or args.org_id
+            ),
+        )
+        return
 
-    query = Query(mutation, args)
+    vars = _remove_variables(args.user, args.org_id)
     query.execute(vars)
     print_query(query, "removeUserFromOrganization")
+
+
+def _add_variables(user: str, org_id: Optional[str], role: Optional[str]) -> Dict:
+    vars = {"input": {"user": user, "organizationId": org_id}}
+    if role:
+        vars["input"]["roleFqn"] = role
+    return vars
+
+
+def _remove_variables(user: str, org_id: Optional[str]) -> Dict:
+    return {"input": {"user": user, "organizationId": org_id}}
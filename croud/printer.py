@@ -17,18 +17,36 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
+import csv
 import json
-from typing import List, Union
+import sys
+import textwrap
+from typing import Dict, Iterable, List, Optional, Sequence, Union
 
 from colorama import Fore, Style
-from tabulate import tabulate
 
+from croud.table import TableSpool, psql_table
+from croud.timings import excluded, measure
 from croud.typing import JsonDict
 
+# values that are displayed as they are
+_PLAIN_TYPES = {str, int, float, type(None)}
+_BOOLEAN_TYPES = {bool, type(None)}
+# creating an encoder for every nested value is fairly expensive
+_NESTED_ENCODER = json.JSONEncoder(sort_keys=True, ensure_ascii=False)
+
 
 def print_format(rows: Union[List[JsonDict], JsonDict], format: str = "json") -> None:
     printer = FormatPrinter()
-    printer.print_rows(rows, format)
+    with measure("render"):
+        printer.print_rows(rows, format)
+
+
+def print_pages(pages: Iterable[List[JsonDict]], format: str = "json") -> int:
+    printer = FormatPrinter()
+    with measure("render"):
+        # the pages are fetched while they are printed
+        return printer.print_pages(excluded("render", pages), format)
 
 
 def print_error(text: str):
@@ -46,27 +64,144 @@ def print_success(text: str):
 class FormatPrinter:
     def __init__(self):
         self.supported_formats: dict = {"json": self._json, "table": self._tabular}
+        # formats that print row by row and thus can print rows before all
+        # rows are known
+        self.streaming_formats: dict = {
+            "json": self._json_stream,
+            "ndjson": self._ndjson_stream,
+            "csv": self._csv_stream,
+            "tsv": self._tsv_stream,
+        }
 
     def print_rows(self, rows: Union[List[JsonDict], JsonDict], format: str) -> None:
-        try:
-            print_method = self.supported_formats[format]
-        except KeyError as e:
-            print_error(f"This print method is not supported: {e!s}")
+        if format in self.supported_formats:
+            print(self.supported_formats[format](rows))
+        elif format in self.streaming_formats:
+            self.streaming_formats[format]([rows if isinstance(rows, list) else [rows]])
+        else:
+            print_error(f"This print method is not supported: {format!r}")
+            exit(1)
+
+    def print_pages(self, pages: Iterable[List[JsonDict]], format: str) -> int:
+        """
+        Print rows that are fetched page by page and return the number of rows.
+
+        Streaming formats print each page as soon as it is available, the
+        output is the same as if all rows were printed with ``print_rows``.
+        """
+        if (
+            format not in self.supported_formats
+            and format not in self.streaming_formats
+        ):
+            print_error(f"This print method is not supported: {format!r}")
             exit(1)
-        print(print_method(rows))
+
+        if format in self.streaming_formats:
+            return self.streaming_formats[format](pages)
+
+        if format == "table":
+            return self._tabular_stream(pages)
+
+        rows = [row for page in pages for row in page]
+        if rows:
+            self.print_rows(rows, format)
+        return len(rows)
 
     def _transform_field(self, field):
         """transform field for displaying"""
         if isinstance(field, (list, dict)):
-            return json.dumps(field, sort_keys=True, ensure_ascii=False)
+            return _NESTED_ENCODER.encode(field)
         elif isinstance(field, bool):
             return "TRUE" if field else "FALSE"
         else:
             return field
 
+    def _transform_column(self, values: Sequence) -> List:
+        """
+        Transform the values of a column for displaying, like
+        ``_transform_field`` does for a single value.
+
+        The types of the values are only looked at once per column, so that
+        columns of plain values are not transformed at all. A nested value
+        that several rows share, e.g. after the rows were copied to add a
+        field, is only serialized once.
+        """
+        types = set(map(type, values))
+        if types <= _PLAIN_TYPES:
+            return list(values)
+        if types <= _BOOLEAN_TYPES:
+            return [None if v is None else "TRUE" if v else "FALSE" for v in values]
+
+        # keyed by identity, which is cheap, unlike comparing the values; the
+        # values are referenced by ``values`` so their ids are not reused
+        serialized: Dict[int, str] = {}
+
+        def transform(value):
+            if isinstance(value, (list, dict)):
+                result = serialized.get(id(value))
+                if result is None:
+                    result = serialized[id(value)] = _NESTED_ENCODER.encode(value)
+                return result
+            return self._transform_field(value)
+
+        return list(map(transform, values))
+
+    def _transform_rows(self, rows: List[JsonDict], headers: List[str]) -> List:
+        """
+        Return the transformed values of ``headers`` of each row.
+        """
+        columns = [
+            self._transform_column([row[header] for row in rows]) for header in headers
+        ]
+        return list(zip(*columns))
+
     def _json(self, rows: Union[List[JsonDict], JsonDict]) -> str:
         return json.dumps(rows, sort_keys=False, indent=2)
 
+    def _json_stream(self, pages: Iterable[List[JsonDict]]) -> int:
+        count = 0
+        for page in pages:
+            for row in page:
+                print(",\n" if count else "[\n", end="")
+                print(textwrap.indent(self._json(row), "  "), end="")
+                count += 1
+            sys.stdout.flush()
+        if count:
+            print("\n]")
+        return count
+
+    def _ndjson_stream(self, pages: Iterable[List[JsonDict]]) -> int:
+        count = 0
+        for page in pages:
+            for row in page:
+                print(json.dumps(row, ensure_ascii=False))
+                count += 1
+            sys.stdout.flush()
+        return count
+
+    def _csv_stream(self, pages: Iterable[List[JsonDict]], delimiter=",") -> int:
+        writer = csv.writer(sys.stdout, delimiter=delimiter, lineterminator="\n")
+        headers: List[str] = []
+        count = 0
+        for page in pages:
+            if not page:
+                continue
+            if not headers:
+                headers = list(map(str, page[0].keys()))
+                writer.writerow(headers)
+            # rows may lack some of the columns of the first row
+            columns = [
+                self._transform_column([row.get(header) for row in page])
+                for header in headers
+            ]
+            writer.writerows(zip(*columns))
+            count += len(page)
+            sys.stdout.flush()
+        return count
+
+    def _tsv_stream(self, pages: Iterable[List[JsonDict]]) -> int:
+        return self._csv_stream(pages, delimiter="\t")
+
     def _tabular(self, rows: Union[List[JsonDict], JsonDict]) -> str:
         if isinstance(rows, list):
             # ensure that keys are mapped to their values
@@ -82,11 +217,28 @@ class FormatPrinter:
             # | bar |   2 |
             # +-----+-----+
             headers = list(map(str, iter(rows[0].keys())))
-            values = [
-                [self._transform_field(row[header]) for header in headers]
-                for row in rows
-            ]
+            values = self._transform_rows(rows, headers)
         else:
             headers = list(map(str, iter(rows.keys())))
-            values = [list(map(self._transform_field, rows.values()))]
-        return tabulate(values, headers=headers, tablefmt="psql", missingval="NULL")
+            values = self._transform_rows([rows], headers)
+        return psql_table(headers, values)
+
+    def _tabular_stream(self, pages: Iterable[List[JsonDict]]) -> int:
+        # the rows are kept in a temporary file until the widths of all
+        # columns are known
+        spool: Optional[TableSpool] = None
+        try:
+            for page in pages:
+                if not page:
+                    continue
+                if spool is None:
+                    spool = TableSpool(list(map(str, iter(page[0].keys()))))
+                spool.add(self._transform_rows(page, spool.headers))
+            if spool is None:
+                return 0
+            for chunk in spool.render():
+                print(chunk)
+            return spool.rows
+        finally:
+            if spool is not None:
+                spool.close()
@@ -17,43 +17,42 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
-import textwrap
 from argparse import Namespace
 
-from croud.gql import Query, print_query
+from croud.gql import Query, document, print_query
 from croud.util import clean_dict
 
+CREATE_PRODUCT = document(
+    """
+    mutation createProduct(
+        $name: String!
+        $projectId: String!
+        $tier: String!
+        $unit: Int
+        $cluster: CreateClusterInput!
+        $consumer: CreateConsumerSetInput!
+    ) {
+        createProduct(
+            name: $name
+            projectId: $projectId
+            tier: $tier
+            unit: $unit
+            cluster: $cluster
+            consumer: $consumer
+        ) {
+            id
+            url
+        }
+    }
+"""
+)
+
 
 def product_deploy(args: Namespace) -> None:
     """
     Deploy a new CrateDB Cloud for Azure IoT product.
     """
 
-    mutation = textwrap.dedent(
-        """
-        mutation createProduct(
-            $name: String!
-            $projectId: String!
-            $tier: String!
-            $unit: Int
-            $cluster: CreateClusterInput!
-            $consumer: CreateConsumerSetInput!
-        ) {
-            createProduct(
-                name: $name
-                projectId: $projectId
-                tier: $tier
-                unit: $unit
-                cluster: $cluster
-                consumer: $consumer
-            ) {
-                id
-                url
-            }
-        }
-    """
-    ).strip()
-
     vars = clean_dict(
         {
             "tier": args.tier,
@@ -80,6 +79,6 @@ def product_deploy(args: Namespace) -> None:
         }
     )
 
-    query = Query(mutation, args, endpoint="/product/graphql")
+    query = Query(CREATE_PRODUCT, args, endpoint="/product/graphql")
     query.execute(vars)
     print_query(query, "createProduct")
@@ -0,0 +1,95 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+"""
+Profile a command with ``--profile``.
+
+``cpu`` profiles the command with cProfile and writes the statistics to a
+``.prof`` file, which can be inspected with :mod:`pstats` or tools like
+snakeviz. ``mem`` traces the memory allocations of the command with
+tracemalloc and writes a snapshot to a ``.snapshot`` file, which can be
+loaded with :meth:`tracemalloc.Snapshot.load`. In both cases the top entries
+are printed to stderr as well.
+"""
+
+import sys
+import time
+from typing import Callable, TypeVar
+
+PROFILE_MODES = ["cpu", "mem"]
+# the number of entries of the summary on stderr
+PROFILE_TOP = 20
+# the number of frames that are stored per memory allocation
+TRACEBACK_LIMIT = 25
+
+T = TypeVar("T")
+
+
+def profile(mode: str, command: str, func: Callable[[], T]) -> T:
+    """
+    Call ``func`` with the profiler of ``mode`` and write the profile to a file
+    in the current directory, even if ``func`` fails or exits.
+    """
+    path = f"croud-{command}-{time.strftime('%Y%m%d-%H%M%S')}"
+    if mode == "mem":
+        return _profile_memory(func, f"{path}.snapshot")
+    return _profile_cpu(func, f"{path}.prof")
+
+
+def _profile_cpu(func: Callable[[], T], path: str) -> T:
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        print(f"CPU profile written to {path}", file=sys.stderr)
+
+
+def _profile_memory(func: Callable[[], T], path: str) -> T:
+    import tracemalloc
+
+    tracemalloc.start(TRACEBACK_LIMIT)
+    try:
+        return func()
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot.dump(path)
+
+        # the allocations of tracemalloc itself are not of interest
+        snapshot = snapshot.filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        statistics = snapshot.statistics("lineno")
+        total = sum(stat.size for stat in statistics)
+        lines = [f"Top {PROFILE_TOP} allocations by line:"]
+        lines.extend(f"  {stat}" for stat in statistics[:PROFILE_TOP])
+        lines.append(
+            f"Allocated at exit: {total / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB"
+        )
+        lines.append(f"Memory snapshot written to {path}")
+        print("\n".join(lines), file=sys.stderr)
@@ -19,7 +19,39 @@
 
 from argparse import Namespace
 
-from croud.gql import Query, print_query
+from croud.gql import Query, document, print_paginated, print_query
+
+CREATE_PROJECT = document(
+    """
+    mutation createProject($input: CreateProjectInput!) {
+        createProject(input: $input) {
+            id
+        }
+    }
+""",
+    resources=["project"],
+)
+
+ALL_PROJECTS = document(
+    """
+    query allProjects($first: Int, $after: String) {
+        allProjects(first: $first, after: $after) {
+            data {
+                id
+                name
+                region
+                organizationId
+            }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
+        }
+    }
+""",
+    ttl=60,
+    resources=["project"],
+)
 
 
 def project_create(args: Namespace) -> None:
@@ -27,19 +59,10 @@ def project_create(args: Namespace) -> None:
     Creates a project in the organization the user belongs to.
     """
 
-    _query = f"""
-    mutation {{
-        createProject(input: {{
-            name: "{args.name}",
-            organizationId: "{args.org_id}"
-        }}) {{
-            id
-        }}
-    }}
-    """
+    vars = {"input": {"name": args.name, "organizationId": args.org_id}}
 
-    query = Query(_query, args)
-    query.execute()
+    query = Query(CREATE_PROJECT, args)
+    query.execute(vars)
     print_query(query, "createProject")
 
 
@@ -48,19 +71,5 @@ def projects_list(args: Namespace) -> None:
     Lists all projects for the current user in the specified region
     """
 
-    _query = """
-    {
-        allProjects {
-            data {
-                id
-                name
-                region
-                organizationId
-            }
-        }
-    }
-    """
-
-    query = Query(_query, args)
-    query.execute()
-    print_query(query, "allProjects")
+    query = Query(ALL_PROJECTS, args)
+    print_paginated(query, "allProjects", args=args)
@@ -19,7 +19,30 @@
 
 from argparse import Namespace
 
-from croud.gql import Query, print_query
+from croud.gql import Query, document, print_query
+from croud.index.resolve import resolve_names
+
+ADD_USER_TO_PROJECT = document(
+    """
+    mutation addUserToProject($input: AddUserToProjectInput!) {
+        addUserToProject(input: $input) {
+            success
+        }
+    }
+""",
+    resources=["project"],
+)
+
+REMOVE_USER_FROM_PROJECT = document(
+    """
+    mutation removeUserFromProject($input: RemoveUserFromProjectInput!) {
+        removeUserFromProject(input: $input) {
+            success
+        }
+    }
+""",
+    resources=["project"],
+)
 
 
 def project_user_add(args: Namespace) -> None:
@@ -27,19 +50,11 @@ def project_user_add(args: Namespace) -> None:
     Adds a user to a project.
     """
 
-    _query = f"""
-    mutation {{
-        addUserToProject(input: {{
-            projectId: "{args.project_id}",
-            user: "{args.user}"
-        }}) {{
-            success
-        }}
-    }}
-    """
+    resolve_names(args, exact=True)
+    vars = {"input": {"projectId": args.project_id, "user": args.user}}
 
-    query = Query(_query, args)
-    query.execute()
+    query = Query(ADD_USER_TO_PROJECT, args)
+    query.execute(vars)
     print_query(query, "addUserToProject", "Successfully added user to project.")
 
 
@@ -48,19 +63,11 @@ def project_user_remove(args: Namespace) -> None:
     Removes a user to a project.
     """
 
-    _query = f"""
-    mutation {{
-        removeUserFromProject(input: {{
-            projectId: "{args.project_id}",
-            user: "{args.user}"
-        }}) {{
-            success
-        }}
-    }}
-    """
+    resolve_names(args, exact=True)
+    vars = {"input": {"projectId": args.project_id, "user": args.user}}
 
-    query = Query(_query, args)
-    query.execute()
+    query = Query(REMOVE_USER_FROM_PROJECT, args)
+    query.execute(vars)
     print_query(
         query, "removeUserFromProject", "Successfully removed user from project."
     )
@@ -17,14 +17,28 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
+import asyncio
+import atexit
+import functools
+import hashlib
+import random
 import ssl
 from types import TracebackType
-from typing import Dict, Optional, Type
+from typing import Dict, Optional, Tuple, Type
 
 import certifi
-from aiohttp import ClientSession, TCPConnector  # type: ignore
+from aiohttp import (  # type: ignore
+    ClientConnectorError,
+    ClientError,
+    ClientResponse,
+    ClientSession,
+    ClientTimeout,
+    ContentTypeError,
+    TCPConnector,
+)
 
 from croud.printer import print_error, print_info
+from croud.timings import measure, trace_configs
 from croud.typing import JsonDict
 
 CLOUD_LOCAL_URL = "http://localhost:8000"
@@ -32,6 +46,27 @@ CLOUD_DEV_DOMAIN = "cratedb-dev.cloud"
 CLOUD_PROD_DOMAIN = "cratedb.cloud"
 DEFAULT_ENDPOINT = "/graphql"
 
+# Responses with these status codes are caused by an unavailable or
+# overloaded backend and queries are retried.
+RETRY_STATUS_CODES = {502, 503, 504}
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 10.0
+# The extension of a response that croud adds if the response is not the
+# GraphQL result of a successful request, see :func:`http_status`.
+HTTP_STATUS = "httpStatus"
+
+# Error codes of a server that does not know the hash of a persisted query, or
+# that does not support persisted queries at all.
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+PERSISTED_QUERY_NOT_SUPPORTED = "PersistedQueryNotSupported"
+# servers report them either as the message or as the code of the error
+_PERSISTED_QUERY_ERRORS = {
+    PERSISTED_QUERY_NOT_FOUND: PERSISTED_QUERY_NOT_FOUND,
+    "PERSISTED_QUERY_NOT_FOUND": PERSISTED_QUERY_NOT_FOUND,
+    PERSISTED_QUERY_NOT_SUPPORTED: PERSISTED_QUERY_NOT_SUPPORTED,
+    "PERSISTED_QUERY_NOT_SUPPORTED": PERSISTED_QUERY_NOT_SUPPORTED,
+}
+
 
 class HttpSession:
     def __init__(
@@ -51,20 +86,90 @@ class HttpSession:
 
         self.url = url
         if conn is None:
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            conn = TCPConnector(ssl_context=ssl_context)
+            conn = TCPConnector(ssl_context=default_ssl_context())
 
         self.client = ClientSession(
-            cookies={"session": self.token}, connector=conn, headers=headers
+            cookies={"session": self.token},
+            connector=conn,
+            headers=headers,
+            trace_configs=trace_configs(),
         )
+        # cleared once the server turns out not to support persisted queries
+        self.persisted_queries = True
 
     async def fetch(
-        self, query: str, variables: Optional[Dict], endpoint=DEFAULT_ENDPOINT
+        self,
+        query: str,
+        variables: Optional[Dict],
+        endpoint=DEFAULT_ENDPOINT,
+        timeout: Optional[ClientTimeout] = None,
+        retries: int = 0,
+        persisted: bool = False,
     ) -> JsonDict:
+        """
+        Run a GraphQL query or mutation.
+
+        Failed requests are retried up to ``retries`` times with an
+        exponential backoff. Queries are retried after any connection error,
+        timeout or temporary server error. Mutations are only retried if the
+        connection could not be established, since they must not be applied
+        twice.
+
+        With ``persisted``, only the SHA-256 hash of the query is sent (an
+        automatic persisted query). If the server does not know the hash yet,
+        the query is sent again with its full text, which the server then
+        stores under the hash.
+        """
         url = self.url + endpoint
-        resp = await self.client.post(
-            url, json={"query": query, "variables": variables}, allow_redirects=False
-        )
+        payload = {"query": query, "variables": variables}
+        if persisted and self.persisted_queries:
+            extensions = {
+                "persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}
+            }
+            response = await self._request(
+                url,
+                {"variables": variables, "extensions": extensions},
+                query,
+                timeout,
+                retries,
+            )
+            error = persisted_query_error(response)
+            if error is None:
+                return response
+            if error == PERSISTED_QUERY_NOT_SUPPORTED:
+                self.persisted_queries = False
+            else:
+                payload["extensions"] = extensions
+        return await self._request(url, payload, query, timeout, retries)
+
+    async def _request(
+        self,
+        url: str,
+        payload: Dict,
+        query: str,
+        timeout: Optional[ClientTimeout],
+        retries: int,
+    ) -> JsonDict:
+        variables = payload["variables"]
+        mutation = is_mutation(query)
+        attempt = 0
+        while True:
+            try:
+                resp = await self._post(url, payload, timeout)
+            except ClientConnectorError:
+                # the request has not been sent yet
+                if attempt >= retries:
+                    raise
+            except (ClientError, asyncio.TimeoutError):
+                if mutation or attempt >= retries:
+                    raise
+            else:
+                retry = resp.status in RETRY_STATUS_CODES and not mutation
+                if not retry or attempt >= retries:
+                    break
+                resp.release()
+            await asyncio.sleep(backoff(attempt))
+            attempt += 1
 
         if resp.status == 302:  # login redirect
             print_error("Unauthorized. Use `croud login` to login to CrateDB Cloud.")
@@ -77,7 +182,25 @@ class HttpSession:
             if variables:
                 print_info(str(variables))
 
-        return await resp.json()
+        try:
+            with measure("download"):
+                await resp.read()
+            with measure("decode"):
+                response = await resp.json()
+        except ContentTypeError:
+            message = f"Query failed to run by returning code of {resp.status}."
+            return _http_error({"errors": [{"message": message}]}, resp.status)
+        if resp.status != 200 and isinstance(response, dict):
+            return _http_error(response, resp.status)
+        return response
+
+    async def _post(
+        self, url: str, payload: Dict, timeout: Optional[ClientTimeout]
+    ) -> ClientResponse:
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        return await self.client.post(
+            url, json=payload, allow_redirects=False, **kwargs
+        )
 
     async def logout(self, url: str):
         await self.client.get(url)
@@ -97,6 +220,114 @@ class HttpSession:
         await self.close()
 
 
+def is_mutation(query: str) -> bool:
+    return query.lstrip().startswith("mutation")
+
+
+@functools.lru_cache(maxsize=None)
+def query_hash(query: str) -> str:
+    """
+    Return the hash that identifies ``query`` as a persisted query. Hashes are
+    computed only once per process.
+    """
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def persisted_query_error(response: JsonDict) -> Optional[str]:
+    """
+    Return why the server did not run a persisted query, if it did not:
+    because it does not know its hash (``PersistedQueryNotFound``) or does not
+    support persisted queries at all (``PersistedQueryNotSupported``).
+    """
+    for error in response.get("errors") or []:
+        code = (error.get("extensions") or {}).get("code")
+        for value in (error.get("message"), code):
+            if value in _PERSISTED_QUERY_ERRORS:
+                return _PERSISTED_QUERY_ERRORS[value]
+    return None
+
+
+def http_status(response: JsonDict) -> Optional[int]:
+    """
+    Return the HTTP status of a response that is not the GraphQL result of a
+    successful request, i.e. whose status is not 200 or that is not JSON.
+    Such a response may come from a gateway in front of CrateDB Cloud, so
+    whether the request has been executed is unknown.
+    """
+    return (response.get("extensions") or {}).get(HTTP_STATUS)
+
+
+def _http_error(response: JsonDict, status: int) -> JsonDict:
+    extensions = {**(response.get("extensions") or {}), HTTP_STATUS: status}
+    return {**response, "extensions": extensions}
+
+
+def backoff(attempt: int) -> float:
+    """
+    Return the delay before the next retry, using an exponential backoff with
+    full jitter so that concurrent clients do not retry in lockstep.
+    """
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+@functools.lru_cache(maxsize=None)
+def default_ssl_context() -> ssl.SSLContext:
+    """
+    Return the SSL context used for connections to CrateDB Cloud.
+
+    Loading the CA bundle is fairly expensive, so the context is only created
+    once and then shared by all sessions of the process.
+    """
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+class SessionPool:
+    """
+    Keeps one open :class:`HttpSession` per environment and region so that
+    subsequent queries reuse the established (keep-alive) connections.
+    """
+
+    def __init__(self) -> None:
+        self._sessions: Dict[Tuple[str, str], HttpSession] = {}
+
+    async def get(self, env: str, token: str, region: str) -> HttpSession:
+        session = self._sessions.get((env, region))
+        if session is not None and (session.client.closed or session.token != token):
+            await session.close()
+            session = None
+        if session is None:
+            session = HttpSession(env, token, region)
+            self._sessions[(env, region)] = session
+        return session
+
+    async def close(self) -> None:
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+
+_session_pool: Optional[SessionPool] = None
+
+
+def session_pool() -> SessionPool:
+    """
+    Return the session pool of the process. The pool is created on first use
+    and all its sessions are closed when the interpreter exits.
+    """
+    global _session_pool
+
+    if _session_pool is None:
+        _session_pool = SessionPool()
+        atexit.register(close_session_pool)
+    return _session_pool
+
+
+def close_session_pool() -> None:
+    loop = asyncio.get_event_loop()
+    if _session_pool is not None and not loop.is_closed():
+        loop.run_until_complete(_session_pool.close())
+
+
 def cloud_url(env: str, region: str = "bregenz.a1") -> str:
     if env == "local":
         return CLOUD_LOCAL_URL
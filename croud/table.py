@@ -0,0 +1,291 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+"""
+Render tables in the ``psql`` format of tabulate, but faster.
+
+tabulate infers the type of every cell and makes several passes over all of
+them, which makes it the bottleneck when printing tens of thousands of rows.
+The renderer of this module computes the width and the alignment of each
+column in a single pass over its values instead. Its output is the same as
+the output of ``tabulate(rows, headers, tablefmt="psql", missingval="NULL")``.
+
+Only columns of plain (printable ASCII) strings, integers and ``None`` are
+rendered this way. tabulate renders all other columns, e.g. of floats, of
+strings that look like numbers or booleans, or of wide text, on their own:
+since it formats each column independently, the cells of such a column are
+the same as in a table rendered by tabulate as a whole. Only tables with
+multi-line cells are rendered by tabulate entirely.
+"""
+
+import json
+import re
+import tempfile
+from typing import IO, Any, Iterator, List, Optional, Sequence
+
+from tabulate import tabulate
+
+MISSING = "NULL"
+# the size in bytes up to which the rows of a spooled table are kept in
+# memory, larger ones are written to a temporary file
+SPOOL_SIZE = 8 * 1024 * 1024
+# the number of rows that are rendered at once when reading a spooled table
+CHUNK_SIZE = 1000
+
+_NOT_PLAIN = re.compile(r"[^ -~]")
+# the line breaks that make tabulate render a table with multi-line rows
+_LINE_BREAK = re.compile(r"[\r\n]")
+# strings that tabulate may parse as numbers start with one of these
+_NUMBER_START = frozenset("0123456789+-. iInN")
+_BOOLEANS = frozenset(["True", "False"])
+
+
+def psql_table(headers: List[str], rows: Sequence[Sequence[Any]]) -> str:
+    """
+    Return ``rows`` as a table with the ``psql`` format of tabulate.
+    """
+    if not headers or any(len(row) != len(headers) for row in rows):
+        return _tabulate(headers, rows)
+
+    columns = [_Column(header) for header in headers]
+    values = list(zip(*rows)) or [()] * len(headers)
+    for column, column_values in zip(columns, values):
+        column.add(column_values)
+    for column, column_values in zip(columns, values):
+        if column.fallback and not column.tabulate(column_values):
+            return _tabulate(headers, rows)
+
+    separator = _separator(columns)
+    return "\n".join(
+        [
+            separator,
+            _header(columns),
+            _header_separator(columns),
+            *_rows(columns, values),
+            separator,
+        ]
+    )
+
+
+class TableSpool:
+    """
+    Render a table from rows that are added page by page, with bounded memory.
+
+    The rows are written to a temporary file, which is only kept in memory up
+    to ``max_size`` bytes, while the widths of the columns are computed. Once
+    all rows are added, the table is rendered from the file. The table is the
+    same as the one :func:`psql_table` returns for all rows.
+
+    The values of columns that tabulate renders are read back into memory,
+    but only those of these columns. Only a table with multi-line cells is
+    read back entirely.
+    """
+
+    def __init__(self, headers: List[str], max_size: int = SPOOL_SIZE) -> None:
+        self.headers = headers
+        self.rows = 0
+        self._columns: Optional[List[_Column]] = (
+            [_Column(header) for header in headers] if headers else None
+        )
+        self._file: IO[str] = tempfile.SpooledTemporaryFile(max_size, mode="w+")
+
+    def add(self, rows: Sequence[Sequence[Any]]) -> None:
+        self.rows += len(rows)
+        self._file.writelines(json.dumps(row) + "\n" for row in rows)
+        if self._columns is None or not rows:
+            return
+        if any(len(row) != len(self.headers) for row in rows):
+            self._columns = None
+            return
+        for column, values in zip(self._columns, zip(*rows)):
+            column.add(values)
+
+    def render(self) -> Iterator[str]:
+        """
+        Yield the table in chunks of lines, without a trailing newline.
+        """
+        columns = self._columns
+        if columns is not None and not self._tabulate_columns(columns):
+            columns = None
+        self._file.seek(0)
+        if columns is None:
+            rows = [json.loads(line) for line in self._file]
+            yield _tabulate(self.headers, rows)
+            return
+
+        separator = _separator(columns)
+        yield "\n".join([separator, _header(columns), _header_separator(columns)])
+        offset = 0
+        while True:
+            lines = [line for _, line in zip(range(CHUNK_SIZE), self._file)]
+            if not lines:
+                break
+            values = list(zip(*map(json.loads, lines)))
+            yield "\n".join(_rows(columns, values, offset))
+            offset += len(lines)
+        yield separator
+
+    def _tabulate_columns(self, columns: List["_Column"]) -> bool:
+        # renders the columns that need tabulate from their values in the file
+        indexes = [i for i, column in enumerate(columns) if column.fallback]
+        if not indexes:
+            return True
+        self._file.seek(0)
+        values: List[List[Any]] = [[] for _ in indexes]
+        for line in self._file:
+            row = json.loads(line)
+            for column_values, i in zip(values, indexes):
+                column_values.append(row[i])
+        return all(
+            columns[i].tabulate(column_values)
+            for i, column_values in zip(indexes, values)
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "TableSpool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class _Column:
+    def __init__(self, header: str) -> None:
+        self.header = header
+        self.width = len(header) + 2
+        self.text = False
+        self.numeric = False
+        # whether the column is rendered by tabulate, and its rendered cells
+        self.fallback = bool(_NOT_PLAIN.search(header))
+        self.header_cell = ""
+        self.cells: List[str] = []
+
+    @property
+    def right(self) -> bool:
+        # tabulate aligns integers to the right and everything else to the left
+        return self.numeric and not self.text
+
+    def add(self, values: Sequence[Any]) -> None:
+        """
+        Add the values of the column to its width and type, or mark the column
+        to be rendered by tabulate.
+        """
+        if self.fallback:
+            return
+        types = set(map(type, values))
+        if not types <= _TYPES:
+            self.fallback = True
+            return
+        self.numeric = self.numeric or int in types
+        if str in types:
+            self.text = True
+            strings = [value for value in values if type(value) is str]
+            if _NOT_PLAIN.search("".join(strings)):
+                self.fallback = True
+                return
+            for string in strings:
+                if string in _BOOLEANS or (
+                    string[:1] in _NUMBER_START and _is_number(string)
+                ):
+                    self.fallback = True
+                    return
+        if values:
+            self.width = max(self.width, max(map(len, _cells(values))))
+
+    def tabulate(self, values: Sequence[Any]) -> bool:
+        """
+        Render all values of the column with tabulate. Returns False if a cell
+        spans several lines, which requires tabulate to render the whole
+        table.
+        """
+        text = "".join(str(value) for value in values if value is not None)
+        if _LINE_BREAK.search(self.header) or _LINE_BREAK.search(text):
+            return False
+        lines = _tabulate([self.header], [[value] for value in values]).split("\n")
+        # the separator is "+" and "-" for the width and the padding, and each
+        # row is "| " and the cell and " |", one line per value
+        rows = lines[3:-1]
+        if len(rows) != len(values) or not all(
+            line.startswith("| ") and line.endswith(" |") for line in rows
+        ):
+            return False
+        self.width = len(lines[0]) - 4
+        self.header_cell = lines[1][2:-2]
+        self.cells = [line[2:-2] for line in rows]
+        return True
+
+
+_TYPES = {str, int, type(None)}
+
+
+def _cells(values: Sequence[Any]) -> List[str]:
+    return [MISSING if value is None else str(value).strip() for value in values]
+
+
+def _is_number(string: str) -> bool:
+    try:
+        float(string)
+    except ValueError:
+        return False
+    return True
+
+
+def _separator(columns: List[_Column]) -> str:
+    return "+" + "+".join("-" * (column.width + 2) for column in columns) + "+"
+
+
+def _header_separator(columns: List[_Column]) -> str:
+    return "|" + "+".join("-" * (column.width + 2) for column in columns) + "|"
+
+
+def _header(columns: List[_Column]) -> str:
+    headers = [
+        column.header_cell if column.fallback else _pad(column, [column.header])[0]
+        for column in columns
+    ]
+    return "| " + " | ".join(headers) + " |"
+
+
+def _rows(
+    columns: List[_Column], values: Sequence[Sequence[Any]], offset: int = 0
+) -> List[str]:
+    # ``offset`` is the index of the first row of ``values`` in the table
+    padded = [
+        _column_cells(column, column_values, offset)
+        for column, column_values in zip(columns, values)
+    ]
+    return ["| " + " | ".join(row) + " |" for row in zip(*padded)]
+
+
+def _column_cells(column: _Column, values: Sequence[Any], offset: int) -> List[str]:
+    if column.fallback:
+        return column.cells[offset : offset + len(values)]
+    return _pad(column, _cells(values))
+
+
+def _pad(column: _Column, cells: List[str]) -> List[str]:
+    if column.right:
+        return [cell.rjust(column.width) for cell in cells]
+    return [cell.ljust(column.width) for cell in cells]
+
+
+def _tabulate(headers: List[str], rows: Sequence[Sequence[Any]]) -> str:
+    return tabulate(rows, headers=headers, tablefmt="psql", missingval=MISSING)
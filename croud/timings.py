@@ -0,0 +1,220 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+"""
+Measure where the time of a command is spent.
+
+With ``--timings`` (or the ``CROUD_TIMINGS`` environment variable) the time
+of each phase of a command is added up and printed to stderr once the command
+is done, either as a table (``text``) or as a single JSON line (``json``).
+The phases of the requests to CrateDB Cloud are measured with the trace hooks
+of aiohttp.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+TIMINGS_ENV = "CROUD_TIMINGS"
+TIMINGS_FORMATS = ["text", "json"]
+
+# the phases of a command, in the order in which they happen
+PHASES = {
+    "config": "Load configuration",
+    "resolve": "Resolve command",
+    "dns": "DNS lookup",
+    "connect": "Connect (TCP and TLS)",
+    "wait": "Time to first byte",
+    "download": "Download response",
+    "decode": "Decode JSON",
+    "render": "Render output",
+}
+
+T = TypeVar("T")
+
+
+class Timings:
+    def __init__(self, command: str = "", start: Optional[float] = None) -> None:
+        self.command = command
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.requests = 0
+        # the time.perf_counter() at which the command started
+        self.start = time.perf_counter() if start is None else start
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] += seconds
+
+    @contextlib.contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def as_dict(self) -> Dict:
+        """
+        Return the duration of each phase and of the whole command in
+        milliseconds, and the number of requests.
+        """
+        total = time.perf_counter() - self.start
+        result: Dict = {"command": self.command, "requests": self.requests}
+        for phase, seconds in self.phases.items():
+            result[f"{phase}_ms"] = round(seconds * 1000, 3)
+        result["total_ms"] = round(total * 1000, 3)
+        return result
+
+
+_timings: Optional[Timings] = None
+
+
+def start_timings(command: str = "", start: Optional[float] = None) -> Timings:
+    global _timings
+
+    _timings = Timings(command, start)
+    return _timings
+
+
+def stop_timings() -> None:
+    global _timings
+
+    _timings = None
+
+
+def trace_configs() -> List:
+    """
+    Return the trace configs of a new HTTP session, which add the phases of
+    each request to the timings of the command that is running.
+
+    Sessions are shared by the commands of a process (e.g. of the daemon), so
+    the timings are looked up when a request starts, and a request is not
+    measured if timings are not enabled at that time.
+    """
+    return [_trace_config()]
+
+
+def _trace_config():
+    """
+    The time to first byte of a request excludes the time to resolve the host
+    name and to connect to it. aiohttp does not report the TLS handshake on its
+    own, so it is part of the connect phase.
+    """
+    from aiohttp import TraceConfig  # type: ignore
+
+    async def on_request_start(session, ctx, params):
+        ctx.timings = _timings
+        if ctx.timings is not None:
+            ctx.timings.requests += 1
+        ctx.start = time.perf_counter()
+        ctx.excluded = 0.0
+
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        seconds = time.perf_counter() - ctx.dns_start
+        ctx.excluded += seconds
+        if ctx.timings is not None:
+            ctx.timings.add("dns", seconds)
+
+    async def on_connect_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connect_end(session, ctx, params):
+        # the DNS lookup happens while the connection is created
+        seconds = time.perf_counter() - ctx.connect_start
+        connect = seconds - ctx.excluded
+        ctx.excluded = seconds
+        if ctx.timings is not None:
+            ctx.timings.add("connect", connect)
+
+    async def on_request_end(session, ctx, params):
+        if ctx.timings is not None:
+            ctx.timings.add("wait", time.perf_counter() - ctx.start - ctx.excluded)
+
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connect_start)
+    trace_config.on_connection_create_end.append(on_connect_end)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+@contextlib.contextmanager
+def measure(phase: str) -> Iterator[None]:
+    """
+    Add the duration of the block to ``phase``, if timings are enabled.
+    """
+    if _timings is None:
+        yield
+    else:
+        with _timings.measure(phase):
+            yield
+
+
+def excluded(phase: str, items: Iterable[T]) -> Iterator[T]:
+    """
+    Iterate over ``items`` without adding the time it takes to produce them to
+    ``phase``, e.g. the time to fetch the pages that are rendered.
+    """
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            if _timings is not None:
+                _timings.add(phase, start - time.perf_counter())
+        yield item
+
+
+def timings_format(value: Optional[str]) -> Optional[str]:
+    """
+    Return the format of the timings of ``--timings`` or, if it is not
+    given, of the ``CROUD_TIMINGS`` environment variable.
+    """
+    if value:
+        return value
+    value = os.environ.get(TIMINGS_ENV, "").strip().lower()
+    if value in TIMINGS_FORMATS:
+        return value
+    if value in ("1", "true", "yes", "on"):
+        return "text"
+    return None
+
+
+def print_timings(timings: Timings, format: str) -> None:
+    result = timings.as_dict()
+    if format == "json":
+        print(json.dumps(result), file=sys.stderr)
+        return
+
+    lines = [
+        f"{PHASES[phase]:<24}{result[f'{phase}_ms']:>12.1f} ms" for phase in PHASES
+    ]
+    lines.append(f"{'Total':<24}{result['total_ms']:>12.1f} ms")
+    lines.append(f"{'Requests':<24}{result['requests']:>12}")
+    print("\n".join(lines), file=sys.stderr)
@@ -17,36 +17,43 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
-import textwrap
 from argparse import Namespace
 
-from croud.gql import Query, print_query
+from croud.gql import Query, document, print_paginated
 from croud.util import clean_dict
 
+ALL_USERS = document(
+    """
+    query allUsers($queryArgs: UserQueryArgs, $first: Int, $after: String) {
+        allUsers(
+            sort: EMAIL
+            queryArgs: $queryArgs
+            first: $first
+            after: $after
+        ) {
+            data {
+                uid
+                email
+                username
+            }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
+        }
+    }
+"""
+)
+
 
 def users_list(args: Namespace) -> None:
     """
     List all users within organizations that the logged in user is part of
     """
 
-    body = textwrap.dedent(
-        """
-        query allUsers($queryArgs: UserQueryArgs) {
-            allUsers(sort: EMAIL, queryArgs: $queryArgs) {
-                data {
-                    uid
-                    email
-                    username
-                }
-            }
-        }
-    """
-    ).strip()
-
     vars = clean_dict(
         {"queryArgs": {"noOrg": args.no_org, "organizationId": args.org_id}}
     )
 
-    query = Query(body, args)
-    query.execute(vars)
-    print_query(query, "allUsers")
+    query = Query(ALL_USERS, args)
+    print_paginated(query, "allUsers", vars, args)
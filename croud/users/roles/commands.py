@@ -17,40 +17,67 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
-import textwrap
 from argparse import Namespace
+from typing import Dict
 
-from croud.gql import Query, print_query
+from croud.bulk import execute_from_file
+from croud.gql import Query, document, print_query
+from croud.printer import print_error
 from croud.util import clean_dict
 
+# the arguments of a role assignment and the columns of --from-file
+ROLE_COLUMNS = {"user": "userId", "role": "roleFqn", "resource": "resourceId"}
 
-def roles_add(args: Namespace) -> None:
-    """
-    Adds a new role to a user
+ADD_ROLE_TO_USER = document(
     """
+    mutation addRoleToUser($input: UserRoleInput!) {
+        addRoleToUser(input: $input) {
+            success
+        }
+    }
+""",
+    resources=["organization", "project"],
+)
 
-    mutation = textwrap.dedent(
-        """
-        mutation addRoleToUser($input: UserRoleInput!) {
-            addRoleToUser(input: $input) {
-                success
+ALL_ROLES = document(
+    """
+    query allRoles {
+        allRoles {
+            data {
+                fqn
+                friendlyName
             }
         }
-    """
-    ).strip()
+    }
+""",
+    ttl=3600,
+    resources=["role"],
+)
 
-    vars = clean_dict(
-        {
-            "input": {
-                "userId": args.user,
-                "roleFqn": args.role,
-                "resourceId": args.resource,
-            }
+REMOVE_ROLE_FROM_USER = document(
+    """
+    mutation removeRoleFromUser($input: UserRoleInput!) {
+        removeRoleFromUser(input: $input) {
+            success
         }
-    )
+    }
+""",
+    resources=["organization", "project"],
+)
+
+
+def roles_add(args: Namespace) -> None:
+    """
+    Adds a new role to a user
+    """
 
-    query = Query(mutation, args)
-    query.execute(vars)
+    query = Query(ADD_ROLE_TO_USER, args)
+    if args.from_file:
+        _execute_from_file(query, "addRoleToUser", args)
+        return
+
+    _require_role_options(args)
+    query.execute(_role_variables(args, {}))
     print_query(query, "addRoleToUser")
 
 
@@ -59,20 +86,7 @@ def roles_list(args: Namespace) -> None:
     Lists all roles a user can be assigned to
     """
 
-    _query = textwrap.dedent(
-        """
-        query {
-            allRoles {
-                data {
-                    fqn
-                    friendlyName
-                }
-            }
-        }
-    """
-    ).strip()
-
-    query = Query(_query, args)
+    query = Query(ALL_ROLES, args)
     query.execute()
     print_query(query, "allRoles")
 
@@ -82,26 +96,43 @@ def roles_remove(args: Namespace) -> None:
     Removes a role from a user
     """
 
-    mutation = textwrap.dedent(
-        """
-        mutation removeRoleFromUser($input: UserRoleInput!) {
-            removeRoleFromUser(input: $input) {
-                success
-            }
-        }
-    """
-    ).strip()
+    query = Query(REMOVE_ROLE_FROM_USER, args)
+    if args.from_file:
+        _execute_from_file(query, "removeRoleFromUser", args)
+        return
 
-    vars = clean_dict(
+    _require_role_options(args)
+    query.execute(_role_variables(args, {}))
+    print_query(query, "removeRoleFromUser", "Successfully removed role from user.")
+
+
+def _require_role_options(args: Namespace) -> None:
+    missing = [f"--{column}" for column in ROLE_COLUMNS if not getattr(args, column)]
+    if missing:
+        print_error(
+            "The following arguments are required unless --from-file is given: "
+            + ", ".join(missing)
+        )
+        exit(2)
+
+
+def _role_variables(args: Namespace, row: Dict[str, str]) -> Dict:
+    # values of the row take precedence over the options
+    return clean_dict(
         {
             "input": {
-                "userId": args.user,
-                "roleFqn": args.role,
-                "resourceId": args.resource,
+                field: row.get(column) or getattr(args, column)
+                for column, field in ROLE_COLUMNS.items()
             }
         }
     )
 
-    query = Query(mutation, args)
-    query.execute(vars)
-    print_query(query, "removeRoleFromUser", "Successfully removed role from user.")
+
+def _execute_from_file(query: Query, key: str, args: Namespace) -> None:
+    execute_from_file(
+        query,
+        key,
+        args,
+        [column for column in ROLE_COLUMNS if not getattr(args, column)],
+        lambda row: _role_variables(args, row),
+    )
@@ -58,6 +58,6 @@ setup(
         "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
     ],
-    use_scm_version=True,
+    use_scm_version={"write_to": "croud/_version.py"},
     setup_requires=["setuptools_scm"],
 )
@@ -0,0 +1,245 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+import asyncio
+import io
+import json
+from argparse import Namespace
+from unittest import mock
+
+import pytest
+from aiohttp import ClientConnectionError
+from tests.unit_tests.util import CommandTestCase
+
+from croud.bulk import print_results, read_rows
+from croud.config import Configuration
+from croud.gql import Query
+
+
+def test_read_rows(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("user,role\na@crate.io, org_admin\nb@crate.io,\n")
+
+    assert read_rows(str(path), ["user"]) == [
+        {"user": "a@crate.io", "role": "org_admin"},
+        {"user": "b@crate.io", "role": ""},
+    ]
+
+
+def test_read_rows_missing_column(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("email\na@crate.io\n")
+
+    with pytest.raises(ValueError, match="Missing column"):
+        read_rows(str(path), ["user"])
+
+
+def test_read_rows_ndjson_stdin():
+    stdin = io.StringIO('{"user": "a", "resource": 1}\n\n{"user": "b", "role": null}\n')
+    with mock.patch("sys.stdin", stdin):
+        rows = read_rows("-", ["user", "resource"])
+
+    assert rows == [{"user": "a", "resource": "1"}, {"user": "b", "role": ""}]
+
+
+def test_read_rows_ndjson_invalid(tmp_path):
+    path = tmp_path / "roles.ndjson"
+    path.write_text('{"user": "a"}\n["b"]\n')
+
+    with pytest.raises(ValueError, match="Line 2 of .* is not a JSON object"):
+        read_rows(str(path), ["user"])
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_execute_many_bounded(load_config):
+    running = 0
+    max_running = 0
+
+    async def fetch_data(body, variables, region=None):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if variables["i"] == 3:
+            raise ClientConnectionError("Connection reset")
+        return {"data": {"i": variables["i"]}}
+
+    query = Query("", Namespace(env="test"))
+    with mock.patch.object(query, "_fetch_data", fetch_data):
+        results = query.execute_many([{"i": i} for i in range(10)], 3)
+
+    assert max_running == 3
+    assert results[:4] == [
+        ({"i": 0}, None),
+        ({"i": 1}, None),
+        ({"i": 2}, None),
+        (None, "The request to CrateDB Cloud failed: Connection reset"),
+    ]
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_execute_many_not_sent_again(load_config):
+    # retrying is left to the session, which does not send a mutation again
+    # after it may have been applied
+    responses = {
+        "a": [asyncio.TimeoutError(), {"data": {"success": True}}],
+        "b": [ClientConnectionError("Connection reset")],
+        "c": [{"errors": [{"message": "Not found"}]}],
+    }
+
+    async def fetch_data(body, variables, region=None):
+        response = responses[variables["user"]].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    query = Query("", Namespace(env="test"))
+    with mock.patch.object(query, "_fetch_data", fetch_data):
+        results = query.execute_many([{"user": user} for user in "abc"], 2)
+
+    assert results == [
+        (None, "The request to CrateDB Cloud timed out."),
+        (None, "The request to CrateDB Cloud failed: Connection reset"),
+        (None, "Not found"),
+    ]
+    assert responses == {"a": [{"data": {"success": True}}], "b": [], "c": []}
+
+
+@mock.patch("croud.bulk.print_success")
+@mock.patch("croud.bulk.print_error")
+def test_print_results(print_error, print_success, capsys):
+    rows = [{"user": "a"}, {"user": "b"}, {"user": "c"}]
+    results = [
+        ({"removeUser": {"success": True}}, None),
+        ({"removeUser": {"success": False}}, None),
+        (None, "Not found"),
+    ]
+    print_results(rows, results, "removeUser", "csv")
+
+    out, _ = capsys.readouterr()
+    assert out == (
+        "user,status,error\n"
+        "a,success,\n"
+        "b,failed,"
+        '"Command not successful, however no server-side errors occurred."\n'
+        "c,failed,Not found\n"
+    )
+    print_error.assert_called_once_with("2 of 3 rows failed.")
+    print_success.assert_not_called()
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+class TestOrganizationsUsersFromFile(CommandTestCase):
+    def execute(self, argv):
+        calls = []
+
+        async def fetch_data(body, variables, region=None):
+            calls.append(variables)
+            return {"data": {}}
+
+        func, args = self.croud.resolve(argv + ["--batch-size", "1"])
+        with mock.patch.object(Query, "_fetch_data", side_effect=fetch_data):
+            func(args)
+        return sorted(calls, key=lambda vars: vars["input"]["user"])
+
+    def test_add(self, load_config, tmp_path):
+        path = tmp_path / "users.csv"
+        path.write_text("user,role,org_id\na@crate.io,org_admin,\nb@crate.io,,o2\n")
+
+        argv = ["croud", "organizations", "users", "add", "--from-file", str(path)]
+        assert self.execute(argv + ["--org-id", "o1", "--concurrency", "2"]) == [
+            {
+                "input": {
+                    "user": "a@crate.io",
+                    "organizationId": "o1",
+                    "roleFqn": "org_admin",
+                }
+            },
+            {"input": {"user": "b@crate.io", "organizationId": "o2"}},
+        ]
+
+    def test_remove(self, load_config, tmp_path):
+        path = tmp_path / "users.csv"
+        path.write_text("user\na@crate.io\nb@crate.io\n")
+
+        argv = ["croud", "organizations", "users", "remove", "--from-file", str(path)]
+        assert self.execute(argv) == [
+            {"input": {"user": "a@crate.io", "organizationId": None}},
+            {"input": {"user": "b@crate.io", "organizationId": None}},
+        ]
+
+    def test_user_or_file_required(self, load_config):
+        with pytest.raises(SystemExit):
+            self.croud.resolve(["croud", "organizations", "users", "add"])
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+class TestUsersRolesFromFile(CommandTestCase):
+    def test_add(self, load_config, tmp_path):
+        path = tmp_path / "roles.csv"
+        path.write_text("user,resource\nu1,r1\nu2,r2\n")
+        report = tmp_path / "report.ndjson"
+
+        async def fetch_data(body, variables, region=None):
+            return {
+                "data": {"op0": {"success": True}, "op1": None},
+                "errors": [{"message": "Not found", "path": ["op1"]}],
+            }
+
+        argv = ["croud", "users", "roles", "add", "--role", "org_admin"]
+        argv += ["--from-file", str(path), "--report", str(report)]
+        func, args = self.croud.resolve(argv)
+        with mock.patch.object(Query, "_fetch_data", side_effect=fetch_data) as fetch:
+            func(args)
+
+        # both rows are sent in one request
+        fetch.assert_called_once()
+        assert fetch.call_args[0][1] == {
+            "input_0": {"userId": "u1", "roleFqn": "org_admin", "resourceId": "r1"},
+            "input_1": {"userId": "u2", "roleFqn": "org_admin", "resourceId": "r2"},
+        }
+        assert [json.loads(line) for line in report.read_text().splitlines()] == [
+            {"user": "u1", "resource": "r1", "status": "success", "error": ""},
+            {"user": "u2", "resource": "r2", "status": "failed", "error": "Not found"},
+        ]
+
+    @mock.patch("croud.bulk.print_error")
+    def test_remove_missing_column(self, print_error, load_config, tmp_path):
+        path = tmp_path / "roles.csv"
+        path.write_text("user\nu1\n")
+
+        argv = ["croud", "users", "roles", "remove", "--from-file", str(path)]
+        func, args = self.croud.resolve(argv)
+        func(args)
+
+        print_error.assert_called_once_with(
+            f"Missing column(s) in {path}: role, resource"
+        )
+
+    @mock.patch("croud.users.roles.commands.print_error")
+    def test_options_required_without_file(self, print_error, load_config):
+        argv = ["croud", "users", "roles", "add", "--user", "u1"]
+        func, args = self.croud.resolve(argv)
+        with pytest.raises(SystemExit) as e:
+            func(args)
+
+        assert e.value.code == 2
+        print_error.assert_called_once_with(
+            "The following arguments are required unless --from-file is given: "
+            "--role, --resource"
+        )
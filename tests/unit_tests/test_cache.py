@@ -0,0 +1,161 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+import asyncio
+import os
+from argparse import Namespace
+from unittest import mock
+
+import pytest
+
+from croud.cache import ResponseCache, cache_key
+from croud.config import Configuration
+from croud.gql import Query
+
+ROLES = {"data": {"allRoles": {"data": [{"fqn": "org_admin"}]}}}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses"))
+
+
+def test_get_put(cache):
+    assert cache.get("key", ["role"]) is None
+    cache.put("key", ["role"], ROLES, 60)
+    assert cache.get("key", ["role"]) == ROLES
+    assert cache.get("other", ["role"]) is None
+
+
+def test_expired_entry(cache):
+    cache.put("key", ["role"], ROLES, 60)
+    with mock.patch("croud.cache.time.time", return_value=1e12):
+        assert cache.get("key", ["role"]) is None
+    assert os.listdir(cache.directory) == []
+
+
+def test_corrupt_entry(cache):
+    cache.put("key", ["role"], ROLES, 60)
+    with open(cache._path("key", ["role"]), "w") as f:
+        f.write("{")
+    assert cache.get("key", ["role"]) is None
+    assert os.listdir(cache.directory) == []
+
+
+def test_invalidate(cache):
+    cache.put("orgs", ["organization"], ROLES, 60)
+    cache.put("projects", ["project"], ROLES, 60)
+    cache.put("both", ["organization", "project"], ROLES, 60)
+
+    cache.invalidate(["project"])
+
+    assert cache.get("orgs", ["organization"]) == ROLES
+    assert cache.get("projects", ["project"]) is None
+    assert cache.get("both", ["organization", "project"]) is None
+
+
+def test_evict_least_recently_used(cache):
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, ["role"], ROLES, 60)
+        os.utime(cache._path(key, ["role"]), (i, i))
+    size = os.path.getsize(cache._path("a", ["role"]))
+    # room for three entries, but not for four
+    cache.max_size = 3 * size + size // 2
+
+    # "a" is used again, so "b" is the least recently used entry
+    assert cache.get("a", ["role"]) == ROLES
+    cache.put("d", ["role"], ROLES, 60)
+
+    assert sorted(name.split(".")[1] for name in os.listdir(cache.directory)) == [
+        "a",
+        "c",
+        "d",
+    ]
+
+
+def test_cache_key():
+    key = cache_key("prod", "bregenz.a1", "query me { me { email } }", None, "t")
+    assert key == cache_key("prod", "bregenz.a1", "query me { me { email } }", {}, "t")
+    assert key != cache_key("dev", "bregenz.a1", "query me { me { email } }", {}, "t")
+    assert key != cache_key(
+        "prod", "eastus.azure", "query me { me { email } }", {}, "t"
+    )
+    assert key != cache_key("prod", "bregenz.a1", "query me { me { id } }", {}, "t")
+    assert key != cache_key("prod", "bregenz.a1", "query me { me { email } }", {}, "u")
+    assert "t" not in key
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.queries = []
+
+    async def fetch(self, query, variables, **kwargs):
+        self.queries.append(query)
+        return self.response
+
+
+def run_query(session, cache, document, **kwargs):
+    pool = mock.Mock()
+    pool.get.return_value = asyncio.Future()
+    pool.get.return_value.set_result(session)
+    query = Query(document, Namespace(env="prod", **kwargs))
+    with mock.patch("croud.gql.session_pool", return_value=pool), mock.patch(
+        "croud.gql.response_cache", return_value=cache
+    ):
+        query.execute()
+    return query._response
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_query_cached(load_config, cache):
+    from croud.users.roles.commands import ALL_ROLES
+
+    session = FakeSession(ROLES)
+    assert run_query(session, cache, ALL_ROLES) == ROLES["data"]
+    assert run_query(session, cache, ALL_ROLES) == ROLES["data"]
+    assert len(session.queries) == 1
+
+    run_query(session, cache, ALL_ROLES, refresh=True)
+    assert len(session.queries) == 2
+    run_query(session, cache, ALL_ROLES, no_cache=True)
+    assert len(session.queries) == 3
+    run_query(session, cache, ALL_ROLES)
+    assert len(session.queries) == 3
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_query_error_not_cached(load_config, cache):
+    from croud.me import ME
+
+    session = FakeSession({"errors": [{"message": "Unauthorized"}]})
+    run_query(session, cache, ME)
+    run_query(session, cache, ME)
+    assert len(session.queries) == 2
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_mutation_invalidates(load_config, cache):
+    from croud.organizations.commands import ALL_ORGANIZATIONS, CREATE_ORGANIZATION
+
+    orgs = FakeSession({"data": {"allOrganizations": {"data": []}}})
+    run_query(orgs, cache, ALL_ORGANIZATIONS)
+    run_query(
+        FakeSession({"data": {"createOrganization": {}}}), cache, CREATE_ORGANIZATION
+    )
+    run_query(orgs, cache, ALL_ORGANIZATIONS)
+    assert len(orgs.queries) == 2
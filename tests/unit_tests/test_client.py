@@ -0,0 +1,206 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from croud.client import CloudClient, CloudError, Cluster, Project, Role, User
+from croud.config import Configuration
+from croud.gql import Query
+
+
+def connection(rows):
+    return {"data": rows, "pageInfo": {"hasNextPage": False}}
+
+
+def fetch_data(responses, calls):
+    async def fetch_data(body, variables, region=None):
+        calls.append((body, variables, region))
+        for key, response in responses.items():
+            if key in body:
+                return response
+        raise AssertionError(body)
+
+    return fetch_data
+
+
+def run(client, coroutine, responses):
+    calls = []
+    with mock.patch.object(
+        Query, "_fetch_data", side_effect=fetch_data(responses, calls)
+    ):
+        result = asyncio.get_event_loop().run_until_complete(coroutine)
+    return result, calls
+
+
+@pytest.fixture
+def client():
+    with mock.patch(
+        "croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG
+    ):
+        yield CloudClient(env="dev", region="eastus.azure")
+
+
+def test_client_settings(client):
+    assert client.env == "dev"
+    assert client.token == ""
+    assert client._query("query me { me { email } }")._region == "eastus.azure"
+
+
+def test_client_without_config_file(tmp_path):
+    with mock.patch.object(Configuration, "FILEPATH", str(tmp_path / "croud.yaml")):
+        client = CloudClient(env="prod", token="x", region="bregenz.a1")
+        responses = {"query me": {"data": {"me": {"email": "a@crate.io"}}}}
+        me, calls = run(client, client.me(), responses)
+
+    assert me == User(None, "a@crate.io", None)
+    assert calls[0][2] == "bregenz.a1"
+    assert not (tmp_path / "croud.yaml").exists()
+
+
+def test_clusters(client):
+    row = {
+        "id": "c1",
+        "name": "cluster",
+        "numNodes": 3,
+        "crateVersion": "4.0.0",
+        "projectId": "p1",
+        "username": "crate",
+        "fqdn": "cluster.eastus.azure.cratedb.cloud.",
+    }
+    responses = {"allClusters": {"data": {"allClusters": connection([row])}}}
+
+    clusters, calls = run(client, client.clusters(project_id="p1"), responses)
+
+    assert clusters == [
+        Cluster(
+            "c1",
+            "cluster",
+            3,
+            "4.0.0",
+            "p1",
+            "crate",
+            "cluster.eastus.azure.cratedb.cloud.",
+        )
+    ]
+    assert calls[0][1] == {
+        "filter": [{"by": "PROJECT_ID", "op": "EQ", "value": "p1"}],
+        "first": 100,
+    }
+    assert calls[0][2] == "eastus.azure"
+
+
+def test_concurrent_requests(client):
+    responses = {
+        "allProjects": {
+            "data": {
+                "allProjects": connection(
+                    [
+                        {
+                            "id": "p1",
+                            "name": "project",
+                            "region": "bregenz.a1",
+                            "organizationId": "o1",
+                        }
+                    ]
+                )
+            }
+        },
+        "allRoles": {
+            "data": {
+                "allRoles": {"data": [{"fqn": "org_admin", "friendlyName": "Admin"}]}
+            }
+        },
+        "query me": {"data": {"me": {"email": "a@crate.io", "username": "a"}}},
+    }
+
+    (projects, roles, me), calls = run(
+        client,
+        asyncio.gather(
+            client.projects(region="bregenz.a1"), client.roles(), client.me()
+        ),
+        responses,
+    )
+
+    assert projects == [Project("p1", "project", "bregenz.a1", "o1")]
+    assert roles == [Role("org_admin", "Admin")]
+    assert me == User(None, "a@crate.io", "a")
+    assert len(calls) == 3
+
+
+def test_error(client):
+    responses = {"allUsers": {"errors": [{"message": "Unauthorized"}]}}
+    with pytest.raises(CloudError, match="Unauthorized"):
+        run(client, client.users(), responses)
+
+
+def test_mutation_not_successful(client):
+    responses = {"addUserToProject": {"data": {"addUserToProject": {"success": False}}}}
+    with pytest.raises(CloudError, match="not successful"):
+        run(client, client.add_user_to_project("p1", "a@crate.io"), responses)
+
+    responses = {"addUserToProject": {"data": {"addUserToProject": {"success": True}}}}
+    _, calls = run(client, client.add_user_to_project("p1", "a@crate.io"), responses)
+    assert calls[0][1] == {"input": {"projectId": "p1", "user": "a@crate.io"}}
+
+
+def test_close(client):
+    session = mock.Mock()
+    session.close.return_value = asyncio.Future()
+    session.close.return_value.set_result(None)
+    client._pool._sessions[("dev", "eastus.azure")] = session
+
+    asyncio.get_event_loop().run_until_complete(client.close())
+
+    session.close.assert_called_once_with()
+    assert client._pool._sessions == {}
+
+
+def test_create_project(client):
+    # the mutation only selects the ID of the new project
+    responses = {"createProject": {"data": {"createProject": {"id": "p2"}}}}
+
+    project, calls = run(client, client.create_project("project", "o1"), responses)
+
+    assert project == Project("p2", "project", None, "o1")
+    assert calls[0][1] == {"input": {"name": "project", "organizationId": "o1"}}
+
+
+def test_add_user_to_organization(client):
+    # the mutation returns the added user instead of a success flag
+    responses = {
+        "addUserToOrganization": {
+            "data": {
+                "addUserToOrganization": {
+                    "user": {
+                        "uid": "u1",
+                        "email": "a@crate.io",
+                        "organizationId": "o1",
+                    }
+                }
+            }
+        }
+    }
+
+    result, calls = run(
+        client, client.add_user_to_organization("a@crate.io", "o1"), responses
+    )
+
+    assert result is None
+    assert calls[0][1] == {"input": {"user": "a@crate.io", "organizationId": "o1"}}
@@ -14,13 +14,32 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
+import subprocess
+import sys
+import textwrap
 from argparse import Namespace
 from unittest import mock
 
 import pytest
 
 from croud import __version__
-from croud.cmd import CMD, region_arg
+from croud.cmd import CMD, REGIONS, bulk_args, pagination_args, region_arg, regions_arg
+from croud.config import config_get
+
+
+def default_args(**kwargs) -> Namespace:
+    args = Namespace(
+        env=None,
+        timeout=None,
+        connect_timeout=None,
+        read_timeout=None,
+        retries=None,
+        timings=None,
+        profile=None,
+    )
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    return args
 
 
 def print_hello(args: Namespace):
@@ -40,7 +59,11 @@ class TestCmd:
         "say-hi": {"calls": print_hello},
         "print-env": {"calls": print_env},
         "print-region": {"extra_args": [region_arg], "calls": print_region},
+        "print-regions": {"extra_args": [regions_arg], "calls": print_region},
+        "print-page": {"extra_args": [pagination_args], "calls": print_hello},
+        "print-bulk": {"extra_args": [bulk_args], "calls": print_hello},
         "print": {"sub_commands": {"hello": {"calls": print_hello}}},
+        "lazy-hi": {"calls": "croud.config:config_get"},
     }
 
     def test_commands_registered(self):
@@ -49,7 +72,7 @@ class TestCmd:
         func, args = croud_cmd.resolve(argv)
 
         assert func == print_hello
-        assert args == Namespace(env=None)
+        assert args == default_args()
 
     def test_commands_have_env_arg(self):
         argv = ["croud", "print-env", "--env", "dev"]
@@ -57,7 +80,7 @@ class TestCmd:
         func, args = croud_cmd.resolve(argv)
 
         assert func == print_env
-        assert args == Namespace(env="dev")
+        assert args == default_args(env="dev")
 
     def test_extra_args_registered(self):
         argv = ["croud", "print-region", "--region", "westeurope.azure"]
@@ -65,7 +88,67 @@ class TestCmd:
         func, args = croud_cmd.resolve(argv)
 
         assert func == print_region
-        assert args == Namespace(env=None, region="westeurope.azure")
+        assert args == default_args(region="westeurope.azure")
+
+    @pytest.mark.parametrize(
+        "argv,expected",
+        [
+            (["--region", "bregenz.a1"], ["bregenz.a1"]),
+            (
+                ["-r", "eastus.azure, bregenz.a1,eastus.azure"],
+                ["eastus.azure", "bregenz.a1"],
+            ),
+            (["--all-regions"], REGIONS),
+            ([], None),
+        ],
+    )
+    def test_regions_arg(self, argv, expected):
+        croud_cmd = CMD(self.commands)
+        func, args = croud_cmd.resolve(["croud", "print-regions"] + argv)
+
+        assert func == print_region
+        assert args == default_args(region=expected)
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["--region", "bregenz.a1,mars"],
+            ["--region", ","],
+            ["--region", "bregenz.a1", "--all-regions"],
+        ],
+    )
+    def test_regions_arg_invalid(self, argv):
+        croud_cmd = CMD(self.commands)
+        with pytest.raises(SystemExit) as e:
+            croud_cmd.resolve(["croud", "print-regions"] + argv)
+        assert e.value.code == 2
+
+    def test_pagination_args(self):
+        croud_cmd = CMD(self.commands)
+        func, args = croud_cmd.resolve(
+            ["croud", "print-page", "--page-size", "10", "--limit", "25"]
+        )
+        assert args == default_args(page_size=10, limit=25)
+
+    @pytest.mark.parametrize(
+        "argv", [["--page-size", "0"], ["--limit", "-1"], ["--limit", "many"]]
+    )
+    def test_pagination_args_invalid(self, argv, capsys):
+        croud_cmd = CMD(self.commands)
+        with pytest.raises(SystemExit) as e:
+            croud_cmd.resolve(["croud", "print-page"] + argv)
+        assert e.value.code == 2
+        assert "invalid positive integer" in capsys.readouterr().err
+
+    @pytest.mark.parametrize(
+        "argv", [["--concurrency", "0"], ["--concurrency", "-2"], ["--batch-size", "0"]]
+    )
+    def test_bulk_args_invalid(self, argv, capsys):
+        croud_cmd = CMD(self.commands)
+        with pytest.raises(SystemExit) as e:
+            croud_cmd.resolve(["croud", "print-bulk"] + argv)
+        assert e.value.code == 2
+        assert "invalid positive integer" in capsys.readouterr().err
 
     def test_sub_commands_registered(self):
         argv = ["croud", "print", "hello"]
@@ -73,7 +156,15 @@ class TestCmd:
         func, args = croud_cmd.resolve(argv)
 
         assert func == print_hello
-        assert args == Namespace(env=None)
+        assert args == default_args()
+
+    def test_lazy_commands_resolved(self):
+        argv = ["croud", "lazy-hi"]
+        croud_cmd = CMD(self.commands)
+        func, args = croud_cmd.resolve(argv)
+
+        assert func == config_get
+        assert args == default_args()
 
     def test_version(self):
         argv = ["croud", "--version"]
@@ -104,3 +195,34 @@ class TestCmd:
                 stdout.assert_called_once()
                 assert stdout.call_args[0][0].startswith("Usage: croud") is True
         assert ex_info.value.code == 0
+
+
+def test_command_modules_imported_on_dispatch():
+    code = textwrap.dedent(
+        """
+        import sys
+        from croud.__main__ import command_tree
+        from croud.cmd import CMD
+
+        CMD(command_tree).resolve(["croud", "config", "get", "region"])
+        print(" ".join(sorted(sys.modules)))
+        """
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True
+    ).stdout.decode()
+    modules = out.split()
+
+    assert "croud.config" in modules
+    assert "croud.clusters.commands" not in modules
+    assert "croud.login" not in modules
+    assert "aiohttp" not in modules
+
+
+def test_import_does_not_load_pkg_resources():
+    code = "import sys, croud, croud.cmd; print('pkg_resources' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True
+    ).stdout.decode()
+
+    assert out.strip() == "False"
@@ -111,18 +111,25 @@ class TestLogin:
 
 
 class TestLogout:
+    @mock.patch("croud.logout.response_cache")
     @mock.patch("croud.config.Configuration.override_context")
     @mock.patch("croud.logout.Configuration.set_token")
     @mock.patch("croud.logout.print_info")
     @mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
     def test_logout(
-        self, mock_load_config, mock_print_info, mock_set_token, mock_override_context
+        self,
+        mock_load_config,
+        mock_print_info,
+        mock_set_token,
+        mock_override_context,
+        mock_response_cache,
     ):
         m = mock.mock_open()
         with mock.patch("croud.config.open", m, create=True):
             logout(Namespace(env="dev"))
 
         mock_set_token.assert_called_once_with("")
+        mock_response_cache.return_value.clear.assert_called_once_with()
         mock_print_info.assert_called_once_with("You have been logged out.")
 
     def test_logout_urls_from_valid_envs(self):
@@ -178,6 +185,12 @@ class TestConfigSet:
 
         config["region"] = "bregenz.a1"
 
+    @mock.patch("croud.config.write_config")
+    @mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+    def test_set_ignores_timings_and_profile(self, mock_load_config, mock_write_config):
+        config_set(Namespace(env=None, region=None, timings="text", profile="cpu"))
+        mock_write_config.assert_not_called()
+
 
 def assert_query(mock_print, expected):
     actual = mock_print.call_args[0][0]._query
@@ -190,8 +203,13 @@ class TestClusters(CommandTestCase):
     project_id = gen_uuid()
     expected_body = textwrap.dedent(
         """
-        query allClusters($filter: [ClusterFilter]) {
-            allClusters(sort: [CRATE_VERSION_DESC], filter: $filter) {
+        query allClusters($filter: [ClusterFilter], $first: Int, $after: String) {
+            allClusters(
+                sort: [CRATE_VERSION_DESC]
+                filter: $filter
+                first: $first
+                after: $after
+            ) {
                 data {
                     id
                     name
@@ -201,6 +219,10 @@ class TestClusters(CommandTestCase):
                     username
                     fqdn
                 }
+                pageInfo {
+                    endCursor
+                    hasNextPage
+                }
             }
         }
     """
@@ -208,33 +230,39 @@ class TestClusters(CommandTestCase):
 
     def test_list_no_project_id(self, mock_run, mock_load_config):
         argv = ["croud", "clusters", "list"]
-        expected_vars = {}
+        expected_vars = {"first": 100}
         self.assertGql(mock_run, argv, self.expected_body, expected_vars)
 
     def test_list_with_project_id(self, mock_run, mock_load_config):
         argv = ["croud", "clusters", "list", "--project-id", self.project_id]
         expected_vars = {
-            "filter": [{"by": "PROJECT_ID", "op": "EQ", "value": self.project_id}]
+            "filter": [{"by": "PROJECT_ID", "op": "EQ", "value": self.project_id}],
+            "first": 100,
         }
         self.assertGql(mock_run, argv, self.expected_body, expected_vars)
 
+    def test_list_page_size_and_limit(self, mock_run, mock_load_config):
+        argv = ["croud", "clusters", "list", "--page-size", "20", "--limit", "5"]
+        expected_vars = {"first": 5}
+        self.assertGql(mock_run, argv, self.expected_body, expected_vars)
+
 
 @mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
 @mock.patch.object(Query, "run", return_value={"data": []})
 class TestOrganizations(CommandTestCase):
     def test_create(self, mock_run, mock_load_config):
-        expected_body = """
-    mutation {
-        createOrganization(input: {
-            name: "testorg",
-            planType: 1
-        }) {
-            id
-            name
-            planType
-        }
-    }
-    """
+        expected_body = textwrap.dedent(
+            """
+            mutation createOrganization($input: CreateOrganizationInput!) {
+                createOrganization(input: $input) {
+                    id
+                    name
+                    planType
+                }
+            }
+        """
+        ).strip()
+        expected_vars = {"input": {"name": "testorg", "planType": 1}}
 
         argv = [
             "croud",
@@ -245,29 +273,35 @@ class TestOrganizations(CommandTestCase):
             "--plan-type",
             "1",
         ]
-        self.assertGql(mock_run, argv, expected_body)
+        self.assertGql(mock_run, argv, expected_body, expected_vars)
 
     def test_list(self, mock_run, mock_load_config):
-        expected_body = """
-    {
-        allOrganizations {
-            data {
-                id,
-                name,
-                planType,
-                notification {
-                    alert {
-                        email,
-                        enabled
+        expected_body = textwrap.dedent(
+            """
+            query allOrganizations($first: Int, $after: String) {
+                allOrganizations(first: $first, after: $after) {
+                    data {
+                        id,
+                        name,
+                        planType,
+                        notification {
+                            alert {
+                                email,
+                                enabled
+                            }
+                        }
+                    }
+                    pageInfo {
+                        endCursor
+                        hasNextPage
                     }
                 }
             }
-        }
-    }
-    """
+        """
+        ).strip()
 
         argv = ["croud", "organizations", "list"]
-        self.assertGql(mock_run, argv, expected_body)
+        self.assertGql(mock_run, argv, expected_body, {"first": 100})
 
     def test_add_user(self, mock_run, mock_load_config):
         expected_body = textwrap.dedent(
@@ -400,16 +434,18 @@ class TestOrganizations(CommandTestCase):
 @mock.patch.object(Query, "run", return_value={"data": []})
 class TestProjects(CommandTestCase):
     def test_create(self, mock_run, mock_load_config):
-        expected_body = """
-    mutation {
-        createProject(input: {
-            name: "new-project",
-            organizationId: "organization-id"
-        }) {
-            id
+        expected_body = textwrap.dedent(
+            """
+            mutation createProject($input: CreateProjectInput!) {
+                createProject(input: $input) {
+                    id
+                }
+            }
+        """
+        ).strip()
+        expected_vars = {
+            "input": {"name": "new-project", "organizationId": "organization-id"}
         }
-    }
-    """
 
         argv = [
             "croud",
@@ -420,40 +456,48 @@ class TestProjects(CommandTestCase):
             "--org-id",
             "organization-id",
         ]
-        self.assertGql(mock_run, argv, expected_body)
+        self.assertGql(mock_run, argv, expected_body, expected_vars)
 
     def test_list_projects_org_admin(self, mock_run, mock_load_config):
-        expected_body = """
-    {
-        allProjects {
-            data {
-                id
-                name
-                region
-                organizationId
+        expected_body = textwrap.dedent(
+            """
+            query allProjects($first: Int, $after: String) {
+                allProjects(first: $first, after: $after) {
+                    data {
+                        id
+                        name
+                        region
+                        organizationId
+                    }
+                    pageInfo {
+                        endCursor
+                        hasNextPage
+                    }
+                }
             }
-        }
-    }
-    """
+        """
+        ).strip()
 
         argv = ["croud", "projects", "list"]
-        self.assertGql(mock_run, argv, expected_body)
+        self.assertGql(mock_run, argv, expected_body, {"first": 100})
 
 
 @mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
 @mock.patch.object(Query, "run", return_value={"data": []})
 class TestProjectsUsers(CommandTestCase):
     def test_add(self, mock_run, mock_load_config):
-        expected_body = """
-    mutation {
-        addUserToProject(input: {
-            projectId: "project-id",
-            user: "user-email-or-id"
-        }) {
-            success
+        expected_body = textwrap.dedent(
+            """
+            mutation addUserToProject($input: AddUserToProjectInput!) {
+                addUserToProject(input: $input) {
+                    success
+                }
+            }
+        """
+        ).strip()
+        expected_vars = {
+            "input": {"projectId": "project-id", "user": "user-email-or-id"}
         }
-    }
-    """
 
         argv = [
             "croud",
@@ -465,19 +509,21 @@ class TestProjectsUsers(CommandTestCase):
             "--user",
             "user-email-or-id",
         ]
-        self.assertGql(mock_run, argv, expected_body)
+        self.assertGql(mock_run, argv, expected_body, expected_vars)
 
     def test_remove(self, mock_run, mock_load_config):
-        expected_body = """
-    mutation {
-        removeUserFromProject(input: {
-            projectId: "project-id",
-            user: "user-email-or-id"
-        }) {
-            success
+        expected_body = textwrap.dedent(
+            """
+            mutation removeUserFromProject($input: RemoveUserFromProjectInput!) {
+                removeUserFromProject(input: $input) {
+                    success
+                }
+            }
+        """
+        ).strip()
+        expected_vars = {
+            "input": {"projectId": "project-id", "user": "user-email-or-id"}
         }
-    }
-    """
 
         argv = [
             "croud",
@@ -489,7 +535,7 @@ class TestProjectsUsers(CommandTestCase):
             "--user",
             "user-email-or-id",
         ]
-        self.assertGql(mock_run, argv, expected_body)
+        self.assertGql(mock_run, argv, expected_body, expected_vars)
 
 
 @mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
@@ -562,7 +608,7 @@ class TestUsersRoles(CommandTestCase):
     def test_list(self, mock_run, mock_load_config):
         expected_body = textwrap.dedent(
             """
-        query {
+        query allRoles {
             allRoles {
                 data {
                     fqn
@@ -583,30 +629,42 @@ class TestUsers(CommandTestCase):
     org_id = gen_uuid()
     expected_body = textwrap.dedent(
         """
-        query allUsers($queryArgs: UserQueryArgs) {
-            allUsers(sort: EMAIL, queryArgs: $queryArgs) {
+        query allUsers($queryArgs: UserQueryArgs, $first: Int, $after: String) {
+            allUsers(
+                sort: EMAIL
+                queryArgs: $queryArgs
+                first: $first
+                after: $after
+            ) {
                 data {
                     uid
                     email
                     username
                 }
+                pageInfo {
+                    endCursor
+                    hasNextPage
+                }
             }
         }
     """
     ).strip()
 
     def test_list_no_filter(self, mock_run, mock_load_config):
-        expected_vars = {"queryArgs": {"noOrg": False}}
+        expected_vars = {"queryArgs": {"noOrg": False}, "first": 100}
         argv = ["croud", "users", "list"]
         self.assertGql(mock_run, argv, self.expected_body, expected_vars)
 
     def test_list_org_filter(self, mock_run, mock_load_config):
-        expected_vars = {"queryArgs": {"organizationId": self.org_id, "noOrg": False}}
+        expected_vars = {
+            "queryArgs": {"organizationId": self.org_id, "noOrg": False},
+            "first": 100,
+        }
         argv = ["croud", "users", "list", "--org-id", self.org_id]
         self.assertGql(mock_run, argv, self.expected_body, expected_vars)
 
     def test_list_no_org_filter(self, mock_run, mock_load_config):
-        expected_vars = {"queryArgs": {"noOrg": True}}
+        expected_vars = {"queryArgs": {"noOrg": True}, "first": 100}
         argv = ["croud", "users", "list", "--no-org"]
         self.assertGql(mock_run, argv, self.expected_body, expected_vars)
 
@@ -23,6 +23,7 @@ import unittest
 import uuid
 from unittest import mock
 
+import yaml
 from yaml.constructor import ConstructorError
 
 from croud.config import Configuration, load_config, write_config
@@ -64,6 +65,21 @@ class TestConfiguration(unittest.TestCase):
 
             mock_write_config.assert_called_once_with(Configuration.DEFAULT_CONFIG)
 
+    def test_load_config_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "croud.yaml")
+            with mock.patch.object(Configuration, "FILEPATH", path):
+                write_config(Configuration.DEFAULT_CONFIG)
+                with mock.patch("yaml.safe_load", side_effect=yaml.safe_load) as m:
+                    config = load_config()
+                    config["region"] = "eastus.azure"
+                    self.assertEqual(load_config(), Configuration.DEFAULT_CONFIG)
+                    self.assertEqual(m.call_count, 1)
+
+                    write_config(config)
+                    self.assertEqual(load_config(), config)
+                    self.assertEqual(m.call_count, 2)
+
     def test_yaml_safe_load(self):
         new_file = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex)
         with tempfile.NamedTemporaryFile(mode="w+") as tmp:
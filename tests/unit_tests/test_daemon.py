@@ -0,0 +1,168 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+import json
+import multiprocessing
+import os
+import tempfile
+from argparse import Namespace
+
+import pytest
+
+from croud.cmd import CMD, region_arg
+from croud.daemon.client import forward, send
+from croud.daemon.server import DaemonServer, OutputStream
+
+
+def print_region(args: Namespace):
+    print(args.region)
+
+
+def fail(args: Namespace):
+    exit(3)
+
+
+def crash(args: Namespace):
+    raise ValueError("boom")
+
+
+def print_context(args: Namespace):
+    print(os.getcwd())
+    print(os.environ.get("CROUD_TEST", ""))
+
+
+commands = {
+    "print-region": {"extra_args": [region_arg], "calls": print_region},
+    "print-context": {"calls": print_context},
+    "fail": {"calls": fail},
+    "crash": {"calls": crash},
+}
+
+
+@pytest.fixture
+def daemon():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "croud.sock")
+        server = DaemonServer(path, CMD(commands))
+        # the daemon runs in its own process, like a real one, so that it has
+        # its own stdout, working directory and environment
+        process = multiprocessing.get_context("fork").Process(target=server.serve)
+        process.start()
+        server.socket.close()
+        yield path
+        send(path, {"shutdown": True})
+        process.join()
+        assert not os.path.exists(path)
+
+
+def test_forward_command(daemon, capsys):
+    argv = ["croud", "print-region", "--region", "eastus.azure"]
+    assert forward(daemon, argv) == 0
+    assert forward(daemon, argv) == 0
+
+    out, err = capsys.readouterr()
+    assert out == "eastus.azure\neastus.azure\n"
+    assert err == ""
+
+
+def test_forward_exit_status(daemon, capsys):
+    assert forward(daemon, ["croud", "fail"]) == 3
+    assert forward(daemon, ["croud", "print-region", "--region", "moon"]) == 2
+
+    out, err = capsys.readouterr()
+    assert "Argument -r/--region: invalid choice: 'moon'" in err
+
+
+def test_forward_exception(daemon, capsys):
+    assert forward(daemon, ["croud", "crash"]) == 1
+
+    out, err = capsys.readouterr()
+    assert "ValueError: boom" in err
+
+
+def test_forward_local_commands(daemon):
+    assert forward(daemon, ["croud", "login"]) is None
+    assert forward(daemon, ["croud", "daemon", "stop"]) is None
+
+
+def test_forward_no_daemon():
+    assert forward("/nonexistent/croud.sock", ["croud", "fail"]) is None
+
+
+def test_forward_context(daemon, capsys, monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.chdir(tmp)
+        monkeypatch.setenv("CROUD_TEST", "client")
+        assert forward(daemon, ["croud", "print-context"]) == 0
+
+        out, _ = capsys.readouterr()
+        assert out == f"{os.getcwd()}\nclient\n"
+
+
+def test_execute_environment(monkeypatch):
+    monkeypatch.setenv("CROUD_TEST", "daemon")
+    with tempfile.TemporaryDirectory() as tmp:
+        server = DaemonServer(os.path.join(tmp, "croud.sock"), CMD(commands))
+        messages = []
+        try:
+            status = server.execute(["croud", "print-context"], messages.append, env={})
+        finally:
+            server.server_close()
+
+    # the variables of the daemon are replaced by the ones of the client
+    assert status == 0
+    assert messages == [{"stdout": f"{os.getcwd()}\n"}, {"stdout": "\n"}]
+    assert os.environ["CROUD_TEST"] == "daemon"
+
+
+def test_forward_stdin_locally(daemon):
+    assert forward(daemon, ["croud", "fail", "--from-file", "-"]) is None
+    assert forward(daemon, ["croud", "fail", "--from-file=-"]) is None
+
+
+def test_output_stream():
+    messages = []
+    stream = OutputStream("stdout", messages.append)
+
+    stream.write("a")
+    assert messages == []
+    stream.write("b\nc")
+    assert messages == [{"stdout": "ab\n"}]
+    stream.flush()
+    assert messages == [{"stdout": "ab\n"}, {"stdout": "c"}]
+
+
+def test_forward_timings(daemon, capsys, monkeypatch):
+    assert forward(daemon, ["croud", "print-region", "--timings", "json"]) == 0
+    _, err = capsys.readouterr()
+    assert json.loads(err)["command"] == "print_region"
+
+    monkeypatch.setenv("CROUD_TIMINGS", "json")
+    assert forward(daemon, ["croud", "print-region"]) == 0
+    _, err = capsys.readouterr()
+    assert json.loads(err)["command"] == "print_region"
+
+
+def test_forward_profile(daemon, capsys, monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.chdir(tmp)
+        assert forward(daemon, ["croud", "print-region", "--profile"]) == 0
+
+        # the profile is written to the working directory of the client
+        _, err = capsys.readouterr()
+        assert "CPU profile written to croud-print_region-" in err
+        assert [os.path.splitext(name)[1] for name in os.listdir(tmp)] == [".prof"]
@@ -0,0 +1,140 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+import asyncio
+from unittest import mock
+
+import aiohttp
+import pytest
+from util.dataset import Dataset
+from util.fake_server import FakeCrateDBCloud, FakeResolver, parse_document
+
+from croud.client import CloudClient, CloudError
+from croud.config import Configuration
+from croud.session import HttpSession, SessionPool
+
+
+class FakePool(SessionPool):
+    def __init__(self, resolver: FakeResolver) -> None:
+        super().__init__()
+        self._resolver = resolver
+
+    async def get(self, env: str, token: str, region: str) -> HttpSession:
+        if (env, region) not in self._sessions:
+            connector = aiohttp.TCPConnector(resolver=self._resolver, ssl=False)
+            self._sessions[(env, region)] = HttpSession(
+                env, token, region, url="https://cratedb.local", conn=connector
+            )
+        return self._sessions[(env, region)]
+
+
+def run(fake_cloud, test):
+    loop = asyncio.get_event_loop()
+    fake_cloud.loop = loop
+    with mock.patch(
+        "croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG
+    ), mock.patch("croud.session.RETRY_BACKOFF_BASE", 0):
+        info = loop.run_until_complete(fake_cloud.start())
+        client = CloudClient(env="dev", token="eyJraWQiOiIx", retries=3, cache=False)
+        client._pool = FakePool(FakeResolver(info, loop=loop))
+        try:
+            return loop.run_until_complete(test(client))
+        finally:
+            loop.run_until_complete(client.close())
+            loop.run_until_complete(fake_cloud.stop())
+
+
+def test_parse_document():
+    document = """
+    query allClusters($filter: [ClusterFilter], $first: Int) {
+        op0: allClusters(sort: [CRATE_VERSION_DESC], filter: $filter, first: $first) {
+            data { id }
+        }
+    }
+    """
+    kind, fields = parse_document(document, {"filter": [{"by": "NAME"}], "first": 2})
+    assert kind == "query"
+    assert fields == [
+        (
+            "op0",
+            "allClusters",
+            {"sort": ["CRATE_VERSION_DESC"], "filter": [{"by": "NAME"}], "first": 2},
+            [("data", "data", {}, [("id", "id", {}, [])])],
+        )
+    ]
+
+
+def test_dataset_is_seeded():
+    assert Dataset(seed=1).clusters == Dataset(seed=1).clusters
+    assert Dataset(seed=1).clusters != Dataset(seed=2).clusters
+    dataset = Dataset(clusters=250, padding=10)
+    assert len(dataset.clusters) == 250
+    assert dataset.clusters[0]["name"] == "cluster-0" + "x" * 10
+
+
+def test_queries_are_paginated():
+    dataset = Dataset(projects=3, clusters=250)
+    project_id = dataset.projects[1]["id"]
+
+    async def test(client):
+        return await client.clusters(), await client.clusters(project_id=project_id)
+
+    fake_cloud = FakeCrateDBCloud(None, dataset)
+    clusters, project_clusters = run(fake_cloud, test)
+    assert [c.id for c in clusters] == [c["id"] for c in dataset.clusters]
+    assert len(project_clusters) == 83
+    assert {c.project_id for c in project_clusters} == {project_id}
+    # the default page size is 100
+    assert fake_cloud.requests == 3 + 1
+
+
+def test_mutations_modify_dataset():
+    async def test(client):
+        organization = await client.create_organization("acme", 3)
+        project = await client.create_project("web", organization.id)
+        await client.add_user_to_organization("user3@example.com", organization.id)
+        await client.add_user_to_project(project.id, "user3@example.com")
+        users = await client.users(org_id=organization.id)
+        await client.remove_user_from_project(project.id, "user3@example.com")
+        projects = await client.projects()
+        return project, users, projects
+
+    fake_cloud = FakeCrateDBCloud(None, Dataset())
+    project, users, projects = run(fake_cloud, test)
+    assert [u.email for u in users] == ["user0@example.com", "user3@example.com"]
+    assert projects[-1] == project._replace(region=projects[-1].region)
+    assert fake_cloud.dataset.members[project.id] == {}
+
+
+def test_unknown_resource():
+    async def test(client):
+        await client.add_user_to_project("unknown", "user1@example.com")
+
+    with pytest.raises(CloudError, match="Project not found."):
+        run(FakeCrateDBCloud(None, Dataset()), test)
+
+
+def test_error_rate():
+    async def test(client):
+        return [await client.roles() for _ in range(20)]
+
+    fake_cloud = FakeCrateDBCloud(None, Dataset(), seed=3)
+    fake_cloud.error_rate = 0.2
+    results = run(fake_cloud, test)
+    # failed requests are retried
+    assert all(len(roles) == 4 for roles in results)
+    assert fake_cloud.requests > 20
@@ -21,12 +21,21 @@
 
 import asyncio
 from argparse import Namespace
-from unittest.mock import patch
+from unittest.mock import call, patch
 
 import pytest
+from aiohttp import ClientConnectionError
 
+from croud.cmd import import_call
 from croud.config import Configuration
-from croud.gql import Query, print_query
+from croud.gql import (
+    DOCUMENTS,
+    Query,
+    batch_document,
+    document,
+    print_paginated,
+    print_query,
+)
 
 
 @pytest.mark.parametrize(
@@ -183,6 +192,18 @@ def test_print_query_no_data(print_info, load_config, response, key):
     print_info.assert_called_once_with(expected_message)
 
 
+@pytest.mark.parametrize(
+    "config,expected", [({}, False), ({"persisted_queries": True}, True)]
+)
+def test_persisted_queries_setting(config, expected):
+    with patch(
+        "croud.config.load_config",
+        return_value={**Configuration.DEFAULT_CONFIG, **config},
+    ):
+        query = Query("{}", Namespace(env="dev"))
+    assert query._persisted is expected
+
+
 @patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
 def test_execute_query_with_variables(load_config):
     body = """
@@ -202,3 +223,351 @@ def test_execute_query_with_variables(load_config):
         query.execute(vars)
 
     fetch_data.assert_called_once_with(body, vars)
+
+
+@pytest.mark.parametrize(
+    "input,expected",
+    [
+        (Namespace(env="dev", retries=0, timeout=5.0), (0, 5.0)),
+        (Namespace(env="dev", retries=None, timeout=None), (3, 300)),
+        (Namespace(env="dev"), (3, 300)),
+    ],
+)
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_request_settings_set(mock_load_config, input, expected):
+    query = Query("{}", input)
+    assert (query._retries, query._timeout.total) == expected
+
+
+@pytest.mark.parametrize(
+    "exception,expected_error",
+    [
+        (asyncio.TimeoutError(), "The request to CrateDB Cloud timed out."),
+        (
+            ClientConnectionError("Connection reset by peer"),
+            "The request to CrateDB Cloud failed: Connection reset by peer",
+        ),
+    ],
+)
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_execute_query_request_failed(load_config, exception, expected_error):
+    query = Query("{ me { uid } }", Namespace(env="test"))
+    with patch.object(query, "run", side_effect=exception):
+        query.execute()
+
+    assert query._response is None
+    assert query._error == expected_error
+
+
+def page(rows, cursor, has_next_page):
+    return {
+        "data": {
+            "allNames": {
+                "data": rows,
+                "pageInfo": {"endCursor": cursor, "hasNextPage": has_next_page},
+            }
+        }
+    }
+
+
+@pytest.mark.parametrize(
+    "limit,responses,expected_pages,expected_vars",
+    [
+        (
+            None,
+            [page([1, 2], "c1", True), page([3], "c2", False)],
+            [[1, 2], [3]],
+            [{"b": 1, "first": 2}, {"b": 1, "first": 2, "after": "c1"}],
+        ),
+        (
+            3,
+            [page([1, 2], "c1", True), page([3], "c2", True)],
+            [[1, 2], [3]],
+            [{"b": 1, "first": 2}, {"b": 1, "first": 1, "after": "c1"}],
+        ),
+        (1, [page([1, 2], "c1", True)], [[1]], [{"b": 1, "first": 1}]),
+        (None, [{"data": {"allNames": {"data": [1]}}}], [[1]], [{"b": 1, "first": 2}]),
+    ],
+)
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_pages(load_config, limit, responses, expected_pages, expected_vars):
+    query = Query("", Namespace(env="test"))
+    with patch.object(query, "run", side_effect=responses) as run:
+        pages = list(query.pages("allNames", {"b": 1}, page_size=2, limit=limit))
+
+    assert pages == expected_pages
+    assert run.call_args_list == [call("", variables) for variables in expected_vars]
+
+
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_pages_error(load_config):
+    responses = [page([1, 2], "c1", True), {"errors": [{"message": "Failed"}]}]
+    query = Query("", Namespace(env="test"))
+    with patch.object(query, "run", side_effect=responses):
+        pages = list(query.pages("allNames", page_size=2))
+
+    assert pages == [[1, 2]]
+    assert query._error == "Failed"
+
+
+def fetch_by_region(responses):
+    async def fetch_data(body, variables, region=None):
+        response = responses[region].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return fetch_data
+
+
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_fetch_regions(load_config):
+    responses = {
+        "eastus.azure": [page([1, 2], "c1", True), page([3], "c2", False)],
+        "bregenz.a1": [ClientConnectionError("Connection refused")],
+        "westeurope.azure": [{"errors": [{"message": "Failed"}]}],
+    }
+    args = Namespace(env="test", region=list(responses))
+    query = Query("", args)
+    with patch.object(query, "_fetch_data", fetch_by_region(responses)):
+        results = query.fetch_regions("allNames", page_size=2)
+
+    assert results == [
+        ("eastus.azure", [1, 2, 3], None),
+        (
+            "bregenz.a1",
+            [],
+            "The request to CrateDB Cloud failed: Connection refused",
+        ),
+        ("westeurope.azure", [], "Failed"),
+    ]
+
+
+@patch("croud.gql.print_error")
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_print_paginated_regions(load_config, print_error, capsys):
+    responses = {
+        "eastus.azure": [page([{"id": "1"}], "c1", False)],
+        "bregenz.a1": [{"errors": [{"message": "Failed"}]}],
+        "westeurope.azure": [page([{"id": "2"}, {"id": "3"}], "c1", False)],
+    }
+    args = Namespace(env="test", region=list(responses), output_fmt="ndjson")
+    query = Query("", args)
+    with patch.object(query, "_fetch_data", fetch_by_region(responses)):
+        print_paginated(query, "allNames", args=args)
+
+    out, _ = capsys.readouterr()
+    assert out == (
+        '{"id": "1", "region": "eastus.azure"}\n'
+        '{"id": "2", "region": "westeurope.azure"}\n'
+        '{"id": "3", "region": "westeurope.azure"}\n'
+    )
+    print_error.assert_called_once_with("bregenz.a1: Failed")
+
+
+def test_batch_document():
+    document = """
+        mutation addRoleToUser($input: UserRoleInput!, $dry: Boolean) {
+            added: addRoleToUser(input: $input, dryRun: $dry) {
+                success
+            }
+        }
+    """
+    body, key = batch_document(document, 2)
+
+    assert key == "added"
+    assert body == (
+        "mutation addRoleToUser($input_0: UserRoleInput!, $dry_0: Boolean, "
+        "$input_1: UserRoleInput!, $dry_1: Boolean) {\n"
+        "  op0: addRoleToUser(input: $input_0, dryRun: $dry_0) {\n"
+        "                success\n"
+        "            }\n"
+        "  op1: addRoleToUser(input: $input_1, dryRun: $dry_1) {\n"
+        "                success\n"
+        "            }\n"
+        "}"
+    )
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        "{ me { uid } }",
+        "query { me { uid } allRoles { data { fqn } } }",
+        "mutation deleteCluster($id: String!) { deleteCluster(id: $id) }",
+    ],
+)
+def test_batch_document_unsupported(document):
+    with pytest.raises(ValueError):
+        batch_document(document, 2)
+
+
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_execute_many_batched(load_config):
+    document = "query user($id: String!) { user(id: $id) { uid } }"
+    requests = []
+
+    async def fetch_data(body, variables, region=None):
+        requests.append(variables)
+        if "id_0" not in variables:
+            if variables["id"] == "invalid":
+                return {"errors": [{"message": "Invalid id"}]}
+            return {"data": {"user": {"uid": variables["id"]}}}
+        if "invalid" in variables.values():
+            # the whole document is rejected
+            return {"errors": [{"message": "Variable $id_1 is invalid"}]}
+        return {
+            "data": {"op0": {"uid": variables["id_0"]}, "op1": None},
+            "errors": [{"message": "Not found", "path": ["op1", "uid"]}],
+        }
+
+    query = Query(document, Namespace(env="test"))
+    with patch.object(query, "_fetch_data", fetch_data):
+        results = query.execute_many(
+            [{"id": id} for id in ["a", "b", "c", "invalid", "e"]], 2, batch_size=2
+        )
+
+    assert results == [
+        ({"user": {"uid": "a"}}, None),
+        (None, "Not found"),
+        ({"user": {"uid": "c"}}, None),
+        (None, "Invalid id"),
+        ({"user": {"uid": "e"}}, None),
+    ]
+    assert requests == [
+        {"id_0": "a", "id_1": "b"},
+        {"id_0": "c", "id_1": "invalid"},
+        {"id": "e"},
+        {"id": "c"},
+        {"id": "invalid"},
+    ]
+
+
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_execute_many_mutation_batch_partly_applied(load_config):
+    document = "mutation removeUser($id: String!) { removeUser(id: $id) { success } }"
+    requests = []
+
+    async def fetch_data(body, variables, region=None):
+        requests.append(variables)
+        if "id_0" not in variables:
+            return {"errors": [{"message": "Variable $id is invalid"}]}
+        # the first operation has been applied, but the error has no path
+        return {
+            "data": {"op0": {"success": True}, "op1": None},
+            "errors": [{"message": "Internal server error"}],
+        }
+
+    query = Query(document, Namespace(env="test"))
+    with patch.object(query, "_fetch_data", fetch_data):
+        results = query.execute_many(
+            [{"id": "a"}, {"id": "b"}, {"id": "invalid"}], 2, batch_size=2
+        )
+
+    assert results == [
+        (None, "Internal server error"),
+        (None, "Internal server error"),
+        (None, "Variable $id is invalid"),
+    ]
+    # none of the operations of the executed batch is sent again
+    assert requests == [{"id_0": "a", "id_1": "b"}, {"id": "invalid"}]
+
+
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_execute_many_mutation_batch_gateway_error(load_config):
+    document = "mutation removeUser($id: String!) { removeUser(id: $id) { success } }"
+    requests = []
+
+    async def fetch_data(body, variables, region=None):
+        requests.append(variables)
+        # e.g. a gateway timed out, the batch may have been applied
+        message = "Query failed to run by returning code of 504."
+        return {"errors": [{"message": message}], "extensions": {"httpStatus": 504}}
+
+    query = Query(document, Namespace(env="test"))
+    with patch.object(query, "_fetch_data", fetch_data):
+        results = query.execute_many([{"id": id} for id in "abc"], 2, batch_size=3)
+
+    assert results == [(None, "Query failed to run by returning code of 504.")] * 3
+    assert requests == [{"id_0": "a", "id_1": "b", "id_2": "c"}]
+
+
+def test_document():
+    body = document(
+        """
+        query testDocument($id: String!) {
+            user(id: $id) {
+                uid
+            }
+        }
+    """
+    )
+    assert body.startswith("query testDocument($id: String!) {\n    user")
+    assert body.endswith("\n}")
+    assert DOCUMENTS["testDocument"] is body
+    # registering the same document again is fine, e.g. after a reload
+    assert document(body) == body
+
+    with pytest.raises(ValueError, match="different document"):
+        document("query testDocument { me { uid } }")
+    with pytest.raises(ValueError, match="named operation"):
+        document("{ me { uid } }")
+
+
+def test_command_documents_registered():
+    from croud.__main__ import command_tree
+
+    def calls(tree):
+        for command in tree.values():
+            if "sub_commands" in command:
+                yield from calls(command["sub_commands"])
+            else:
+                yield command["calls"]
+
+    for ref in calls(command_tree):
+        import_call(ref)
+
+    assert {
+        "createOrganization",
+        "createProject",
+        "addUserToProject",
+        "removeUserFromProject",
+        "allRoles",
+        "me",
+    } <= set(DOCUMENTS)
+    for body in DOCUMENTS.values():
+        # all documents can be batched
+        batch_document(body, 2)
+
+
+@patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_fetch_rows(load_config):
+    pages = [
+        {
+            "data": {
+                "allUsers": {
+                    "data": [{"uid": "a"}, {"uid": "b"}],
+                    "pageInfo": {"hasNextPage": True, "endCursor": "b"},
+                }
+            }
+        },
+        {"errors": [{"message": "Unauthorized"}]},
+    ]
+    calls = []
+
+    async def fetch_data(body, variables, region=None):
+        calls.append((variables, region))
+        return pages.pop(0)
+
+    query = Query("query allUsers { allUsers { data { uid } } }", Namespace(env="test"))
+    with patch.object(query, "_fetch_data", fetch_data):
+        rows, error = asyncio.get_event_loop().run_until_complete(
+            query.fetch_rows("allUsers", page_size=2, region="eastus.azure")
+        )
+
+    # the rows fetched before the error are returned as well
+    assert (rows, error) == ([{"uid": "a"}, {"uid": "b"}], "Unauthorized")
+    assert calls == [
+        ({"first": 2}, "eastus.azure"),
+        ({"first": 2, "after": "b"}, "eastus.azure"),
+    ]
@@ -0,0 +1,351 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+from argparse import Namespace
+from unittest import mock
+
+import pytest
+
+from croud.config import Configuration
+from croud.gql import Query
+from croud.index.commands import index_sync, search
+from croud.index.resolve import NAME_TTL, resolve_names
+from croud.index.store import Index
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = Index(str(tmp_path / "index.sqlite3"))
+    yield index
+    index.close()
+
+
+def test_sync_only_writes_changes(index):
+    projects = [
+        {"id": "p1", "name": "alpha", "region": "bregenz.a1"},
+        {"id": "p2", "name": "beta", "region": "bregenz.a1"},
+    ]
+    assert index.sync("prod", "project", projects) == {
+        "added": 2,
+        "updated": 0,
+        "removed": 0,
+        "unchanged": 0,
+    }
+
+    projects = [{"id": "p1", "name": "alpha", "region": "bregenz.a1"}]
+    projects.append({"id": "p3", "name": "gamma", "region": "bregenz.a1"})
+    projects[0]["name"] = "alpha-2"
+    assert index.sync("prod", "project", projects) == {
+        "added": 1,
+        "updated": 1,
+        "removed": 1,
+        "unchanged": 0,
+    }
+    assert index.sync("prod", "project", projects)["unchanged"] == 2
+
+
+def test_sync_keeps_other_regions_and_envs(index):
+    index.sync(
+        "prod", "cluster", [{"id": "c1", "name": "c1", "region": "eastus.azure"}]
+    )
+    index.sync("dev", "cluster", [{"id": "c2", "name": "c2", "region": "bregenz.a1"}])
+    counts = index.sync("prod", "cluster", [], regions=["bregenz.a1"])
+
+    assert counts["removed"] == 0
+    assert [row["id"] for row in index.search("prod", "c")] == ["c1"]
+    assert [row["id"] for row in index.search("dev", "c")] == ["c2"]
+
+
+def test_search(index):
+    index.sync(
+        "prod",
+        "user",
+        [
+            {"id": "u1", "name": "foo", "email": "foo@crate.io"},
+            {"id": "u2", "name": "foobar", "email": "foobar@crate.io"},
+        ],
+    )
+    index.sync("prod", "project", [{"id": "p1", "name": "FOO", "region": "eastus"}])
+
+    # exact matches first, case is ignored
+    assert [row["id"] for row in index.search("prod", "foo")] == ["p1", "u1", "u2"]
+    assert [row["id"] for row in index.search("prod", "foo", ["user"])] == [
+        "u1",
+        "u2",
+    ]
+    assert index.search("prod", "foobar@crate.io") == [
+        {
+            "kind": "user",
+            "id": "u2",
+            "name": "foobar",
+            "email": "foobar@crate.io",
+            "region": None,
+            "organizationId": None,
+            "projectId": None,
+        }
+    ]
+    # wildcards are searched for literally
+    assert index.search("prod", "%") == []
+    assert index.search("prod", "f_o") == []
+
+
+def fetch_data(responses):
+    async def fetch_data(body, variables, region=None):
+        for key, response in responses.items():
+            if key in body:
+                return response
+        return {"errors": [{"message": "Not found"}]}
+
+    return fetch_data
+
+
+def connection(rows):
+    return {"data": rows, "pageInfo": {"hasNextPage": False}}
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_index_sync(load_config, index, capsys):
+    responses = {
+        "allOrganizations": {
+            "data": {"allOrganizations": connection([{"id": "o1", "name": "org"}])}
+        },
+        "allProjects": {
+            "data": {
+                "allProjects": connection(
+                    [
+                        {
+                            "id": "p1",
+                            "name": "project",
+                            "region": "bregenz.a1",
+                            "organizationId": "o1",
+                        }
+                    ]
+                )
+            }
+        },
+        "allClusters": {
+            "data": {
+                "allClusters": connection(
+                    [{"id": "c1", "name": "cluster", "projectId": "p1"}]
+                )
+            }
+        },
+        "allUsers": {
+            "data": {
+                "allUsers": connection(
+                    [{"uid": "u1", "username": "user", "email": "user@crate.io"}]
+                )
+            }
+        },
+    }
+    args = Namespace(env="prod", region=None, output_fmt="json")
+    with mock.patch.object(
+        Query, "_fetch_data", side_effect=fetch_data(responses)
+    ), mock.patch("croud.index.commands.Index", return_value=index), mock.patch(
+        "croud.index.store.Index.close"
+    ):
+        index_sync(args)
+
+    output = capsys.readouterr().out
+    assert "Could not fetch the consumer-sets of bregenz.a1: Not found" in output
+    assert '"kind": "cluster"' in output
+    assert '"kind": "consumer-set"' not in output
+
+    assert index.search("prod", "cluster") == [
+        {
+            "kind": "cluster",
+            "id": "c1",
+            "name": "cluster",
+            "email": None,
+            "region": "bregenz.a1",
+            "organizationId": None,
+            "projectId": "p1",
+        }
+    ]
+    assert [row["kind"] for row in index.search("prod", "1")] == [
+        "cluster",
+        "organization",
+        "project",
+        "user",
+    ]
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_search_empty_index(load_config, index, capsys):
+    with mock.patch("croud.index.commands.Index", return_value=index), mock.patch(
+        "croud.index.store.Index.close"
+    ):
+        search(Namespace(env="prod", term="foo", kind=None, output_fmt="json"))
+
+    assert "croud index sync" in capsys.readouterr().out
+
+
+def test_lookup(index):
+    index.sync(
+        "prod",
+        "project",
+        [
+            {"id": "p1", "name": "Alpha", "region": "bregenz.a1"},
+            {"id": "p2", "name": "alpha", "region": "eastus.azure"},
+            {"id": "p3", "name": "beta", "region": "eastus.azure"},
+        ],
+        regions=["bregenz.a1", "eastus.azure"],
+    )
+
+    assert index.lookup("prod", "project", "alpha") == ["p2"]
+    assert index.lookup("prod", "project", "ALPHA") == ["p1", "p2"]
+    assert index.lookup("prod", "project", "BETA") == ["p3"]
+    assert index.lookup("prod", "cluster", "beta") == []
+    assert index.lookup("dev", "project", "beta") == []
+    # only the resources of the given regions
+    assert index.lookup("prod", "project", "ALPHA", ["bregenz.a1"]) == ["p1"]
+    assert index.lookup("prod", "project", "beta", ["bregenz.a1"]) == []
+    # and only exact matches
+    assert index.lookup("prod", "project", "ALPHA", exact=True) == []
+    assert index.lookup("prod", "project", "Alpha", exact=True) == ["p1"]
+
+
+def test_synced_at(index):
+    assert index.synced_at("prod", "project", ["bregenz.a1"]) is None
+    with mock.patch("croud.index.store.time.time", return_value=100.0):
+        index.sync("prod", "project", [], regions=["bregenz.a1"])
+        index.sync("prod", "user", [])
+    with mock.patch("croud.index.store.time.time", return_value=200.0):
+        index.sync("prod", "project", [], regions=["eastus.azure"])
+
+    assert index.synced_at("prod", "project", ["bregenz.a1"]) == 100.0
+    assert index.synced_at("prod", "project", ["bregenz.a1", "eastus.azure"]) == 100.0
+    assert index.synced_at("prod", "project", ["westeurope.azure"]) is None
+    assert index.synced_at("prod", "user") == 100.0
+    assert index.synced_at("dev", "user") is None
+
+
+def resolve(index, args, responses, exact=False):
+    fetch = mock.Mock(side_effect=fetch_data(responses))
+    with mock.patch.object(Query, "_fetch_data", fetch), mock.patch(
+        "croud.index.resolve.Index", return_value=index
+    ), mock.patch("croud.index.store.Index.close"):
+        resolve_names(args, exact)
+    return fetch.call_count
+
+
+def names_args(**kwargs):
+    return Namespace(env="prod", region=None, **kwargs)
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_resolve_names(load_config, index):
+    responses = {
+        "allOrganizations": {
+            "data": {"allOrganizations": connection([{"id": "o1", "name": "org"}])}
+        },
+        "allClusters": {
+            "data": {
+                "allClusters": connection(
+                    [{"id": "c1", "name": "cluster", "projectId": "p1"}]
+                )
+            }
+        },
+    }
+
+    args = names_args(org_name="org", org_id=None, cluster_name="cluster")
+    # both kinds are fetched concurrently, one request each
+    assert resolve(index, args, responses) == 2
+    assert args.org_id == "o1"
+    assert args.cluster_id == "c1"
+
+    # the names are resolved from the index now
+    args = names_args(org_name="org", cluster_name="cluster")
+    assert resolve(index, args, responses) == 0
+    assert (args.org_id, args.cluster_id) == ("o1", "c1")
+
+    # until the index is older than the TTL
+    later = index.synced_at("prod", "organization") + NAME_TTL + 1
+    with mock.patch("croud.index.resolve.time.time", return_value=later):
+        assert resolve(index, names_args(org_name="org"), responses) == 1
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+def test_resolve_names_without_names(load_config, index):
+    args = names_args(project_id="p1", project_name=None)
+    assert resolve(index, args, {}) == 0
+    assert args.project_id == "p1"
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+@mock.patch("croud.index.resolve.print_error")
+def test_resolve_names_not_unique(print_error, load_config, index):
+    projects = [
+        {"id": "p1", "name": "a", "region": "bregenz.a1"},
+        {"id": "p2", "name": "a", "region": "bregenz.a1"},
+    ]
+    responses = {"allProjects": {"data": {"allProjects": connection(projects)}}}
+
+    with pytest.raises(SystemExit):
+        resolve(index, names_args(project_name="a"), responses)
+    print_error.assert_called_once_with(
+        "There are several projects named 'a', use the ID of one of them "
+        "instead: p1, p2"
+    )
+
+    print_error.reset_mock()
+    with pytest.raises(SystemExit):
+        resolve(index, names_args(project_name="b"), responses)
+    print_error.assert_called_once_with("There is no project named 'b'.")
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+@mock.patch("croud.index.resolve.print_error")
+def test_resolve_names_of_region(print_error, load_config, index):
+    index.sync(
+        "prod",
+        "cluster",
+        [
+            {"id": "c1", "name": "foo", "region": "bregenz.a1"},
+            {"id": "c2", "name": "bar", "region": "bregenz.a1"},
+        ],
+        regions=["bregenz.a1"],
+    )
+    clusters = [{"id": "c3", "name": "foo", "projectId": "p1"}]
+    responses = {"allClusters": {"data": {"allClusters": connection(clusters)}}}
+
+    # the name is unique in the region, despite the cluster of another region
+    args = Namespace(env="prod", region="eastus.azure", cluster_name="foo")
+    assert resolve(index, args, responses) == 1
+    assert args.cluster_id == "c3"
+
+    # a cluster of another region is not found
+    args = Namespace(env="prod", region="eastus.azure", cluster_name="bar")
+    with pytest.raises(SystemExit):
+        resolve(index, args, responses)
+    print_error.assert_called_once_with("There is no cluster named 'bar'.")
+
+
+@mock.patch("croud.config.load_config", return_value=Configuration.DEFAULT_CONFIG)
+@mock.patch("croud.index.resolve.print_error")
+def test_resolve_names_exact(print_error, load_config, index):
+    projects = [{"id": "p1", "name": "Alpha", "region": "bregenz.a1"}]
+    responses = {"allProjects": {"data": {"allProjects": connection(projects)}}}
+
+    args = names_args(project_name="alpha")
+    assert resolve(index, args, responses) == 1
+    assert args.project_id == "p1"
+
+    args = names_args(project_name="alpha")
+    with pytest.raises(SystemExit):
+        resolve(index, args, responses, exact=True)
+    print_error.assert_called_once_with("There is no project named 'alpha'.")
@@ -18,6 +18,10 @@
 # software solely pursuant to the terms of the relevant commercial agreement.
 
 
+from unittest import mock
+
+import pytest
+
 from croud.printer import FormatPrinter
 
 
@@ -44,6 +48,35 @@ class TestFormatPrinter(object):
 """
         )
 
+    def test_ndjson_format(self, capsys):
+        sample = [{"a": "foo", "b": 1}, {"a": "bär", "b": None}]
+        self.printer.print_rows(sample, format="ndjson")
+        out, err = capsys.readouterr()
+        assert out == """{"a": "foo", "b": 1}\n{"a": "bär", "b": null}\n"""
+
+    def test_csv_format(self, capsys):
+        sample = [
+            {"a": "foo, bar", "b": 1, "c": True},
+            {"b": 2, "c": False, "a": {"bar": [{"value": 0}]}},
+            {"a": None, "c": None},
+        ]
+        self.printer.print_rows(sample, format="csv")
+        out, err = capsys.readouterr()
+        assert (
+            out
+            == """a,b,c
+"foo, bar",1,TRUE
+"{""bar"": [{""value"": 0}]}",2,FALSE
+,,
+"""
+        )
+
+    def test_tsv_format_dict(self, capsys):
+        sample = {"a": "foo", "b": 1, "c": True}
+        self.printer.print_rows(sample, format="tsv")
+        out, err = capsys.readouterr()
+        assert out == "a\tb\tc\nfoo\t1\tTRUE\n"
+
     def test_tabular_format_multi_row(self, capsys):
         sample = [
             {"a": "foo", "b": 1, "c": True},
@@ -61,3 +94,43 @@ class TestFormatPrinter(object):
 +---------------------------------------+-----+-------+
 """
         )
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            ["foo", 1, 1.5, None],
+            [True, False, None],
+            [{"b": 1, "a": [True]}, [1, "ä"], None, False, "x"],
+            [{"a": 1}, {"a": True}, {"a": 1.0}, {"a": 1}],
+        ],
+    )
+    def test_transform_column(self, values):
+        assert self.printer._transform_column(values) == [
+            self.printer._transform_field(value) for value in values
+        ]
+
+    def test_transform_column_serializes_shared_values_once(self):
+        config = {"cluster": {"id": "1", "table": "raw"}}
+        values = [config, config, {"cluster": {"id": "1", "table": "raw"}}, config]
+        with mock.patch(
+            "croud.printer._NESTED_ENCODER.encode", side_effect=lambda v: repr(v)
+        ) as encode:
+            result = self.printer._transform_column(values)
+        assert encode.call_count == 2
+        assert result == [repr(config)] * 4
+
+    @pytest.mark.parametrize("format", ["json", "table", "ndjson", "csv", "tsv"])
+    def test_print_pages(self, capsys, format):
+        pages = [[{"a": "foo", "b": 1}, {"a": "bar", "b": 2}], [{"a": "baz", "b": 3}]]
+        assert self.printer.print_pages(iter(pages), format=format) == 3
+        pages_out, _ = capsys.readouterr()
+
+        self.printer.print_rows(pages[0] + pages[1], format=format)
+        rows_out, _ = capsys.readouterr()
+        assert pages_out == rows_out
+
+    @pytest.mark.parametrize("format", ["json", "table", "ndjson", "csv", "tsv"])
+    def test_print_no_pages(self, capsys, format):
+        assert self.printer.print_pages(iter([]), format=format) == 0
+        out, _ = capsys.readouterr()
+        assert out == ""
@@ -0,0 +1,61 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+import pstats
+import tracemalloc
+
+import pytest
+
+from croud.profiling import profile
+
+
+@pytest.fixture(autouse=True)
+def cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+
+
+def test_profile_cpu(cwd, capsys):
+    assert profile("cpu", "me", lambda: sorted(range(1000))) == list(range(1000))
+
+    (path,) = cwd.glob("croud-me-*.prof")
+    functions = [func for _, _, func in pstats.Stats(str(path)).stats]
+    assert "<built-in method builtins.sorted>" in functions
+    err = capsys.readouterr().err
+    assert "Ordered by: cumulative time" in err
+    assert f"CPU profile written to {path.name}" in err
+
+
+def test_profile_memory(cwd, capsys):
+    def allocate():
+        return [str(i) for i in range(1000)]
+
+    assert len(profile("mem", "me", allocate)) == 1000
+
+    (path,) = cwd.glob("croud-me-*.snapshot")
+    assert tracemalloc.Snapshot.load(str(path)).statistics("lineno")
+    err = capsys.readouterr().err
+    assert "test_profiling.py" in err
+    assert f"Memory snapshot written to {path.name}" in err
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.parametrize("mode,suffix", [("cpu", "prof"), ("mem", "snapshot")])
+def test_profile_written_on_exit(cwd, capsys, mode, suffix):
+    with pytest.raises(SystemExit):
+        profile(mode, "clusters_list", lambda: exit(1))
+    assert len(list(cwd.glob(f"croud-clusters_list-*.{suffix}"))) == 1
@@ -17,6 +17,7 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
+import asyncio
 from unittest import mock
 
 import aiohttp
@@ -25,7 +26,13 @@ from aiohttp.test_utils import loop_context
 from util.fake_server import FakeCrateDBCloud, FakeResolver
 
 from croud.config import Configuration
-from croud.session import HttpSession, cloud_url
+from croud.session import (
+    HttpSession,
+    SessionPool,
+    cloud_url,
+    default_ssl_context,
+    query_hash,
+)
 
 me_query = """
 {
@@ -161,3 +168,150 @@ class TestHttpSession:
         region = "westeurope.azure"
         url = cloud_url("prod", region)
         assert url == f"https://{region}.cratedb.cloud"
+
+
+@mock.patch.object(Configuration, "get_env", return_value="dev")
+@mock.patch.object(Configuration, "get_token", return_value="eyJraWQiOiIx")
+@mock.patch("croud.session.RETRY_BACKOFF_BASE", 0)
+class TestHttpSessionRetries:
+    def run_fetch(self, query, faults=(), delay=0, **kwargs):
+        with loop_context() as loop:
+            fake_cloud = FakeCrateDBCloud(loop=loop)
+            fake_cloud.faults.extend(faults)
+            fake_cloud.delay = delay
+            info = loop.run_until_complete(fake_cloud.start())
+            resolver = FakeResolver(info, loop=loop)
+            connector = aiohttp.TCPConnector(loop=loop, resolver=resolver, ssl=True)
+
+            async def fetch():
+                async with HttpSession(
+                    Configuration.get_env(),
+                    Configuration.get_token(),
+                    url="https://cratedb.local",
+                    conn=connector,
+                    headers={"query": "me"},
+                ) as session:
+                    return await session.fetch(query, None, **kwargs)
+
+            try:
+                return loop.run_until_complete(fetch()), fake_cloud.requests
+            finally:
+                loop.run_until_complete(fake_cloud.stop())
+
+    def test_query_retried(self, mock_token, mock_env):
+        result, requests = self.run_fetch(me_query, faults=[503, 502], retries=2)
+        assert result["data"] == me_response
+        assert requests == 3
+
+    @mock.patch("croud.session.print_info")
+    def test_query_retries_exhausted(self, mock_print_info, mock_token, mock_env):
+        result, requests = self.run_fetch(me_query, faults=[503, 503], retries=1)
+        assert result == {
+            "errors": [{"message": "Query failed to run by returning code of 503."}],
+            "extensions": {"httpStatus": 503},
+        }
+        assert requests == 2
+
+    @mock.patch("croud.session.print_info")
+    def test_mutation_not_retried(self, mock_print_info, mock_token, mock_env):
+        mutation = "mutation { me { email } }"
+        result, requests = self.run_fetch(mutation, faults=[503], retries=2)
+        assert result == {
+            "errors": [{"message": "Query failed to run by returning code of 503."}],
+            "extensions": {"httpStatus": 503},
+        }
+        assert requests == 1
+
+    def test_read_timeout(self, mock_token, mock_env):
+        timeout = aiohttp.ClientTimeout(sock_read=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            self.run_fetch(me_query, delay=0.5, timeout=timeout, retries=1)
+
+
+@mock.patch.object(Configuration, "get_env", return_value="dev")
+@mock.patch.object(Configuration, "get_token", return_value="eyJraWQiOiIx")
+class TestHttpSessionPersistedQueries:
+    def run_fetches(self, fake_cloud_setup, count):
+        with loop_context() as loop:
+            fake_cloud = FakeCrateDBCloud(loop=loop)
+            fake_cloud_setup(fake_cloud)
+            info = loop.run_until_complete(fake_cloud.start())
+            resolver = FakeResolver(info, loop=loop)
+            connector = aiohttp.TCPConnector(loop=loop, resolver=resolver, ssl=True)
+
+            async def fetch():
+                async with HttpSession(
+                    Configuration.get_env(),
+                    Configuration.get_token(),
+                    url="https://cratedb.local",
+                    conn=connector,
+                    headers={"query": "me"},
+                ) as session:
+                    return [
+                        await session.fetch(me_query, {"a": 1}, persisted=True)
+                        for _ in range(count)
+                    ]
+
+            try:
+                return loop.run_until_complete(fetch()), fake_cloud.payloads
+            finally:
+                loop.run_until_complete(fake_cloud.stop())
+
+    def test_persisted_query(self, mock_token, mock_env):
+        results, payloads = self.run_fetches(lambda fake_cloud: None, 2)
+
+        assert [result["data"] for result in results] == [me_response] * 2
+        extensions = {
+            "persistedQuery": {"version": 1, "sha256Hash": query_hash(me_query)}
+        }
+        assert payloads == [
+            # the hash is unknown at first, so the full query is sent
+            {"variables": {"a": 1}, "extensions": extensions},
+            {"query": me_query, "variables": {"a": 1}, "extensions": extensions},
+            {"variables": {"a": 1}, "extensions": extensions},
+        ]
+
+    def test_persisted_query_not_supported(self, mock_token, mock_env):
+        def setup(fake_cloud):
+            fake_cloud.supports_persisted_queries = False
+
+        results, payloads = self.run_fetches(setup, 2)
+
+        assert [result["data"] for result in results] == [me_response] * 2
+        assert len(payloads) == 3
+        assert "query" not in payloads[0]
+        assert payloads[1:] == [{"query": me_query, "variables": {"a": 1}}] * 2
+
+
+@mock.patch("croud.session.ssl.create_default_context")
+def test_default_ssl_context_created_once(mock_create_default_context):
+    default_ssl_context.cache_clear()
+    try:
+        context = default_ssl_context()
+        assert default_ssl_context() is context
+        mock_create_default_context.assert_called_once()
+    finally:
+        default_ssl_context.cache_clear()
+
+
+def test_session_pool():
+    with loop_context() as loop:
+
+        async def test_pool():
+            pool = SessionPool()
+            session = await pool.get("dev", "eyJraWQiOiIx", "bregenz.a1")
+            assert await pool.get("dev", "eyJraWQiOiIx", "bregenz.a1") is session
+
+            other_region = await pool.get("dev", "eyJraWQiOiIx", "eastus.azure")
+            assert other_region is not session
+
+            # a new token requires a new session
+            other_token = await pool.get("dev", "eyJraWQiOiIy", "bregenz.a1")
+            assert other_token is not session
+            assert session.client.closed is True
+
+            await pool.close()
+            assert other_region.client.closed is True
+            assert other_token.client.closed is True
+
+        loop.run_until_complete(test_pool())
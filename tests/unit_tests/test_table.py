@@ -0,0 +1,113 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+import random
+import string
+from unittest import mock
+
+import pytest
+from tabulate import tabulate
+
+from croud.table import TableSpool, _tabulate, psql_table
+
+
+def expected(headers, rows):
+    return tabulate(rows, headers=headers, tablefmt="psql", missingval="NULL")
+
+
+def spooled(headers, rows, max_size=100, page_size=3):
+    with TableSpool(headers, max_size=max_size) as spool:
+        for i in range(0, len(rows), page_size):
+            spool.add(rows[i : i + page_size])
+        return "\n".join(spool.render())
+
+
+@pytest.mark.parametrize(
+    "headers,rows",
+    [
+        (["a", "b"], [["foo", 1], ["bar", None]]),
+        (["a", "b", "c"], [[None, None, None]]),
+        (["id", "num"], [[" padded ", -5], ["x", 12345678901234]]),
+        (["a", "b"], [["x", 1], [3, "y"]]),
+        (["a"], [[""]]),
+        # rendered by tabulate
+        (["a"], [["1.5"], ["x"]]),
+        (["a"], [[1.5], [2]]),
+        (["a"], [["True"], ["x"]]),
+        (["a"], [["nan"]]),
+        (["a"], [[" 5"], ["x"]]),
+        (["a"], [["bär"]]),
+        (["ä"], [["x"]]),
+        (["a"], [["two\nlines"]]),
+        (["a", "b"], [["x", 1], ["y"]]),
+        # only some columns are rendered by tabulate
+        (["a", "b", "c"], [["x", 1.5, 3], ["yy", 2, None]]),
+        (["name", "n"], [["日本語", 1], ["x", 22]]),
+        (["ä", "b"], [["x", "y"]]),
+        (["a", "b"], [["x", "two\nlines"]]),
+        (["id", "notes"], [[1, ""], [2, "line one\nline two"]]),
+        (["id", "notes"], [[1, "x"], [2, "a\r\nb"], [3, ""], [4, None]]),
+        (["a", "b"], []),
+    ],
+)
+def test_same_as_tabulate(headers, rows):
+    assert psql_table(headers, rows) == expected(headers, rows)
+    assert spooled(headers, rows) == expected(headers, rows)
+
+
+def test_same_as_tabulate_random():
+    rnd = random.Random(0)
+    characters = string.ascii_letters + string.digits + " -.+_{}\"'"
+    values = [
+        lambda: None,
+        lambda: rnd.randint(-1000, 10**12),
+        lambda: "".join(rnd.choice(characters) for _ in range(rnd.randint(0, 8))),
+        lambda: rnd.choice(["TRUE", "inf", "1e5", "-", "+", ".", " ", "node-1"]),
+        lambda: rnd.choice([1.25, -0.5, "bär", "日本", "x\u0301", ""]),
+        lambda: rnd.choice(["", "two\nlines", "a\nb\nc", "ä\nx"]),
+    ]
+    for _ in range(1000):
+        width = rnd.randint(1, 4)
+        headers = [f"h{i}" for i in range(width)]
+        rows = [
+            [rnd.choice(values)() for _ in range(width)]
+            for _ in range(rnd.randint(1, 8))
+        ]
+        assert psql_table(headers, rows) == expected(headers, rows)
+        assert spooled(headers, rows) == expected(headers, rows)
+
+
+def test_spool_rolls_over_to_disk():
+    headers = ["id", "name", "size"]
+    rows = [[f"{i:08x}", f"cluster-{i}", i * 3] for i in range(2500)]
+    with TableSpool(headers, max_size=1024) as spool:
+        spool.add(rows[:1000])
+        spool.add(rows[1000:])
+        assert spool._file._rolled
+        assert spool.rows == 2500
+        assert "\n".join(spool.render()) == expected(headers, rows)
+
+
+def test_spool_tabulates_single_columns():
+    headers = ["id", "name", "size"]
+    rows = [[f"c{i:07x}", f"clüster-{i}", i * 3] for i in range(2500)]
+    with mock.patch("croud.table._tabulate", side_effect=_tabulate) as tabulate_:
+        assert spooled(headers, rows, max_size=1024, page_size=1000) == expected(
+            headers, rows
+        )
+    # only the column with non-ASCII values is rendered by tabulate
+    assert [call[0][0] for call in tabulate_.call_args_list] == [["name"]]
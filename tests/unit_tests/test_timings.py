@@ -0,0 +1,168 @@
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+
+import json
+import os
+from unittest import mock
+
+import aiohttp
+import pytest
+from aiohttp.test_utils import loop_context
+from util.fake_server import FakeCrateDBCloud, FakeResolver
+
+from croud.printer import print_format, print_pages
+from croud.session import HttpSession
+from croud.timings import (
+    TIMINGS_ENV,
+    Timings,
+    excluded,
+    print_timings,
+    start_timings,
+    stop_timings,
+    timings_format,
+)
+
+
+@pytest.fixture
+def timings():
+    yield start_timings("clusters_list")
+    stop_timings()
+
+
+@pytest.mark.parametrize(
+    "flag,env,expected",
+    [
+        ("json", "text", "json"),
+        (None, "json", "json"),
+        (None, "1", "text"),
+        (None, "TEXT", "text"),
+        (None, "", None),
+        (None, "0", None),
+    ],
+)
+def test_timings_format(flag, env, expected):
+    with mock.patch.dict(os.environ, {TIMINGS_ENV: env}):
+        assert timings_format(flag) == expected
+
+
+def test_as_dict():
+    timings = Timings("me", start=0.0)
+    timings.add("dns", 0.0015)
+    timings.add("dns", 0.001)
+    timings.requests = 2
+
+    with mock.patch("croud.timings.time.perf_counter", return_value=0.5):
+        result = timings.as_dict()
+
+    assert result["command"] == "me"
+    assert result["requests"] == 2
+    assert result["dns_ms"] == 2.5
+    assert result["render_ms"] == 0.0
+    assert result["total_ms"] == 500.0
+
+
+def test_print_timings(capsys):
+    timings = Timings("me")
+    print_timings(timings, "json")
+    assert json.loads(capsys.readouterr().err)["command"] == "me"
+
+    print_timings(timings, "text")
+    err = capsys.readouterr().err
+    assert "Time to first byte" in err
+    assert "Requests" in err
+
+
+def test_render_excludes_fetching_pages(timings, capsys):
+    clock = [0.0]
+
+    def pages():
+        # fetching a page takes 10s, rendering it takes no time at all
+        clock[0] += 10.0
+        yield [{"a": 1}]
+
+    with mock.patch("croud.timings.time.perf_counter", side_effect=lambda: clock[0]):
+        print_pages(pages(), "ndjson")
+    assert timings.phases["render"] == 0.0
+
+
+def test_render(timings, capsys):
+    print_format([{"a": 1}], "json")
+    assert timings.phases["render"] > 0
+
+
+def test_excluded_without_timings():
+    assert list(excluded("render", [1, 2])) == [1, 2]
+
+
+def test_request_phases(timings):
+    with loop_context() as loop:
+
+        async def fetch():
+            async with HttpSession(
+                "dev",
+                "eyJraWQiOiIx",
+                url="https://cratedb.local",
+                conn=connector,
+                headers={"query": "me"},
+            ) as session:
+                await session.fetch("query me { me { email } }", None)
+
+        fake_cloud = FakeCrateDBCloud(loop=loop)
+        info = loop.run_until_complete(fake_cloud.start())
+        resolver = FakeResolver(info, loop=loop)
+        connector = aiohttp.TCPConnector(loop=loop, resolver=resolver, ssl=True)
+        loop.run_until_complete(fetch())
+        loop.run_until_complete(fake_cloud.stop())
+
+    assert timings.requests == 1
+    for phase in ["dns", "connect", "wait", "download", "decode"]:
+        assert timings.phases[phase] > 0, phase
+
+
+def test_shared_session():
+    # a session of the pool, e.g. of the daemon, is used by several commands
+    with loop_context() as loop:
+        fake_cloud = FakeCrateDBCloud(loop=loop)
+        info = loop.run_until_complete(fake_cloud.start())
+        resolver = FakeResolver(info, loop=loop)
+        connector = aiohttp.TCPConnector(loop=loop, resolver=resolver, ssl=True)
+        session = HttpSession(
+            "dev",
+            "eyJraWQiOiIx",
+            url="https://cratedb.local",
+            conn=connector,
+            headers={"query": "me"},
+        )
+
+        def fetch():
+            loop.run_until_complete(session.fetch("query me { me { email } }", None))
+
+        try:
+            fetch()
+            first = start_timings("me")
+            fetch()
+            fetch()
+            second = start_timings("me")
+            fetch()
+            stop_timings()
+            fetch()
+        finally:
+            loop.run_until_complete(session.close())
+            loop.run_until_complete(fake_cloud.stop())
+
+    assert (first.requests, second.requests) == (2, 1)
+    assert second.phases["wait"] > 0
@@ -0,0 +1,189 @@
+# Licensed to CRATE Technology GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+
+"""
+A synthetic, seeded dataset of CrateDB Cloud resources.
+
+The same seed and sizes always produce the same resources, so the dataset can
+be used to test and benchmark croud with any number of resources offline.
+"""
+
+import random
+import uuid
+from typing import Dict, List, Optional
+
+ROLES = [
+    {"fqn": "org_admin", "friendlyName": "Organization Admin"},
+    {"fqn": "org_member", "friendlyName": "Organization Member"},
+    {"fqn": "project_admin", "friendlyName": "Project Admin"},
+    {"fqn": "project_member", "friendlyName": "Project Member"},
+]
+PLAN_TYPES = [1, 2, 3, 4, 5, 6]
+REGIONS = ["bregenz.a1", "westeurope.azure", "eastus.azure"]
+CRATE_VERSIONS = ["4.0.2", "3.3.5", "3.3.4", "3.2.7"]
+
+
+class Dataset:
+    """
+    Organizations with projects, clusters, consumer sets and users.
+
+    The projects are distributed evenly among the organizations, the clusters
+    among the projects and the consumer sets among the clusters. Every user
+    but the first one is a member of one organization and of its first
+    project. The first user is the current user and a member of all
+    organizations.
+
+    ``padding`` characters are appended to the names of all resources, to
+    increase the size of the responses.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        organizations: int = 2,
+        projects: int = 4,
+        clusters: int = 8,
+        consumer_sets: int = 4,
+        users: int = 10,
+        padding: int = 0,
+    ) -> None:
+        self._random = random.Random(seed)
+        self._padding = "x" * padding
+        self.roles: List[Dict] = [dict(role) for role in ROLES]
+        self.organizations: List[Dict] = []
+        self.projects: List[Dict] = []
+        self.clusters: List[Dict] = []
+        self.consumer_sets: List[Dict] = []
+        self.users: List[Dict] = []
+        # the role of each member, by the ID of the resource and of the user
+        self.members: Dict[str, Dict[str, str]] = {}
+
+        for i in range(organizations):
+            self.add_organization(f"org-{i}", self._random.choice(PLAN_TYPES))
+        for i in range(projects):
+            organization = self.organizations[i % organizations]
+            self.add_project(f"project-{i}", organization["id"])
+        for i in range(clusters):
+            project = self.projects[i % projects]
+            self.clusters.append(
+                {
+                    "id": self.uuid(),
+                    "name": self.name(f"cluster-{i}"),
+                    "numNodes": self._random.choice([1, 3, 5]),
+                    "crateVersion": self._random.choice(CRATE_VERSIONS),
+                    "projectId": project["id"],
+                    "username": "admin",
+                    "fqdn": f"cluster-{i}.{project['region']}.cratedb.net.",
+                }
+            )
+        for i in range(consumer_sets):
+            cluster = self.clusters[i % clusters]
+            self.consumer_sets.append(
+                {
+                    "id": self.uuid(),
+                    "name": self.name(f"consumer-set-{i}"),
+                    "projectId": cluster["projectId"],
+                    "productId": self.uuid(),
+                    "instances": self._random.randint(1, 4),
+                    "config": {
+                        "cluster": {
+                            "id": cluster["id"],
+                            "schema": "doc",
+                            "table": f"raw_{i}",
+                        },
+                        "consumerGroup": "$Default",
+                        "leaseStorageContainer": f"lease-{i}",
+                    },
+                }
+            )
+        for i in range(users):
+            user = self.add_user(f"user{i}@example.com", f"user-{i}")
+            if i == 0:
+                for organization in self.organizations:
+                    self.add_member(organization["id"], user["uid"], "org_admin")
+            elif organizations:
+                organization = self.organizations[i % organizations]
+                user["organizationId"] = organization["id"]
+                self.add_member(organization["id"], user["uid"], "org_member")
+                for project in self.projects_of(organization["id"])[:1]:
+                    self.add_member(project["id"], user["uid"], "project_member")
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self._random.getrandbits(128), version=4))
+
+    def name(self, name: str) -> str:
+        return name + self._padding
+
+    def add_organization(self, name: str, plan_type: int) -> Dict:
+        organization = {
+            "id": self.uuid(),
+            "name": self.name(name),
+            "planType": plan_type,
+            "notification": {"alert": {"email": None, "enabled": False}},
+        }
+        self.organizations.append(organization)
+        return organization
+
+    def add_project(self, name: str, organization_id: str) -> Dict:
+        project = {
+            "id": self.uuid(),
+            "name": self.name(name),
+            "region": self._random.choice(REGIONS),
+            "organizationId": organization_id,
+        }
+        self.projects.append(project)
+        return project
+
+    def add_user(self, email: str, username: str) -> Dict:
+        user = {
+            "uid": self.uuid(),
+            "email": email,
+            "username": self.name(username),
+            "organizationId": None,
+        }
+        self.users.append(user)
+        return user
+
+    def add_member(self, resource_id: str, user_id: str, role: str) -> None:
+        self.members.setdefault(resource_id, {})[user_id] = role
+
+    def remove_member(self, resource_id: str, user_id: str) -> bool:
+        return self.members.get(resource_id, {}).pop(user_id, None) is not None
+
+    def user(self, id_or_email: str) -> Optional[Dict]:
+        for user in self.users:
+            if id_or_email in (user["uid"], user["email"]):
+                return user
+        return None
+
+    def organization(self, id: str) -> Optional[Dict]:
+        return _by_id(self.organizations, id)
+
+    def project(self, id: str) -> Optional[Dict]:
+        return _by_id(self.projects, id)
+
+    def projects_of(self, organization_id: str) -> List[Dict]:
+        return [p for p in self.projects if p["organizationId"] == organization_id]
+
+
+def _by_id(resources: List[Dict], id: str) -> Optional[Dict]:
+    for resource in resources:
+        if resource["id"] == id:
+            return resource
+    return None
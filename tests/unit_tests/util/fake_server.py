@@ -17,16 +17,22 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
+import argparse
 import asyncio
+import hashlib
 import pathlib
+import random
+import re
 import socket
 import ssl
-from typing import Any, Dict, Iterable
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from aiohttp import web
 from aiohttp.resolver import DefaultResolver
 from aiohttp.test_utils import unused_port
 
+from .dataset import Dataset
+
 
 class FakeResolver:
     _LOCAL_HOST = {0: "127.0.0.1", socket.AF_INET: "127.0.0.1", socket.AF_INET6: "::1"}
@@ -55,24 +61,197 @@ class FakeResolver:
             return await self._resolver.resolve(host, port, family)
 
 
+class GraphQLError(Exception):
+    pass
+
+
+# A field of a selection set: its alias (or name), name, arguments and
+# selection set.
+Field = Tuple[str, str, Dict[str, Any], List[Any]]
+
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|\$?[\w.+-]+|[{}()\[\]:]')
+
+
+def parse_document(document: str, variables: Optional[Dict]) -> Tuple[str, List]:
+    """
+    Return the type (``query`` or ``mutation``) and the fields of a GraphQL
+    document, with the variables substituted in the arguments.
+
+    Only the subset of GraphQL that croud uses is supported: a single
+    operation without fragments or directives.
+    """
+    tokens = _TOKEN.findall(document)
+    if not tokens:
+        raise GraphQLError("Syntax Error: Unexpected <EOF>")
+    kind = tokens[0] if tokens[0] in ("query", "mutation") else "query"
+    # skip the name and the variable definitions of the operation
+    pos = tokens.index("{") if "{" in tokens else len(tokens)
+    if pos == len(tokens):
+        raise GraphQLError("Syntax Error: Expected {")
+    fields, _ = _parse_selection(tokens, pos + 1, variables or {})
+    return kind, fields
+
+
+def _parse_selection(tokens: List[str], pos: int, variables: Dict) -> Tuple:
+    fields: List[Field] = []
+    while pos < len(tokens) and tokens[pos] != "}":
+        alias = name = tokens[pos]
+        pos += 1
+        if tokens[pos] == ":":
+            name = tokens[pos + 1]
+            pos += 2
+        args: Dict[str, Any] = {}
+        if tokens[pos] == "(":
+            pos += 1
+            while tokens[pos] != ")":
+                key = tokens[pos]
+                args[key], pos = _parse_value(tokens, pos + 2, variables)
+            pos += 1
+        selection: List[Field] = []
+        if tokens[pos] == "{":
+            selection, pos = _parse_selection(tokens, pos + 1, variables)
+        fields.append((alias, name, args, selection))
+    return fields, pos + 1
+
+
+def _parse_value(tokens: List[str], pos: int, variables: Dict) -> Tuple[Any, int]:
+    token = tokens[pos]
+    if token == "[":
+        values = []
+        pos += 1
+        while tokens[pos] != "]":
+            value, pos = _parse_value(tokens, pos, variables)
+            values.append(value)
+        return values, pos + 1
+    if token == "{":
+        obj = {}
+        pos += 1
+        while tokens[pos] != "}":
+            obj[tokens[pos]], pos = _parse_value(tokens, pos + 2, variables)
+        return obj, pos + 1
+    if token.startswith("$"):
+        return variables.get(token[1:]), pos + 1
+    if token.startswith('"'):
+        return token[1:-1], pos + 1
+    if token in ("true", "false"):
+        return token == "true", pos + 1
+    if token == "null":
+        return None, pos + 1
+    try:
+        return int(token), pos + 1
+    except ValueError:
+        # an enum value
+        return token, pos + 1
+
+
+def select(value: Any, selection: List[Field]) -> Any:
+    """
+    Return the fields of ``selection`` of a value, like a GraphQL server.
+    """
+    if not selection or value is None:
+        return value
+    if isinstance(value, list):
+        return [select(item, selection) for item in value]
+    return {
+        alias: select(value.get(name), children)
+        for alias, name, _, children in selection
+    }
+
+
+def connection(rows: List[Dict], first: Optional[int], after: Optional[str]) -> Dict:
+    # the cursor of a row is its position, as a string
+    start = int(after) if after else 0
+    end = len(rows) if first is None else start + first
+    page = rows[start:end]
+    return {
+        "data": page,
+        "pageInfo": {
+            "endCursor": str(start + len(page)) if page else None,
+            "hasNextPage": start + len(page) < len(rows),
+        },
+    }
+
+
 class FakeCrateDBCloud:
-    def __init__(self, loop: asyncio.AbstractEventLoop):
+    """
+    A local stand-in for the GraphQL API of CrateDB Cloud.
+
+    All queries and mutations of croud are answered from a synthetic
+    :class:`Dataset`. Mutations modify the dataset, so a query after a
+    mutation returns the modified resources.
+
+    Requests with a ``query`` header are answered the way the tests of the
+    HTTP session expect: ``me`` returns a fixed user, anything else is a bad
+    request.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        dataset: Optional[Dataset] = None,
+        seed: int = 0,
+    ):
         self.loop = loop
         self.app = web.Application()
         # thi will allow us to register multiple endpoints/handlers to test
-        self.app.router.add_routes([web.post("/graphql", self.on_graphql)])
+        self.app.router.add_routes(
+            [
+                web.post("/graphql", self.on_graphql),
+                web.post("/product/graphql", self.on_graphql),
+            ]
+        )
         here = pathlib.Path(__file__)
         # Load certificates and sign key used to simulate ssl/tls
         ssl_cert = here.parent / "server.crt"
         ssl_key = here.parent / "server.key"
         self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
         self.ssl_context.load_cert_chain(str(ssl_cert), str(ssl_key))
+        self.dataset = Dataset(seed) if dataset is None else dataset
+        # Status codes of responses that are returned (in this order) instead
+        # of the regular responses, and a delay before every response. Both
+        # are used to simulate an unavailable or slow service.
+        self.faults: List[int] = []
+        self.delay: float = 0
+        # A random delay of up to ``jitter`` seconds is added to the delay,
+        # and the given fraction of the requests fails with a 503 response.
+        self.jitter: float = 0
+        self.error_rate: float = 0
+        self._random = random.Random(seed)
+        self.requests = 0
+        # The JSON payloads of all requests, and the queries of automatic
+        # persisted queries by their hash. Persisted queries can be disabled
+        # to simulate a service that does not support them.
+        self.payloads: List[Dict] = []
+        self.persisted_queries: Dict[str, str] = {}
+        self.supports_persisted_queries = True
+        self.resolvers: Dict[str, Callable[..., Any]] = {
+            "me": self.me,
+            "allOrganizations": self.all_organizations,
+            "allProjects": self.all_projects,
+            "allClusters": self.all_clusters,
+            "allUsers": self.all_users,
+            "allRoles": self.all_roles,
+            "allConsumerSets": self.all_consumer_sets,
+            "createOrganization": self.create_organization,
+            "createProject": self.create_project,
+            "createProduct": self.create_product,
+            "editConsumerSet": self.edit_consumer_set,
+            "addUserToProject": self.add_user_to_project,
+            "removeUserFromProject": self.remove_user_from_project,
+            "addUserToOrganization": self.add_user_to_organization,
+            "removeUserFromOrganization": self.remove_user_from_organization,
+            "addRoleToUser": self.add_role_to_user,
+            "removeRoleFromUser": self.remove_role_from_user,
+        }
 
-    async def start(self) -> Dict[str, int]:
-        port = unused_port()
+    async def start(
+        self, port: Optional[int] = None, host: str = "localhost", tls: bool = True
+    ) -> Dict[str, int]:
+        port = port or unused_port()
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
-        site = web.TCPSite(self.runner, "localhost", port, ssl_context=self.ssl_context)
+        ssl_context = self.ssl_context if tls else None
+        site = web.TCPSite(self.runner, host, port, ssl_context=ssl_context)
         await site.start()
         return {"cratedb.local": port}
 
@@ -80,7 +259,24 @@ class FakeCrateDBCloud:
         await self.runner.cleanup()
 
     async def on_graphql(self, request: web.Request) -> web.Response:
-        if self._is_authorized(request):
+        self.requests += 1
+        delay = self.delay + self.jitter * self._random.random()
+        if delay:
+            await asyncio.sleep(delay)
+        if self.faults:
+            return web.Response(status=self.faults.pop(0), text="Unavailable")
+        if self.error_rate and self._random.random() < self.error_rate:
+            return web.Response(status=503, text="Unavailable")
+
+        payload = await request.json()
+        self.payloads.append(payload)
+        error = self._persisted_query_error(payload)
+        if error:
+            return web.json_response({"errors": [{"message": error}]})
+
+        if not self._is_authorized(request):
+            return web.Response(status=302)
+        if "query" in request.headers:
             if self._get_query_header(request) == "me":
                 return web.json_response(
                     {
@@ -95,7 +291,222 @@ class FakeCrateDBCloud:
                 )
             resp = {"data": {"message": "Bad request"}}
             return web.json_response(resp, status=400)
-        return web.Response(status=302)
+        return web.json_response(self.execute(payload))
+
+    def execute(self, payload: Dict) -> Dict:
+        """
+        Run the query of a request payload against the dataset.
+        """
+        query = payload.get("query")
+        if query is None:
+            sha256_hash = payload["extensions"]["persistedQuery"]["sha256Hash"]
+            query = self.persisted_queries[sha256_hash]
+        try:
+            _, fields = parse_document(query, payload.get("variables"))
+        except (GraphQLError, IndexError) as e:
+            message = str(e) if isinstance(e, GraphQLError) else "Syntax Error"
+            return {"errors": [{"message": message}]}
+
+        data: Dict[str, Any] = {}
+        errors = []
+        for alias, name, args, selection in fields:
+            resolver = self.resolvers.get(name)
+            try:
+                if resolver is None:
+                    raise GraphQLError(f"Cannot query field {name!r}.")
+                try:
+                    value = resolver(**args)
+                except TypeError:
+                    raise GraphQLError(f"Unknown or missing arguments of {name!r}.")
+                data[alias] = select(value, selection)
+            except GraphQLError as e:
+                data[alias] = None
+                errors.append({"message": str(e), "path": [alias]})
+        response: Dict[str, Any] = {"data": data}
+        if errors:
+            response["errors"] = errors
+        return response
+
+    def me(self) -> Dict:
+        return self.dataset.users[0]
+
+    def all_organizations(self, first=None, after=None) -> Dict:
+        return connection(self.dataset.organizations, first, after)
+
+    def all_projects(self, first=None, after=None) -> Dict:
+        return connection(self.dataset.projects, first, after)
+
+    def all_clusters(self, sort=None, filter=None, first=None, after=None) -> Dict:
+        clusters = self.dataset.clusters
+        for f in filter or []:
+            if f["by"] == "PROJECT_ID" and f["op"] == "EQ":
+                clusters = [c for c in clusters if c["projectId"] == f["value"]]
+        return connection(clusters, first, after)
+
+    def all_users(self, sort=None, queryArgs=None, first=None, after=None) -> Dict:
+        users = self.dataset.users
+        query_args = queryArgs or {}
+        organization_id = query_args.get("organizationId")
+        if organization_id:
+            members = self.dataset.members.get(organization_id, {})
+            users = [u for u in users if u["uid"] in members]
+        elif query_args.get("noOrg"):
+            organizations = [
+                self.dataset.members.get(o["id"], {})
+                for o in self.dataset.organizations
+            ]
+            users = [u for u in users if not any(u["uid"] in m for m in organizations)]
+        return connection(users, first, after)
+
+    def all_roles(self) -> Dict:
+        return {"data": self.dataset.roles}
+
+    def all_consumer_sets(
+        self, clusterId=None, productId=None, projectId=None
+    ) -> List[Dict]:
+        return [
+            c
+            for c in self.dataset.consumer_sets
+            if (not clusterId or c["config"]["cluster"]["id"] == clusterId)
+            and (not productId or c["productId"] == productId)
+            and (not projectId or c["projectId"] == projectId)
+        ]
+
+    def create_organization(self, input: Dict) -> Dict:
+        organization = self.dataset.add_organization(input["name"], input["planType"])
+        self.dataset.add_member(organization["id"], self.me()["uid"], "org_admin")
+        return organization
+
+    def create_project(self, input: Dict) -> Dict:
+        self._organization(input["organizationId"])
+        return self.dataset.add_project(input["name"], input["organizationId"])
+
+    def create_product(
+        self, name, projectId, tier, cluster, consumer, unit=None
+    ) -> Dict:
+        project = self._project(projectId)
+        product_id = self.dataset.uuid()
+        cluster_id = self.dataset.uuid()
+        fqdn = f"{name}.{project['region']}.cratedb.net."
+        self.dataset.clusters.append(
+            {
+                "id": cluster_id,
+                "name": name,
+                "numNodes": 3,
+                "crateVersion": cluster["version"],
+                "projectId": projectId,
+                "username": cluster["username"],
+                "fqdn": fqdn,
+            }
+        )
+        self.dataset.consumer_sets.append(
+            {
+                "id": self.dataset.uuid(),
+                "name": f"{name}-consumer",
+                "projectId": projectId,
+                "productId": product_id,
+                "instances": 1,
+                "config": {
+                    "cluster": {
+                        "id": cluster_id,
+                        "schema": consumer["schema"],
+                        "table": consumer["table"],
+                    },
+                    "consumerGroup": consumer["eventhub"]["consumerGroup"],
+                    "leaseStorageContainer": consumer["eventhub"]["leaseStorage"][
+                        "container"
+                    ],
+                },
+            }
+        )
+        return {"id": product_id, "url": f"https://{fqdn[:-1]}"}
+
+    def edit_consumer_set(self, id: str, input: Dict) -> Dict:
+        for consumer_set in self.dataset.consumer_sets:
+            if consumer_set["id"] == id:
+                config = consumer_set["config"]
+                config["cluster"].update(input.get("cluster") or {})
+                eventhub = input.get("eventhub") or {}
+                if "consumerGroup" in eventhub:
+                    config["consumerGroup"] = eventhub["consumerGroup"]
+                lease_storage = eventhub.get("leaseStorage") or {}
+                if "container" in lease_storage:
+                    config["leaseStorageContainer"] = lease_storage["container"]
+                return consumer_set
+        raise GraphQLError("Consumer set not found.")
+
+    def add_user_to_project(self, input: Dict) -> Dict:
+        project = self._project(input["projectId"])
+        user = self._user(input["user"])
+        self.dataset.add_member(project["id"], user["uid"], "project_member")
+        return {"success": True}
+
+    def remove_user_from_project(self, input: Dict) -> Dict:
+        project = self._project(input["projectId"])
+        user = self._user(input["user"])
+        return {"success": self.dataset.remove_member(project["id"], user["uid"])}
+
+    def add_user_to_organization(self, input: Dict) -> Dict:
+        organization = self._organization(input["organizationId"])
+        user = self._user(input["user"])
+        role = input.get("roleFqn") or "org_member"
+        self.dataset.add_member(organization["id"], user["uid"], role)
+        user["organizationId"] = organization["id"]
+        return {"user": user}
+
+    def remove_user_from_organization(self, input: Dict) -> Dict:
+        organization = self._organization(input["organizationId"])
+        user = self._user(input["user"])
+        removed = self.dataset.remove_member(organization["id"], user["uid"])
+        if removed:
+            user["organizationId"] = None
+        return {"success": removed}
+
+    def add_role_to_user(self, input: Dict) -> Dict:
+        user = self._user(input["userId"])
+        if input["roleFqn"] not in [role["fqn"] for role in self.dataset.roles]:
+            raise GraphQLError("Role not found.")
+        self.dataset.add_member(input["resourceId"], user["uid"], input["roleFqn"])
+        return {"success": True}
+
+    def remove_role_from_user(self, input: Dict) -> Dict:
+        user = self._user(input["userId"])
+        return {"success": self.dataset.remove_member(input["resourceId"], user["uid"])}
+
+    def _organization(self, id: str) -> Dict:
+        organization = self.dataset.organization(id)
+        if organization is None:
+            raise GraphQLError("Organization not found.")
+        return organization
+
+    def _project(self, id: str) -> Dict:
+        project = self.dataset.project(id)
+        if project is None:
+            raise GraphQLError("Project not found.")
+        return project
+
+    def _user(self, id_or_email: str) -> Dict:
+        user = self.dataset.user(id_or_email)
+        if user is None:
+            raise GraphQLError("User not found.")
+        return user
+
+    def _persisted_query_error(self, payload: Dict) -> Optional[str]:
+        persisted_query = (payload.get("extensions") or {}).get("persistedQuery")
+        if persisted_query is None:
+            return None
+        if not self.supports_persisted_queries:
+            return "PersistedQueryNotSupported"
+
+        sha256_hash = persisted_query["sha256Hash"]
+        if "query" in payload:
+            query_hash = hashlib.sha256(payload["query"].encode("utf-8")).hexdigest()
+            if query_hash != sha256_hash:
+                return "provided sha does not match query"
+            self.persisted_queries[sha256_hash] = payload["query"]
+        elif sha256_hash not in self.persisted_queries:
+            return "PersistedQueryNotFound"
+        return None
 
     def _is_authorized(self, request: web.Request) -> bool:
         if "session" in request.cookies:
@@ -111,3 +522,47 @@ class FakeCrateDBCloud:
                 else:
                     return ""
         return ""
+
+
+def main() -> None:
+    """
+    Serve a synthetic dataset on http://localhost:8000, which is the URL of
+    the ``local`` environment of croud, e.g. to load test croud with::
+
+        python -m util.fake_server --clusters 100000
+        croud clusters list --env local
+    """
+    parser = argparse.ArgumentParser(description="Serve a fake CrateDB Cloud.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", type=int, default=0)
+    for name in ["organizations", "projects", "clusters", "consumer-sets", "users"]:
+        parser.add_argument(f"--{name}", type=int)
+    parser.add_argument("--padding", type=int, default=0)
+    parser.add_argument("--delay", type=float, default=0)
+    parser.add_argument("--jitter", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    options = parser.parse_args()
+
+    sizes = {
+        name: getattr(options, name)
+        for name in ["organizations", "projects", "clusters", "consumer_sets", "users"]
+        if getattr(options, name) is not None
+    }
+    dataset = Dataset(options.seed, padding=options.padding, **sizes)
+    loop = asyncio.get_event_loop()
+    cloud = FakeCrateDBCloud(loop, dataset, options.seed)
+    cloud.delay = options.delay
+    cloud.jitter = options.jitter
+    cloud.error_rate = options.error_rate
+    loop.run_until_complete(cloud.start(options.port, tls=False))
+    print(f"Serving on http://localhost:{options.port}")
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(cloud.stop())
+
+
+if __name__ == "__main__":
+    main()